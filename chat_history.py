@@ -0,0 +1,309 @@
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QPointF, QRectF, QSize, Qt
+from PyQt5.QtGui import QKeySequence, QPalette, QTextLayout, QTextOption
+from PyQt5.QtWidgets import QAbstractItemView, QApplication, QListView, QStyle, QStyledItemDelegate
+
+# Histórico do chat em SQLite mostrado em um QListView (modelo/visão): só as linhas visíveis são
+# desenhadas, e só as páginas mais recentes ficam carregadas; as mais antigas são lidas quando a
+# rolagem chega perto do topo. Mensagens grandes aparecem cortadas (PREVIEW_CHARS caracteres ou
+# PREVIEW_LINES linhas) até um clique expandi-las; o texto completo fica só no banco.
+
+PAGE_SIZE = 200  # Mensagens lidas do banco por vez
+MAX_LOADED_ROWS = 2000  # Ao voltar para o fim, as mensagens mais antigas além disso são descarregadas
+PREVIEW_CHARS = 1000
+PREVIEW_LINES = 12
+MAX_EXPANDED_CHARS = 100_000  # Mensagem expandida; o texto completo sai com Ctrl+C
+FETCH_MARGIN_PX = 300  # Distância do topo (pixels) em que a página anterior é carregada
+BOTTOM_MARGIN_PX = 20  # Distância do fim em que a visão acompanha as mensagens novas
+LAYOUT_CACHE_SIZE = 300  # Textos já quebrados em linhas (QTextLayout) guardados para o desenho
+PADDING = 6
+ROLE_LABELS = {"user": "User", "ai": "AI"}  # Mensagens de sistema aparecem sem rótulo
+
+
+def make_preview(text):
+    preview = text[:PREVIEW_CHARS]
+    lines = preview.split("\n", PREVIEW_LINES)
+    if len(lines) > PREVIEW_LINES:
+        preview = "\n".join(lines[:PREVIEW_LINES])
+    return preview
+
+
+# Mensagens em SQLite. A prévia é gravada junto, antes do texto, para que as páginas sejam lidas
+# sem tocar no texto completo das mensagens grandes. Usado só na thread da interface.
+class ChatHistoryStore:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # Sem fsync a cada mensagem
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                created REAL NOT NULL,
+                role TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                preview TEXT NOT NULL,
+                text TEXT NOT NULL
+            )""")
+
+    def append(self, role, text):
+        cursor = self.conn.execute(
+            "INSERT INTO messages (created, role, length, preview, text) VALUES (?, ?, ?, ?, ?)",
+            (time.time(), role, len(text), make_preview(text), text))
+        return cursor.lastrowid
+
+    # Página de mensagens anteriores a 'before_id' (ou as mais recentes), da mais antiga para a
+    # mais nova: [(id, role, length, preview)]
+    def page(self, before_id=None, limit=PAGE_SIZE):
+        rows = self.conn.execute(
+            "SELECT id, role, length, preview FROM messages WHERE id < ? ORDER BY id DESC LIMIT ?",
+            (before_id if before_id is not None else 2 ** 63 - 1, limit)).fetchall()
+        rows.reverse()
+        return rows
+
+    def text(self, message_id, limit=None):
+        if limit is None:
+            row = self.conn.execute("SELECT text FROM messages WHERE id = ?", (message_id,)).fetchone()
+        else:
+            row = self.conn.execute("SELECT substr(text, 1, ?) FROM messages WHERE id = ?",
+                                    (limit, message_id)).fetchone()
+        return row[0] if row else ""
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+# Modelo com as mensagens carregadas: {"id", "role", "length", "text" (prévia ou texto expandido),
+# "expanded"}. As páginas anteriores entram no início da lista.
+class ChatHistoryModel(QAbstractListModel):
+    MessageIdRole = Qt.UserRole + 1
+    SenderRole = Qt.UserRole + 2
+    TruncatedRole = Qt.UserRole + 3
+    ExpandedRole = Qt.UserRole + 4
+
+    def __init__(self, store, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.messages = []
+        self.has_older = True
+        self.fetch_older()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.messages)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self.messages[index.row()]
+        if role == Qt.DisplayRole:
+            return self.display_text(message)
+        if role == self.MessageIdRole:
+            return message["id"]
+        if role == self.SenderRole:
+            return message["role"]
+        if role == self.TruncatedRole:
+            return self.is_truncated(message)
+        if role == self.ExpandedRole:
+            return message["expanded"]
+        return None
+
+    @staticmethod
+    def is_truncated(message):
+        return message["length"] > len(make_preview(message["text"])) or message["expanded"]
+
+    def display_text(self, message):
+        label = ROLE_LABELS.get(message["role"])
+        text = f"{label}: {message['text']}" if label else message["text"]
+        hidden = message["length"] - len(message["text"])
+        if message["expanded"]:
+            if hidden > 0:
+                text += f"\n[… mais {hidden} caracteres: Ctrl+C copia a mensagem completa]"
+            return text + "\n[clique para recolher]"
+        if hidden > 0:
+            return text + f"\n[… mais {hidden} caracteres: clique para expandir]"
+        return text
+
+    def add_message(self, role, text):
+        message_id = self.store.append(role, text)
+        row = len(self.messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.messages.append({"id": message_id, "role": role, "length": len(text),
+                              "text": make_preview(text), "expanded": False})
+        self.endInsertRows()
+        return message_id
+
+    # Carrega a página anterior à mensagem mais antiga carregada; retorna quantas mensagens entraram
+    def fetch_older(self):
+        if not self.has_older:
+            return 0
+        page = self.store.page(self.messages[0]["id"] if self.messages else None, self.page_size)
+        if len(page) < self.page_size:
+            self.has_older = False
+        if page:
+            self.beginInsertRows(QModelIndex(), 0, len(page) - 1)
+            self.messages[:0] = [{"id": message_id, "role": role, "length": length, "text": preview,
+                                  "expanded": False} for message_id, role, length, preview in page]
+            self.endInsertRows()
+        return len(page)
+
+    # Descarrega as mensagens mais antigas, deixando 'keep' carregadas
+    def trim_older(self, keep=MAX_LOADED_ROWS):
+        extra = len(self.messages) - keep
+        if extra > 0:
+            self.beginRemoveRows(QModelIndex(), 0, extra - 1)
+            del self.messages[:extra]
+            self.endRemoveRows()
+            self.has_older = True
+
+    def set_expanded(self, row, expanded):
+        message = self.messages[row]
+        if expanded == message["expanded"] or not self.is_truncated(message):
+            return
+        if expanded:
+            message["text"] = self.store.text(message["id"], MAX_EXPANDED_CHARS)
+        else:
+            message["text"] = make_preview(message["text"])
+        message["expanded"] = expanded
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def full_text(self, row):
+        message = self.messages[row]
+        if message["length"] == len(message["text"]):
+            return message["text"]
+        return self.store.text(message["id"])
+
+
+# Desenha cada mensagem com um QTextLayout (quebrado em linhas uma vez por largura e guardado);
+# no desenho, só as linhas dentro da área visível são pintadas
+class ChatMessageDelegate(QStyledItemDelegate):
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        self.width = None
+        self.heights = {}  # (id, expandida) -> altura, para a largura atual
+        self.layouts = OrderedDict()  # (id, expandida) -> QTextLayout, os usados mais recentemente
+
+    def text_width(self):
+        width = max(50, self.view.viewport().width() - 2 * PADDING)
+        if width != self.width:
+            self.width = width
+            self.heights.clear()
+            self.layouts.clear()
+        return width
+
+    def text_layout(self, index, font, width):
+        key = (index.data(ChatHistoryModel.MessageIdRole), index.data(ChatHistoryModel.ExpandedRole))
+        layout = self.layouts.get(key)
+        if layout is not None:
+            self.layouts.move_to_end(key)
+            return key, layout
+        layout = QTextLayout(index.data(Qt.DisplayRole), font)
+        option = QTextOption()
+        option.setWrapMode(QTextOption.WrapAtWordBoundaryOrAnywhere)
+        layout.setTextOption(option)
+        height = 0.0
+        layout.beginLayout()
+        while True:
+            line = layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(width)
+            line.setPosition(QPointF(0, height))
+            height += line.height()
+        layout.endLayout()
+        self.heights[key] = int(height + 0.999)
+        self.layouts[key] = layout
+        if len(self.layouts) > LAYOUT_CACHE_SIZE:
+            self.layouts.popitem(last=False)
+        return key, layout
+
+    def sizeHint(self, option, index):
+        width = self.text_width()
+        key = (index.data(ChatHistoryModel.MessageIdRole), index.data(ChatHistoryModel.ExpandedRole))
+        height = self.heights.get(key)
+        if height is None:
+            key, _ = self.text_layout(index, option.font, width)
+            height = self.heights[key]
+        return QSize(width + 2 * PADDING, height + 2 * PADDING)
+
+    def paint(self, painter, option, index):
+        _, layout = self.text_layout(index, option.font, self.text_width())
+        painter.save()
+        palette = option.palette
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, palette.highlight())
+            painter.setPen(palette.color(QPalette.HighlightedText))
+        else:
+            if index.data(ChatHistoryModel.SenderRole) == "user":
+                painter.fillRect(option.rect, palette.alternateBase())
+            painter.setPen(palette.color(QPalette.Text))
+        origin = QPointF(option.rect.left() + PADDING, option.rect.top() + PADDING)
+        # Área visível em coordenadas do texto: linhas fora dela não são desenhadas
+        visible = QRectF(self.view.viewport().rect()).translated(-origin)
+        layout.draw(painter, origin, [], visible)
+        painter.restore()
+
+
+class ChatHistoryView(QListView):
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.history = ChatHistoryModel(store, parent=self)
+        self.delegate = ChatMessageDelegate(self)
+        self.setModel(self.history)
+        self.setItemDelegate(self.delegate)
+        self.setUniformItemSizes(False)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setResizeMode(QListView.Adjust)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.fetching = False
+        self.clicked.connect(self.toggle_expanded)
+        self.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        self.scrollToBottom()
+
+    def at_bottom(self):
+        bar = self.verticalScrollBar()
+        return bar.value() >= bar.maximum() - BOTTOM_MARGIN_PX
+
+    # Nova mensagem: a visão acompanha se já estava no fim (ou se a mensagem é do usuário)
+    def add_message(self, role, text):
+        follow = role == "user" or self.at_bottom()
+        self.history.add_message(role, text)
+        if follow:
+            self.history.trim_older()
+            self.scrollToBottom()
+
+    def on_scroll(self, value):
+        if self.fetching or value > FETCH_MARGIN_PX or not self.history.has_older:
+            return
+        self.fetching = True
+        try:
+            bar = self.verticalScrollBar()
+            old_maximum = bar.maximum()
+            if self.history.fetch_older():
+                # As mensagens entram acima: manter na tela o que o usuário estava vendo
+                self.doItemsLayout()
+                bar.setValue(value + bar.maximum() - old_maximum)
+        finally:
+            self.fetching = False
+
+    def toggle_expanded(self, index):
+        if index.data(ChatHistoryModel.TruncatedRole):
+            self.history.set_expanded(index.row(), not index.data(ChatHistoryModel.ExpandedRole))
+            self.delegate.sizeHintChanged.emit(index)
+
+    def keyPressEvent(self, event):
+        index = self.currentIndex()
+        if event.matches(QKeySequence.Copy) and index.isValid():
+            QApplication.clipboard().setText(self.history.full_text(index.row()))
+            return
+        super().keyPressEvent(event)
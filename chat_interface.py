@@ -1,13 +1,38 @@
+import itertools
+import os
 import sys
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QTextEdit, QFileDialog, QProgressBar
-from PyQt5.QtCore import Qt
-from whisper_transcriber import transcribe_audio
-from image_generator import generate_image
-from github_integration import fetch_code_from_github
+import threading
+from concurrent.futures import CancelledError
+from pathlib import Path
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QProgressBar
+from PyQt5.QtCore import Qt, QThreadPool
+from chat_history import ChatHistoryStore, ChatHistoryView
+from chat_tasks import ChatTask
+from text_index import TextIndex
 import logging
 
+# Transcrição, geração de imagem e GitHub são importados só quando o comando é usado
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Índice de texto montado pelo file_processor (mesma pasta de dados, MYCHAT_DATA_DIR)
+data_dir = Path(os.environ.get("MYCHAT_DATA_DIR") or Path(__file__).parent)
+index_dir = data_dir / "index"
+cache_dir = data_dir / "cache"
+history_path = data_dir / "state" / "chat_history.sqlite"  # Histórico do chat, mantido entre execuções
+SEARCH_RESULTS = 5  # Trechos mostrados por pergunta
+
+# Comandos rodam em segundo plano; várias tarefas podem rodar ao mesmo tempo
+TASK_WORKERS = int(os.environ.get("MYCHAT_CHAT_WORKERS") or 4)
+TASK_SHUTDOWN_TIMEOUT_MS = 5000  # Espera pelas tarefas (já canceladas) ao fechar a janela
+# Modelo e backend da transcrição (as mesmas variáveis do file_processor; "auto" escolhe o modelo
+# pela duração do áudio)
+WHISPER_MODEL_NAME = os.environ.get("MYCHAT_WHISPER_MODEL") or "auto"
+WHISPER_MODEL_POLICY = os.environ.get("MYCHAT_WHISPER_MODEL_POLICY")
+WHISPER_BACKEND = os.environ.get("MYCHAT_WHISPER_BACKEND") or "auto"
+WHISPER_CHUNK_SECONDS = int(os.environ.get("MYCHAT_WHISPER_CHUNK_SECONDS") or 600)
+WHISPER_CHUNK_OVERLAP_SECONDS = int(os.environ.get("MYCHAT_WHISPER_CHUNK_OVERLAP_SECONDS") or 5)
+
 class ChatInterface(QWidget):
     def __init__(self):
         super().__init__()
@@ -17,21 +42,26 @@ class ChatInterface(QWidget):
 
         self.layout = QVBoxLayout()
 
-        # Display de chat
-        self.chat_display = QTextEdit(self)
-        self.chat_display.setReadOnly(True)
+        # Histórico do chat (só as mensagens visíveis são desenhadas; as antigas vêm do banco ao rolar)
+        self.history_store = ChatHistoryStore(history_path)
+        self.chat_display = ChatHistoryView(self.history_store, self)
         self.layout.addWidget(self.chat_display)
 
         # Caixa de entrada
         self.user_input = QLineEdit(self)
         self.user_input.setPlaceholderText("Digite sua mensagem ou envie um arquivo...")
+        self.user_input.returnPressed.connect(self.send_message)
         self.layout.addWidget(self.user_input)
 
-        # Barra de progresso
+        # Barra de progresso (média das tarefas em andamento)
         self.progress_bar = QProgressBar(self)
         self.progress_bar.setRange(0, 100)
         self.layout.addWidget(self.progress_bar)
 
+        # Tarefas em andamento: descrição, progresso e botão de cancelar de cada uma
+        self.tasks_layout = QVBoxLayout()
+        self.layout.addLayout(self.tasks_layout)
+
         # Botão de envio
         self.submit_button = QPushButton("Enviar", self)
         self.submit_button.clicked.connect(self.send_message)
@@ -44,45 +74,180 @@ class ChatInterface(QWidget):
 
         self.setLayout(self.layout)
 
+        self.text_index = TextIndex(index_dir)
+        self.index_lock = threading.Lock()  # As consultas compartilham a conexão do índice
+
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(TASK_WORKERS)
+        self.task_ids = itertools.count(1)
+        # id -> {"task", "row", "label", "bar", "button", "percent", "description"}; a referência à
+        # tarefa (sem autoDelete) vale até o sinal de concluída, falha ou cancelada
+        self.tasks = {}
+
     def send_message(self):
         user_message = self.user_input.text()
-        self.chat_display.append(f"User: {user_message}")
+        if not user_message.strip():
+            return
+        self.chat_display.add_message("user", user_message)
         self.user_input.clear()
 
         if user_message.lower().startswith("audio:"):
             file_path = user_message.split(":", 1)[1].strip()
-            ai_response = self.process_audio(file_path)
+            self.start_task(f"Transcrevendo {Path(file_path).name}", self.process_audio, file_path)
         elif user_message.lower().startswith("imagem:"):
             prompt = user_message.split(":", 1)[1].strip()
-            ai_response = self.process_image_generation(prompt)
+            self.start_task(f"Gerando imagem: {prompt[:40]}", self.process_image_generation, prompt)
         elif user_message.lower().startswith("github:"):
             repo_info = user_message.split(":", 1)[1].strip()
-            ai_response = self.process_github_code(repo_info)
+            self.start_task(f"Buscando {repo_info} no GitHub", self.process_github_code, repo_info)
         else:
-            ai_response = self.process_text_message(user_message)
+            self.start_task(f"Buscando: {user_message[:40]}", self.process_text_message, user_message)
+
+    # Função para enviar um comando ao pool de threads e mostrar a tarefa com o botão de cancelar
+    def start_task(self, description, func, *args):
+        task_id = next(self.task_ids)
+        task = ChatTask(task_id, func, *args)
+        task.signals.progress.connect(self.on_task_progress)
+        task.signals.finished.connect(self.on_task_finished)
+        task.signals.failed.connect(self.on_task_failed)
+        task.signals.cancelled.connect(self.on_task_cancelled)
+
+        row = QWidget(self)
+        row_layout = QHBoxLayout(row)
+        row_layout.setContentsMargins(0, 0, 0, 0)
+        label = QLabel(description, row)
+        bar = QProgressBar(row)
+        bar.setRange(0, 0)  # Sem estimativa até a primeira atualização
+        button = QPushButton("Cancelar", row)
+        button.clicked.connect(lambda: self.cancel_task(task_id))
+        row_layout.addWidget(label, 1)
+        row_layout.addWidget(bar)
+        row_layout.addWidget(button)
+        self.tasks_layout.addWidget(row)
+
+        self.tasks[task_id] = {"task": task, "row": row, "label": label, "bar": bar, "button": button,
+                               "percent": -1, "description": description}
+        self.thread_pool.start(task)
+        self.update_overall_progress()
+        return task_id
+
+    def cancel_task(self, task_id):
+        entry = self.tasks.get(task_id)
+        if entry is None:
+            return
+        entry["task"].cancel()
+        entry["button"].setEnabled(False)
+        entry["label"].setText(f"{entry['description']} (cancelando...)")
+        if self.thread_pool.tryTake(entry["task"]):
+            self.on_task_cancelled(task_id)  # Ainda estava na fila: não vai mais rodar
+
+    def on_task_progress(self, task_id, percent):
+        entry = self.tasks.get(task_id)
+        if entry is None:
+            return
+        entry["percent"] = percent
+        if percent >= 0:
+            entry["bar"].setRange(0, 100)
+            entry["bar"].setValue(percent)
+        self.update_overall_progress()
+
+    def on_task_finished(self, task_id, ai_response):
+        if self.remove_task(task_id):
+            self.chat_display.add_message("ai", ai_response)
 
-        self.chat_display.append(f"AI: {ai_response}")
+    def on_task_failed(self, task_id, error):
+        entry = self.remove_task(task_id)
+        if entry:
+            self.chat_display.add_message("ai", f"Erro em '{entry['description']}': {error}")
 
-    def process_text_message(self, message):
-        return f"Você disse: {message}"
+    def on_task_cancelled(self, task_id):
+        entry = self.remove_task(task_id)
+        if entry:
+            self.chat_display.add_message("ai", f"'{entry['description']}' cancelado.")
 
-    def process_audio(self, audio_file):
+    def remove_task(self, task_id):
+        entry = self.tasks.pop(task_id, None)
+        if entry is not None:
+            self.tasks_layout.removeWidget(entry["row"])
+            entry["row"].deleteLater()
+            self.update_overall_progress()
+        return entry
+
+    def update_overall_progress(self):
+        known = [entry["percent"] for entry in self.tasks.values() if entry["percent"] >= 0]
+        if not self.tasks:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(0)
+        elif not known:
+            self.progress_bar.setRange(0, 0)  # Indicador de ocupado
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(sum(known) // len(known))
+
+    # Ao fechar: cancelar as tarefas e esperar um pouco pelas que já estão rodando
+    def closeEvent(self, event):
+        for entry in self.tasks.values():
+            entry["task"].cancel()
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone(TASK_SHUTDOWN_TIMEOUT_MS)
+        self.history_store.close()
+        super().closeEvent(event)
+
+    # Os process_* rodam nas threads do pool: não podem mexer nos widgets, só devolver a resposta
+
+    # Responde com os trechos mais relevantes dos arquivos processados (BM25)
+    def process_text_message(self, message, progress=None, cancel_event=None):
         try:
-            transcription = transcribe_audio(audio_file)
-            return f"Áudio transcrito: {transcription}"
+            with self.index_lock:
+                results = self.text_index.search(message, k=SEARCH_RESULTS)
+        except Exception as e:
+            return f"Erro ao consultar o índice: {str(e)}"
+        if not results:
+            return f"Nenhum trecho encontrado nos arquivos processados para: {message}"
+        lines = ["Trechos encontrados nos arquivos processados:"]
+        for rank, result in enumerate(results, 1):
+            lines.append(f"{rank}. {result['file_name']} [{result['start']}:{result['end']}] "
+                         f"(relevância {result['score']:.2f})\n{result['text']}")
+        return "\n".join(lines)
+
+    # Transcrição em janelas (mesmo arquivo parcial do file_processor: um cancelamento não perde
+    # as janelas já transcritas); o progresso é a fração de janelas concluídas
+    def process_audio(self, audio_file, progress=None, cancel_event=None):
+        import media_probe
+        from result_cache import file_sha256
+        from transcription import DEFAULT_MODEL_POLICY, partial_path_for, select_model, transcribe_chunked
+
+        try:
+            audio_path = Path(audio_file)
+            model_name = WHISPER_MODEL_NAME
+            if model_name == "auto":
+                model_name = select_model(media_probe.media_duration(audio_path),
+                                          WHISPER_MODEL_POLICY or DEFAULT_MODEL_POLICY)
+            partial_path = partial_path_for(cache_dir / "partial", file_sha256(audio_path), model_name,
+                                            WHISPER_BACKEND, WHISPER_CHUNK_SECONDS, WHISPER_CHUNK_OVERLAP_SECONDS)
+            result = transcribe_chunked(audio_path, model_name, partial_path, chunk_seconds=WHISPER_CHUNK_SECONDS,
+                                        overlap_seconds=WHISPER_CHUNK_OVERLAP_SECONDS, backend=WHISPER_BACKEND,
+                                        progress=progress, cancel_event=cancel_event)
+            return f"Áudio transcrito: {result['text']}"
+        except CancelledError:
+            raise
         except Exception as e:
             return f"Erro ao transcrever áudio: {str(e)}"
 
-    def process_image_generation(self, prompt):
+    def process_image_generation(self, prompt, progress=None, cancel_event=None):
         try:
-            image_path = generate_image(prompt)
+            from image_generator import generate_image_from_text
+
+            image_path = generate_image_from_text(prompt)
             return f"Imagem gerada em {image_path}"
         except Exception as e:
             return f"Erro ao gerar imagem: {str(e)}"
 
-    def process_github_code(self, repo_info):
+    def process_github_code(self, repo_info, progress=None, cancel_event=None):
         try:
-            code = fetch_code_from_github(repo_info)
+            from github_integration import fetch_code_from_repo
+
+            code = "\n".join(fetch_code_from_repo(repo_info).values())
             return f"Código obtido do GitHub: {code[:200]}..."
         except Exception as e:
             return f"Erro ao buscar código no GitHub: {str(e)}"
@@ -90,7 +255,7 @@ class ChatInterface(QWidget):
     def open_file_dialog(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Abrir Arquivo")
         if file_path:
-            self.chat_display.append(f"Arquivo selecionado: {file_path}")
+            self.chat_display.add_message("system", f"Arquivo selecionado: {file_path}")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
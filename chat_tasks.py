@@ -0,0 +1,52 @@
+import logging
+import threading
+from concurrent.futures import CancelledError
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+# Sinais de uma tarefa; emitidos na thread do pool e entregues na thread da interface
+class TaskSignals(QObject):
+    progress = pyqtSignal(int, int)  # id da tarefa, porcentagem (-1 = sem estimativa)
+    finished = pyqtSignal(int, object)  # id da tarefa, resultado
+    failed = pyqtSignal(int, str)  # id da tarefa, mensagem de erro
+    cancelled = pyqtSignal(int)  # id da tarefa
+
+
+# Tarefa do chat executada em um QThreadPool. A função recebe 'progress(concluído, total)' e
+# 'cancel_event' como argumentos nomeados; o cancelamento é cooperativo: funções que verificam o
+# evento param no próximo ponto de verificação, e o resultado das demais é descartado.
+class ChatTask(QRunnable):
+    def __init__(self, task_id, func, *args):
+        super().__init__()
+        # O pool não apaga a tarefa ao terminar: quem a criou guarda a referência até tratar o sinal
+        # final (tryTake em uma tarefa já apagada pelo pool derruba o slot com RuntimeError)
+        self.setAutoDelete(False)
+        self.task_id = task_id
+        self.func = func
+        self.args = args
+        self.signals = TaskSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report_progress(self, done, total):
+        if not self.cancel_event.is_set():
+            self.signals.progress.emit(self.task_id, int(done * 100 / total) if total else -1)
+
+    def run(self):
+        if self.cancel_event.is_set():
+            self.signals.cancelled.emit(self.task_id)  # Cancelada antes de sair da fila
+            return
+        try:
+            result = self.func(*self.args, progress=self.report_progress, cancel_event=self.cancel_event)
+        except CancelledError:
+            self.signals.cancelled.emit(self.task_id)
+        except Exception as e:
+            logging.error(f"Erro na tarefa {self.task_id}: {e}")
+            self.signals.failed.emit(self.task_id, str(e))
+        else:
+            if self.cancel_event.is_set():
+                self.signals.cancelled.emit(self.task_id)
+            else:
+                self.signals.finished.emit(self.task_id, result)
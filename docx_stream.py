@@ -0,0 +1,163 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Extração de texto de DOCX lendo o XML direto do zip, sem montar o modelo de objetos do
+# python-docx. Cada parte (word/document.xml, cabeçalhos, rodapés, notas) é descompactada e lida
+# aos poucos com iterparse; cada elemento é retirado da árvore assim que termina, então a memória
+# não depende do tamanho do documento.
+#
+# Saída: uma linha por parágrafo e uma por linha de tabela (células separadas por tabulação), na
+# ordem do documento. Caixas de texto entram antes do parágrafo em que estão ancoradas; o conteúdo
+# alternativo (mc:Fallback, cópia das caixas de texto para leitores antigos) é ignorado.
+# Ordem das partes: cabeçalhos, corpo, notas de rodapé, notas de fim, rodapés.
+
+WORD_NAMESPACES = (
+    "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "http://purl.oclc.org/ooxml/wordprocessingml/main",  # Strict OOXML
+)
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+RELATIONSHIP = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+DEFAULT_MAIN_PART = "word/document.xml"
+PARTS_BEFORE_BODY = ("header",)
+PARTS_AFTER_BODY = ("footnotes", "endnotes", "footer")  # Tipos de relação, na ordem de saída
+
+
+def word_tags(*names):
+    return {f"{{{namespace}}}{name}" for namespace in WORD_NAMESPACES for name in names}
+
+
+PARAGRAPH = word_tags("p")
+RUN = word_tags("r")
+TEXT = word_tags("t")
+ROW = word_tags("tr")
+CELL = word_tags("tc")
+# Elementos de um run que viram caracteres (w:tab também define paradas de tabulação em w:pPr,
+# por isso só contam dentro de um run)
+RUN_CHARACTERS = {**dict.fromkeys(word_tags("tab"), "\t"), **dict.fromkeys(word_tags("br", "cr"), "\n"),
+                  **dict.fromkeys(word_tags("noBreakHyphen"), "-")}
+
+
+# Função para percorrer as linhas de texto de uma parte XML (arquivo aberto do zip)
+def iter_part_lines(source):
+    open_elements = []
+    paragraphs = []  # Texto dos parágrafos abertos (caixa de texto: parágrafo dentro de parágrafo)
+    rows = []  # Células das linhas de tabela abertas
+    cells = []  # Parágrafos das células abertas
+    fallback = 0  # Profundidade dentro de mc:Fallback
+
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            open_elements.append(element)
+            if tag == MC_FALLBACK:
+                fallback += 1
+            elif fallback:
+                pass
+            elif tag in PARAGRAPH:
+                paragraphs.append([])
+            elif tag in ROW:
+                rows.append([])
+            elif tag in CELL:
+                cells.append([])
+            continue
+
+        open_elements.pop()
+        line = None
+        if tag == MC_FALLBACK:
+            fallback -= 1
+        elif fallback:
+            pass
+        elif tag in TEXT and paragraphs:
+            paragraphs[-1].append(element.text or "")
+        elif tag in RUN_CHARACTERS and paragraphs and open_elements and open_elements[-1].tag in RUN:
+            paragraphs[-1].append(RUN_CHARACTERS[tag])
+        elif tag in PARAGRAPH:
+            line = "".join(paragraphs.pop())
+        elif tag in CELL:
+            rows[-1].append(" ".join(text for text in cells.pop() if text))
+        elif tag in ROW:
+            line = "\t".join(rows.pop())
+
+        if line is not None:
+            if cells:
+                cells[-1].append(line)  # Parágrafo (ou linha de tabela aninhada) dentro de uma célula
+            else:
+                yield line
+        # Retirar o elemento já lido da árvore: só o caminho até o elemento atual fica na memória
+        if open_elements:
+            open_elements[-1].remove(element)
+
+
+def read_relationships(archive, part):
+    directory, name = posixpath.split(part)
+    try:
+        root = ET.fromstring(archive.read(posixpath.join(directory, "_rels", name + ".rels")))
+    except KeyError:
+        return []
+    relationships = []
+    for relationship in root.iter(RELATIONSHIP):
+        if relationship.get("TargetMode") == "External":
+            continue
+        target = relationship.get("Target", "")
+        if target.startswith("/"):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(directory, target))
+        relationships.append((relationship.get("Type", "").rpartition("/")[2], target))
+    return relationships
+
+
+# Nome da parte principal (word/document.xml na prática), pela relação officeDocument do pacote
+def main_part(archive):
+    for kind, target in read_relationships(archive, ""):
+        if kind == "officeDocument":
+            return target
+    return DEFAULT_MAIN_PART
+
+
+# Partes com texto, na ordem de saída: (nome no zip, manter parágrafos vazios)
+def text_parts(archive):
+    main = main_part(archive)
+    related = read_relationships(archive, main)
+    before = [target for kind, target in related if kind in PARTS_BEFORE_BODY]
+    after = [target for order in PARTS_AFTER_BODY for kind, target in related if kind == order]
+    parts = [(name, False) for name in dict.fromkeys(before)]
+    parts.append((main, True))
+    parts.extend((name, False) for name in dict.fromkeys(after))
+    return parts
+
+
+# Tamanho descompactado do XML principal (para decidir o modo streaming sem ler o documento)
+def document_size(path):
+    with zipfile.ZipFile(path) as archive:
+        return archive.getinfo(main_part(archive)).file_size
+
+
+# Função para percorrer as linhas de texto de um DOCX. Os parágrafos vazios do corpo são mantidos
+# (como no python-docx); nos cabeçalhos, rodapés e notas são descartados.
+def iter_docx_lines(path):
+    with zipfile.ZipFile(path) as archive:
+        for name, keep_empty in text_parts(archive):
+            try:
+                archive.getinfo(name)
+            except KeyError:
+                if keep_empty:
+                    raise  # Sem a parte principal não é um DOCX
+                continue
+            with archive.open(name) as source:
+                for line in iter_part_lines(source):
+                    if line or keep_empty:
+                        yield line
+
+
+# Texto do DOCX em partes, com as linhas separadas por "\n" (para o modo streaming)
+def iter_docx_text(path):
+    first = True
+    for line in iter_docx_lines(path):
+        yield line if first else "\n" + line
+        first = False
+
+
+def extract_docx_text(path):
+    return "\n".join(iter_docx_lines(path))
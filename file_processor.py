@@ -1,18 +1,38 @@
+import time
+start_time = time.perf_counter()  # Início da importação, usado no relatório de tempo de inicialização
+
 import json
 import os
 import shutil
 import logging
+import resource
+import signal
+import threading
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
-import pytesseract
-from PIL import Image
-import whisper
-import moviepy.editor as mp
-import docx
-import fitz  # PyMuPDF
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+# Dependências pesadas (tesserocr/pytesseract, PIL, whisper/torch, docx, fitz) são importadas
+# apenas quando o primeiro arquivo do tipo correspondente é processado
 from colorama import Fore, Style, init
 import secrets  # Importado para gerar o sufixo aleatório
-import subprocess
+import zipfile
+import argparse
+import fnmatch
+import metrics
+from result_cache import ResultCache
+from job_manifest import JobManifest, PROCESS, DONE
+from scheduler import Scheduler
+import media_probe
+from jsonl_store import JsonlShardStore
+from json_stream import JsonRecordWriter, rechunk
+import docx_stream
+from text_index import TextIndex
+from ocr_engine import get_ocr_backend
+from office_converter import OfficeConverter
+from transcription import (DEFAULT_MODEL_POLICY, DEFAULT_REALTIME_FACTORS, get_transcriber, parse_model_policy,
+                           partial_path_for, select_model, set_cpu_threads, transcribe_chunked)
 
 # Inicializar colorama e logging
 init(autoreset=True)
@@ -21,15 +41,201 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Caminho para a pasta do script (mesma pasta onde o script está localizado)
 base_dir = Path(__file__).parent
 
-# Diretórios relativos à pasta do script
-input_dir = base_dir / "input_dir"
-output_dir = base_dir / "output_dir"
-processed_dir = base_dir / "processed_dir"
-text_dir = input_dir / 'text'  # Diretório para salvar imagens temporárias usadas pelo PyMuPDF
+# Pasta de dados: por padrão a do script; MYCHAT_DATA_DIR permite apontar para outra
+# (benchmarks, testes), valendo também para os processos dos pools
+data_dir = Path(os.environ.get("MYCHAT_DATA_DIR") or base_dir)
+
+# Diretórios relativos à pasta de dados
+input_dir = data_dir / "input_dir"
+output_dir = data_dir / "output_dir"
+processed_dir = data_dir / "processed_dir"
+logs_dir = data_dir / "logs"
+
+# Métricas (desligadas por padrão): arquivo Prometheus, endpoint HTTP local e eventos JSON-lines
+METRICS_ENABLED = os.environ.get("MYCHAT_METRICS") == "1"
+metrics.configure(METRICS_ENABLED)
+METRICS_PROMETHEUS_FILE = os.environ.get("MYCHAT_METRICS_PROMETHEUS_FILE") or logs_dir / "metrics.prom"
+METRICS_EVENTS_FILE = os.environ.get("MYCHAT_METRICS_EVENTS_FILE") or logs_dir / "events.jsonl"
+METRICS_HTTP_PORT = int(os.environ.get("MYCHAT_METRICS_HTTP_PORT") or 0)
+# Padrão de nome (ex.: "relatorio*.pdf") dos arquivos a processar sob o cProfile
+PROFILE_FILE_PATTERN = os.environ.get("MYCHAT_PROFILE_FILE")
 
 # Subpastas que devem existir dentro de 'input_dir'
 subfolders = ['audio', 'code', 'images', 'text', 'video']
 
+# Extensões reconhecidas por cada tipo de processamento
+IMAGE_EXTENSIONS = [
+    '.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp', '.gif',
+    '.pbm', '.pgm', '.ppm'
+]
+AUDIO_EXTENSIONS = [
+    '.mp3', '.wav', '.flac', '.au', '.dts', '.m4a', '.mp2', '.ogg',
+    '.opus', '.spx', '.wma', '.aiff', '.ac3', '.aac', '.aif', '.caf',
+    '.eac3', '.pcm'
+]
+VIDEO_EXTENSIONS = ['.mp4', '.flv', '.avi', '.mov', '.mkv']
+PDF_EXTENSIONS = ['.pdf']
+DOCX_EXTENSIONS = ['.docx']
+OFFICE_CONVERT_EXTENSIONS = ['.doc', '.odt', '.rtf']  # Convertidos para .docx pelo LibreOffice
+CODE_EXTENSIONS = ['.py', '.java', '.cpp', '.js', '.html']
+
+# Funções para ler configurações das variáveis de ambiente (herdadas pelos processos dos pools)
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+def env_str(name, default):
+    return os.environ.get(name) or default
+
+# Tamanho de cada pool de processamento (configurável por variável de ambiente)
+cpu_count = os.cpu_count() or 1
+OCR_WORKERS = max(1, env_int("MYCHAT_OCR_WORKERS", max(1, cpu_count // 2)))  # Tesseract / PyMuPDF (pelo menos 1)
+WHISPER_WORKERS = env_int("MYCHAT_WHISPER_WORKERS", 1)  # Whisper (cada processo carrega o modelo)
+WHISPER_TORCH_THREADS = env_int("MYCHAT_WHISPER_TORCH_THREADS", max(1, cpu_count // 4))
+LIGHT_WORKERS = env_int("MYCHAT_LIGHT_WORKERS", 16)  # Código e DOCX (também limita o lote do LibreOffice)
+
+# PDFs escaneados: DPI da rasterização e processos de OCR de páginas por PDF
+PDF_RENDER_DPI = env_int("MYCHAT_PDF_RENDER_DPI", 300)
+PDF_OCR_WORKERS = env_int("MYCHAT_PDF_OCR_WORKERS", max(1, cpu_count // OCR_WORKERS))
+
+# Agendamento dos arquivos: política "sjf" (menor custo estimado primeiro) ou "fair" (faixas de custo
+# com pesos), fila de espera por pool e trabalhos em andamento por worker de cada pool
+SCHEDULER_POLICY = env_str("MYCHAT_SCHEDULER_POLICY", "sjf")
+SCHEDULER_LOOKAHEAD = env_int("MYCHAT_SCHEDULER_LOOKAHEAD", 1024)
+SCHEDULER_IN_FLIGHT_PER_WORKER = env_int("MYCHAT_SCHEDULER_IN_FLIGHT_PER_WORKER", 2)
+# Arquivos encontrados na varredura que esperam vaga na fila do seu pool (só o caminho), por pool
+SCHEDULER_SCAN_RESERVE = env_int("MYCHAT_SCHEDULER_SCAN_RESERVE", 65536)
+# Tempo limite de cada arquivo: custo estimado x fator, com um mínimo (fator 0 = sem limite)
+JOB_TIMEOUT_FACTOR = env_float("MYCHAT_JOB_TIMEOUT_FACTOR", 10.0)
+JOB_MIN_TIMEOUT_SECONDS = env_float("MYCHAT_JOB_MIN_TIMEOUT_SECONDS", 300.0)
+# Custo estimado em segundos (lido só dos cabeçalhos: tamanho, páginas do PDF, duração da mídia)
+PDF_PAGE_SECONDS = 1.0
+IMAGE_SECONDS = 2.0
+LIGHT_SECONDS_PER_MB = 0.05
+OFFICE_CONVERT_SECONDS = 3.0
+
+# Modo streaming: código e PDFs grandes são extraídos em partes e gravados aos poucos, com memória
+# constante (sem o cache de resultados, que guarda o registro inteiro)
+STREAMING_THRESHOLD_MB = env_int("MYCHAT_STREAMING_THRESHOLD_MB", 64)
+STREAMING_PDF_PAGES = env_int("MYCHAT_STREAMING_PDF_PAGES", 200)
+# Extrator de DOCX: "stream" (XML lido direto do zip, com tabelas, cabeçalhos, rodapés, notas e
+# caixas de texto; python-docx só se o arquivo não puder ser lido assim) ou "python-docx"
+DOCX_EXTRACTOR = env_str("MYCHAT_DOCX_EXTRACTOR", "stream")
+STREAM_CHUNK_KB = env_int("MYCHAT_STREAM_CHUNK_KB", 1024)  # Tamanho de cada parte gravada
+
+# Modo daemon: tempo sem mudanças para considerar um arquivo completo e intervalo da varredura sem inotify
+WATCH_DEBOUNCE_SECONDS = env_float("MYCHAT_WATCH_DEBOUNCE_SECONDS", 0.5)
+WATCH_POLL_INTERVAL = env_float("MYCHAT_WATCH_POLL_INTERVAL", 0.5)
+
+# Configuração dos extratores (também faz parte da chave do cache de resultados)
+TESSERACT_LANG = 'por'
+TESSERACT_OEM = 3
+TESSERACT_PSM = 3
+TESSERACT_DPI = 300
+TESSERACT_CONFIG = f'--oem {TESSERACT_OEM} --psm {TESSERACT_PSM} --dpi {TESSERACT_DPI}'
+# Backend de OCR: "auto" (tesserocr em processo se instalado), "tesserocr" ou "pytesseract"
+OCR_BACKEND = env_str("MYCHAT_OCR_BACKEND", "auto")
+# Modelo do Whisper: um nome fixo ("small") ou "auto" para escolher pela duração da mídia
+# (MYCHAT_WHISPER_MODEL_POLICY, "limite em segundos:modelo,...") e pelo orçamento de tempo real
+# (tempo de transcrição máximo por segundo de mídia; 0 = sem limite)
+WHISPER_MODEL_NAME = env_str("MYCHAT_WHISPER_MODEL", "auto")
+WHISPER_MODEL_POLICY = env_str("MYCHAT_WHISPER_MODEL_POLICY", DEFAULT_MODEL_POLICY)
+WHISPER_REALTIME_BUDGET = env_float("MYCHAT_WHISPER_REALTIME_BUDGET", 0.0)
+# Backend: "auto" (faster-whisper se instalado, senão "whisper-int8"), "whisper-int8",
+# "faster-whisper" ou "whisper" (float32, como antes)
+WHISPER_BACKEND = env_str("MYCHAT_WHISPER_BACKEND", "auto")
+# Fixar cada processo do Whisper em um bloco próprio de MYCHAT_WHISPER_TORCH_THREADS CPUs
+WHISPER_CPU_AFFINITY = env_str("MYCHAT_WHISPER_CPU_AFFINITY", "0") == "1"
+# Fatores de tempo real medidos (JSON gerado por teste/benchmark_transcricao.py --output)
+WHISPER_REALTIME_FACTORS_FILE = env_str("MYCHAT_WHISPER_REALTIME_FACTORS_FILE", "")
+
+# Mídias longas são transcritas em janelas paralelas com sobreposição
+WHISPER_CHUNK_SECONDS = env_int("MYCHAT_WHISPER_CHUNK_SECONDS", 600)
+WHISPER_CHUNK_OVERLAP_SECONDS = env_int("MYCHAT_WHISPER_CHUNK_OVERLAP_SECONDS", 5)
+WHISPER_CHUNK_WORKERS = env_int("MYCHAT_WHISPER_CHUNK_WORKERS", 2)
+
+# Triagem das imagens antes do OCR (image_prescreen): imagens sem texto são puladas e as demais vão
+# ao OCR em tons de cinza, binarizadas e redimensionadas para linhas de texto com a altura indicada
+IMAGE_PRESCREEN_ENABLED = env_str("MYCHAT_IMAGE_PRESCREEN", "1") == "1"
+IMAGE_TEXT_LINE_HEIGHT = env_int("MYCHAT_IMAGE_TEXT_LINE_HEIGHT", 32)
+IMAGE_MAX_OCR_MEGAPIXELS = env_float("MYCHAT_IMAGE_MAX_OCR_MEGAPIXELS", 12.0)
+IMAGE_BINARIZE = env_str("MYCHAT_IMAGE_BINARIZE", "1") == "1"
+
+# Texto na tela dos vídeos: OCR só nos quadros em que a cena muda (slides, legendas, gravações de tela)
+VIDEO_OCR_EXTENSIONS = ['.mp4', '.mkv', '.mov']
+VIDEO_OCR_ENABLED = env_str("MYCHAT_VIDEO_OCR", "1") == "1"
+VIDEO_SAMPLE_FPS = env_float("MYCHAT_VIDEO_SAMPLE_FPS", 1.0)
+VIDEO_ANALYSIS_HEIGHT = env_int("MYCHAT_VIDEO_ANALYSIS_HEIGHT", 180)
+VIDEO_CHANGE_FRACTION = env_float("MYCHAT_VIDEO_CHANGE_FRACTION", 0.01)
+
+# Cache de resultados endereçado por conteúdo (tamanho máximo em MB)
+cache_dir = data_dir / "cache"
+RESULT_CACHE_ENABLED = env_str("MYCHAT_RESULT_CACHE", "1") == "1"
+RESULT_CACHE_MAX_MB = env_int("MYCHAT_RESULT_CACHE_MAX_MB", 2048)
+result_cache = ResultCache(cache_dir / "results.sqlite", RESULT_CACHE_MAX_MB * 1024 * 1024)
+
+# Conversão de documentos pelo LibreOffice: documentos por lote e tempo limite por documento
+office_converter = OfficeConverter(
+    cache_dir / "office",
+    batch_size=env_int("MYCHAT_OFFICE_BATCH_SIZE", 16),
+    batch_window=env_float("MYCHAT_OFFICE_BATCH_WINDOW", 0.5),
+    timeout_per_document=env_int("MYCHAT_OFFICE_TIMEOUT_SECONDS", 120),
+)
+
+# Manifesto dos arquivos de entrada (retomada após queda, novas tentativas com espera exponencial)
+state_dir = data_dir / "state"
+job_manifest = JobManifest(
+    state_dir / "manifest.sqlite",
+    max_attempts=env_int("MYCHAT_JOB_MAX_ATTEMPTS", 5),
+    backoff_seconds=env_float("MYCHAT_JOB_BACKOFF_SECONDS", 30),
+    backoff_max_seconds=env_float("MYCHAT_JOB_BACKOFF_MAX_SECONDS", 3600),
+)
+JOB_RETRY_CHECK_INTERVAL = env_float("MYCHAT_JOB_RETRY_CHECK_INTERVAL", 5.0)  # Modo daemon
+
+# Quase-duplicatas (MinHash/LSH) entre os textos extraídos: o registro recebe o grupo ('cluster_id') e,
+# se for parecido com um anterior, 'duplicate_of'; o índice de texto ignora essas quase-duplicatas
+NEAR_DUPLICATES_ENABLED = env_str("MYCHAT_NEAR_DUPLICATES", "1") == "1"
+NEAR_DUPLICATE_THRESHOLD = env_float("MYCHAT_NEAR_DUPLICATE_THRESHOLD", 0.7)
+near_duplicate_index = None
+near_duplicate_lock = threading.Lock()
+
+# Função para obter o índice de quase-duplicatas, criado no primeiro resultado gravado (o módulo
+# carrega o numpy, que não precisa pesar na partida)
+def get_near_duplicates():
+    global near_duplicate_index
+    with near_duplicate_lock:
+        if near_duplicate_index is None:
+            from near_duplicates import NearDuplicateIndex
+
+            near_duplicate_index = NearDuplicateIndex(state_dir / "near_duplicates.sqlite",
+                                                      threshold=NEAR_DUPLICATE_THRESHOLD)
+        return near_duplicate_index
+
+# Saída dos resultados: "files" (um JSON por entrada) ou "jsonl" (shards JSONL com índice)
+OUTPUT_BACKEND = env_str("MYCHAT_OUTPUT_BACKEND", "files")
+shards_dir = processed_dir / "shards"
+output_store = JsonlShardStore(
+    shards_dir,
+    max_shard_bytes=env_int("MYCHAT_JSONL_SHARD_MB", 256) * 1024 * 1024,
+    compress=env_str("MYCHAT_JSONL_COMPRESS", "0") == "1",
+    batch_size=env_int("MYCHAT_JSONL_BATCH_SIZE", 256),
+    max_batch_bytes=env_int("MYCHAT_JSONL_BATCH_MB", 64) * 1024 * 1024,
+    flush_interval=env_float("MYCHAT_JSONL_FLUSH_INTERVAL", 1.0),
+)
+
+# Índice de texto (BM25) dos resultados, atualizado no fim de cada execução e periodicamente no modo daemon
+TEXT_INDEX_ENABLED = env_str("MYCHAT_TEXT_INDEX", "1") == "1"
+TEXT_INDEX_INTERVAL = env_float("MYCHAT_TEXT_INDEX_INTERVAL", 30.0)
+# Margem ao buscar no manifesto os arquivos concluídos desde a última atualização
+TEXT_INDEX_OVERLAP_SECONDS = 60
+TEXT_INDEX_SKIP_NEAR_DUPLICATES = env_str("MYCHAT_TEXT_INDEX_SKIP_NEAR_DUPLICATES", "1") == "1"
+index_dir = data_dir / "index"
+text_index = TextIndex(index_dir, skip_near_duplicates=TEXT_INDEX_SKIP_NEAR_DUPLICATES)
+
 # Garantir que as pastas principais e as subpastas existam
 for directory in [input_dir, output_dir, processed_dir]:
     if not directory.exists():
@@ -54,217 +260,451 @@ def create_dir_structure(file_path, base_dir):
 def generate_random_suffix():
     return secrets.token_urlsafe(8)  # Gera um sufixo aleatório de 8 caracteres
 
-# Função para processar arquivos de imagem (OCR com Tesseract)
-def process_image(file_path):
+# Função para gravar o JSON de um resultado: arquivo em 'output_dir' com sufixo aleatório
+# (movido depois para 'processed_dir') ou registro no armazenamento JSONL em shards
+def save_json_output(file_path, json_data):
+    if NEAR_DUPLICATES_ENABLED:
+        find_near_duplicates(file_path, json_data)
+    with metrics.stage("write_output", backend=OUTPUT_BACKEND):
+        return write_json_output(file_path, json_data)
+
+def write_json_output(file_path, json_data):
+    if OUTPUT_BACKEND == "jsonl":
+        source_path = str(file_path.relative_to(input_dir))
+        output_store.append(json_data, source_path=source_path, content_hash=result_cache.file_hash(file_path))
+        logging.info(f"{Fore.GREEN}Texto extraído de {file_path} e adicionado ao armazenamento JSONL")
+        return None  # Não há arquivo JSON para mover
+
+    json_output_path = new_json_output_path(file_path)
+    with open(json_output_path, 'w', encoding='utf-8') as json_file:
+        json.dump(json_data, json_file, ensure_ascii=False, indent=4)
+
+    logging.info(f"{Fore.GREEN}Texto extraído e salvo em {json_output_path}")
+    return json_output_path
+
+# Caminho do JSON de um resultado em 'output_dir', com sufixo aleatório
+def new_json_output_path(file_path):
+    random_suffix = generate_random_suffix()
+    json_file_name = f"{file_path.stem}-{random_suffix}.json"
+    json_output_path = output_dir / file_path.relative_to(input_dir).parent / json_file_name
+    json_output_path.parent.mkdir(parents=True, exist_ok=True)
+    return json_output_path
+
+# Função para gravar um resultado extraído em partes (modo streaming). No modo "files" o JSON é
+# escrito aos poucos, no mesmo formato de save_json_output; no modo "jsonl" cada parte vira um
+# registro com 'chunk' (o último também tem 'chunks', o total). Só uma parte fica na memória.
+def save_streaming_output(file_path, file_type, chunks):
+    header = {"file_name": file_path.name, "file_type": file_type}
+    builder = get_near_duplicates().builder() if NEAR_DUPLICATES_ENABLED else None
+    chunks = rechunk(chunks, STREAM_CHUNK_KB * 1024)
+    if OUTPUT_BACKEND == "jsonl":
+        return write_jsonl_chunks(file_path, header, chunks, builder)
+
+    json_output_path = new_json_output_path(file_path)
+    writer = JsonRecordWriter(json_output_path, header)
     try:
-        logging.info(f"{Fore.CYAN}Processando {file_path} com OCR (Tesseract)...")
-        image = Image.open(file_path)
-        custom_config = r'--oem 3 --psm 3 --dpi 300'
-        text = pytesseract.image_to_string(image, lang='por', config=custom_config)
+        for chunk in chunks:
+            check_deadline()
+            writer.write(chunk)
+            if builder is not None:
+                builder.update(chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    if not writer.characters:
+        writer.abort()
+        logging.warning(f"{Fore.YELLOW}Nenhum texto extraído de {file_path}.")
+        return None
+    writer.close(near_duplicate_fields(file_path, builder.digest) if builder is not None else None)
+    logging.info(f"{Fore.GREEN}Texto extraído em partes ({writer.characters} caracteres) e salvo em {json_output_path}")
+    return json_output_path
 
-        if text:
-            json_data = {
-                "file_name": file_path.name,
-                "file_type": "image",
-                "content": text
-            }
+def write_jsonl_chunks(file_path, header, chunks, builder):
+    source_path = str(file_path.relative_to(input_dir))
+    content_hash = result_cache.file_hash(file_path)
+    previous = None
+    index = 0
+    for chunk in chunks:
+        check_deadline()
+        if builder is not None:
+            builder.update(chunk)
+        if previous is not None:
+            output_store.append({**header, "content": previous, "chunk": index},
+                                source_path=source_path, content_hash=content_hash)
+            index += 1
+        previous = chunk  # Guardada até saber se é a última parte
+    if previous is None:
+        logging.warning(f"{Fore.YELLOW}Nenhum texto extraído de {file_path}.")
+        return None
+    last = {**header, "content": previous, "chunk": index, "chunks": index + 1}
+    if builder is not None:
+        # Só conhecida no fim: o índice de texto aplica a anotação às partes anteriores do mesmo arquivo
+        last.update(near_duplicate_fields(file_path, builder.digest))
+    output_store.append(last, source_path=source_path, content_hash=content_hash)
+    logging.info(f"{Fore.GREEN}Texto extraído de {file_path} em {index + 1} partes e adicionado ao armazenamento JSONL")
+    return None
+
+# Função para registrar a assinatura do texto e anotar o grupo de quase-duplicatas no registro.
+# Uma falha aqui não impede a gravação do resultado (o registro só fica sem a anotação).
+def find_near_duplicates(file_path, json_data):
+    json_data.update(near_duplicate_fields(file_path, lambda: get_near_duplicates().signature(json_data.get("content"))))
+
+def near_duplicate_fields(file_path, signature):
+    try:
+        with metrics.stage("near_duplicates"):
+            result = get_near_duplicates().assign_signature(job_key(file_path), signature())
+    except Exception as e:
+        logging.error(f"{Fore.RED}Erro ao procurar quase-duplicatas de {file_path}: {e}")
+        return {}
+    if result is None:
+        return {}
+    if result["duplicate_of"]:
+        metrics.count("mychat_near_duplicates_total")
+        logging.info(f"{Fore.YELLOW}{file_path} é quase-duplicata de {result['duplicate_of']} "
+                     f"(similaridade {result['similarity']}), grupo {result['cluster_id']}")
+    return {"near_duplicate": result}
+
+# Função para decidir se um arquivo deve ser extraído em modo streaming (pelo tamanho ou páginas;
+# 'size' substitui o tamanho do arquivo, p.ex. o XML descompactado de um DOCX)
+def use_streaming(file_path, pages=0, size=None):
+    size = file_path.stat().st_size if size is None else size
+    return size > STREAMING_THRESHOLD_MB * 1024 * 1024 or pages > STREAMING_PDF_PAGES
+
+# Função para extrair usando o cache: em caso de acerto o extrator não é executado
+def extract_with_cache(file_path, config, extract):
+    if not RESULT_CACHE_ENABLED:
+        return extract()
+    with metrics.stage("cache_lookup"):
+        cache_key = result_cache.make_key(file_path, config)
+        json_data = result_cache.get(cache_key)
+    metrics.count("mychat_cache_lookups_total", result="miss" if json_data is None else "hit")
+    if json_data is not None:
+        logging.info(f"{Fore.GREEN}Resultado de {file_path} encontrado no cache, extração ignorada.")
+    else:
+        json_data = extract()
+        result_cache.put(cache_key, json_data)
+    json_data["file_name"] = file_path.name  # O mesmo conteúdo pode chegar com outro nome
+    return json_data
 
-            # Gerar nome de arquivo JSON com sufixo aleatório
-            random_suffix = generate_random_suffix()
-            json_file_name = f"{file_path.stem}-{random_suffix}.json"
-            json_output_path = output_dir / file_path.relative_to(input_dir).parent / json_file_name
-            json_output_path.parent.mkdir(parents=True, exist_ok=True)
+# Configuração do OCR que entra na chave do cache
+def ocr_cache_config(extractor):
+    return {"extractor": extractor, "lang": TESSERACT_LANG, "config": TESSERACT_CONFIG}
 
-            with open(json_output_path, 'w', encoding='utf-8') as json_file:
-                json.dump(json_data, json_file, ensure_ascii=False, indent=4)
+# Função para obter o backend de OCR do processo atual (engines carregadas uma vez e reutilizadas)
+def ocr_backend():
+    return get_ocr_backend(OCR_BACKEND, TESSERACT_LANG, TESSERACT_OEM, TESSERACT_PSM, pool_size=PDF_OCR_WORKERS)
+
+# Função para processar arquivos de imagem (OCR com Tesseract)
+def process_image(file_path):
+    try:
+        cache_config = ocr_cache_config("image")
+        if IMAGE_PRESCREEN_ENABLED:
+            cache_config["prescreen"] = {"line_height": IMAGE_TEXT_LINE_HEIGHT, "binarize": IMAGE_BINARIZE,
+                                         "max_megapixels": IMAGE_MAX_OCR_MEGAPIXELS}
+        json_data = extract_with_cache(file_path, cache_config, lambda: extract_image(file_path))
 
-            logging.info(f"{Fore.GREEN}Texto extraído e salvo em {json_output_path}")
-            return json_output_path
+        # Imagens puladas na triagem também geram o JSON, para registrar a decisão
+        if json_data["content"] or json_data.get("prescreen", {}).get("decision") == "skip":
+            return save_json_output(file_path, json_data)
         else:
             logging.warning(f"{Fore.YELLOW}Nenhum texto extraído da imagem {file_path}.")
             return None
     except Exception as e:
         logging.error(f"{Fore.RED}Erro ao processar {file_path}: {e}")
-        return None
+        raise
 
-# Função para processar arquivos de áudio e video (usando Whisper)
-model = whisper.load_model("small")
-def process_audio_video(file_path):
-    try:
-        logging.info(f"{Fore.CYAN}Processando áudio {file_path} com Whisper...")
-        result = model.transcribe(str(file_path))
+def extract_image(file_path):
+    from PIL import Image
 
-        if result["text"]:
-            # Verificando se é áudio ou vídeo
-            media_type = "audio" if file_path.suffix.lower() in [
-                '.mp3', '.wav', '.flac', '.au', '.dts', '.m4a', '.mp2', '.ogg',
-                '.opus', '.spx', '.wma', '.aiff', '.ac3', '.aac', '.aif', '.caf', 
-                '.eac3', '.pcm'
-            ] else "video"  # Caso contrário, consideramos como vídeo
+    json_data = {"file_name": file_path.name, "file_type": "image", "content": ""}
+    if IMAGE_PRESCREEN_ENABLED:
+        image, decisions = prescreen_image(file_path)
+        json_data["prescreen"] = decisions
+        if image is None:
+            logging.info(f"{Fore.YELLOW}Imagem {file_path} sem sinais de texto ({decisions['reason']}), OCR pulado.")
+            return json_data
+    else:
+        image = Image.open(file_path)
 
-            json_data = {
-                "file_name": file_path.name,
-                "file_type": media_type,  # 'audio' ou 'video'
-                "content": result["text"]
-            }
+    logging.info(f"{Fore.CYAN}Processando {file_path} com OCR (Tesseract)...")
+    with metrics.stage("ocr", source="image"):
+        json_data["content"] = ocr_backend().image_to_string(image, dpi=TESSERACT_DPI)
+    return json_data
+
+# Função para triar uma imagem antes do OCR: (imagem normalizada ou None para pular, decisões)
+def prescreen_image(file_path):
+    import image_prescreen
 
-            # Gerar nome de arquivo JSON com sufixo aleatório
-            random_suffix = generate_random_suffix()
-            json_file_name = f"{file_path.stem}-{random_suffix}.json"
-            json_output_path = output_dir / file_path.relative_to(input_dir).parent / json_file_name
-            json_output_path.parent.mkdir(parents=True, exist_ok=True)
+    with metrics.stage("image_prescreen"):
+        image, decisions = image_prescreen.prepare_image(
+            file_path, target_line_height=IMAGE_TEXT_LINE_HEIGHT,
+            max_pixels=int(IMAGE_MAX_OCR_MEGAPIXELS * 1_000_000), binarize_image=IMAGE_BINARIZE)
+    metrics.count("mychat_image_prescreen_total", decision=decisions["decision"], reason=decisions.get("reason", ""))
+    return image, decisions
 
-            with open(json_output_path, 'w', encoding='utf-8') as json_file:
-                json.dump(json_data, json_file, ensure_ascii=False, indent=4)
+# Fatores de tempo real por modelo: os medidos no benchmark, se houver, senão os aproximados
+def load_realtime_factors():
+    factors = dict(DEFAULT_REALTIME_FACTORS)
+    if WHISPER_REALTIME_FACTORS_FILE:
+        try:
+            with open(WHISPER_REALTIME_FACTORS_FILE, 'r', encoding='utf-8') as f:
+                measured = json.load(f)["realtime_factors"]
+            backends = ("faster-whisper", "whisper-int8") if WHISPER_BACKEND == "auto" else (WHISPER_BACKEND,)
+            factors.update(next((measured[backend] for backend in backends if backend in measured), {}))
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"{Fore.YELLOW}Fatores de tempo real não lidos de {WHISPER_REALTIME_FACTORS_FILE}: {e}")
+    return factors
 
-            logging.info(f"{Fore.GREEN}Texto extraído e salvo em {json_output_path}")
-            return json_output_path
+whisper_realtime_factors = load_realtime_factors()
+
+# Função para escolher o modelo do Whisper de um arquivo (pela duração lida do cabeçalho)
+def whisper_model_for(file_path):
+    if WHISPER_MODEL_NAME != "auto":
+        return WHISPER_MODEL_NAME
+    return select_model(media_probe.media_duration(file_path), WHISPER_MODEL_POLICY, WHISPER_REALTIME_BUDGET,
+                        whisper_realtime_factors)
+
+# Função para processar arquivos de áudio e video (usando Whisper)
+def process_audio_video(file_path):
+    try:
+        model_name = whisper_model_for(file_path)
+        cache_config = {"extractor": "whisper", "model": model_name, "backend": WHISPER_BACKEND,
+                        "chunk_seconds": WHISPER_CHUNK_SECONDS, "overlap_seconds": WHISPER_CHUNK_OVERLAP_SECONDS}
+        if uses_video_ocr(file_path):
+            cache_config["video_ocr"] = {"fps": VIDEO_SAMPLE_FPS, "height": VIDEO_ANALYSIS_HEIGHT,
+                                         "change_fraction": VIDEO_CHANGE_FRACTION, **ocr_cache_config("video_frame")}
+        json_data = extract_with_cache(file_path, cache_config, lambda: extract_audio_video(file_path, model_name))
+
+        if json_data["content"]:
+            return save_json_output(file_path, json_data)
         else:
             logging.warning(f"{Fore.YELLOW}Nenhuma transcrição encontrada para áudio/video {file_path}.")
             return None
     except Exception as e:
         logging.error(f"{Fore.RED}Erro ao processar áudio/video {file_path}: {e}")
-        return None
+        raise
+
+def extract_audio_video(file_path, model_name):
+    logging.info(f"{Fore.CYAN}Processando áudio {file_path} com Whisper '{model_name}' ({WHISPER_BACKEND})...")
+
+    # Janelas já transcritas ficam em um arquivo parcial identificado pelo conteúdo e pelas janelas (retomada após falha)
+    partial_path = partial_path_for(cache_dir / "partial", result_cache.file_hash(file_path), model_name,
+                                    WHISPER_BACKEND, WHISPER_CHUNK_SECONDS, WHISPER_CHUNK_OVERLAP_SECONDS)
+    with metrics.stage("transcribe", model=model_name, backend=WHISPER_BACKEND):
+        result = transcribe_chunked(
+            file_path, model_name, partial_path,
+            chunk_seconds=WHISPER_CHUNK_SECONDS, overlap_seconds=WHISPER_CHUNK_OVERLAP_SECONDS,
+            workers=WHISPER_CHUNK_WORKERS, torch_threads=WHISPER_TORCH_THREADS,
+            backend=WHISPER_BACKEND, cpu_affinity=WHISPER_CPU_AFFINITY,
+        )
+    if result["segments"]:
+        metrics.count("mychat_media_seconds_total", result["segments"][-1]["end"])
 
-    ##### (Subfunção do PyMuPDF para processar imagem com OCR usando Tesseract)
-def process_image_pdf(img_path):
+    # Verificando se é áudio ou vídeo
+    media_type = "audio" if file_path.suffix.lower() in AUDIO_EXTENSIONS else "video"  # Caso contrário, consideramos como vídeo
+
+    json_data = {
+        "file_name": file_path.name,
+        "file_type": media_type,  # 'audio' ou 'video'
+        "content": result["text"],
+        "language": result["language"],
+        "model": model_name,
+        "segments": result["segments"]  # [{"start", "end", "text"}] em segundos
+    }
+    if uses_video_ocr(file_path):
+        frames = extract_video_text(file_path)
+        json_data["frames"] = frames  # [{"start", "end", "text"}]: texto na tela em cada intervalo
+        # Cada texto distinto entra uma vez no 'content', depois da transcrição (busca e índice)
+        screen_text = "\n\n".join(dict.fromkeys(frame["text"] for frame in frames))
+        json_data["content"] = "\n\n".join(filter(None, [json_data["content"], screen_text]))
+    return json_data
+
+def uses_video_ocr(file_path):
+    return VIDEO_OCR_ENABLED and file_path.suffix.lower() in VIDEO_OCR_EXTENSIONS
+
+# Função para extrair o texto na tela de um vídeo: os quadros são analisados em baixa resolução e só
+# os quadros-chave (mudança de cena) passam pelo OCR, na resolução original. Quadros-chave repetidos
+# reaproveitam o texto já extraído e intervalos seguidos com o mesmo texto viram um só.
+def extract_video_text(file_path):
+    from PIL import Image
+    import video_frames
+
+    logging.info(f"{Fore.CYAN}Procurando mudanças de cena no vídeo {file_path}...")
+    with metrics.stage("video_scenes"):
+        keyframes = list(video_frames.detect_keyframes(
+            video_frames.sample_frames(file_path, VIDEO_SAMPLE_FPS, VIDEO_ANALYSIS_HEIGHT),
+            change_fraction=VIDEO_CHANGE_FRACTION))
+    metrics.count("mychat_video_keyframes_total", len(keyframes))
+
+    frames = []
+    texts = []  # Texto de cada quadro-chave, na ordem
+    clip = video_frames.open_video(file_path)
     try:
-        logging.info(f"{Fore.CYAN}Processando {img_path} com OCR (Tesseract)...")
-        image = Image.open(img_path)  # Usar img_path aqui
-        custom_config = r'--oem 3 --psm 3 --dpi 300'
-        text = pytesseract.image_to_string(image, lang='por', config=custom_config)
+        for number, (start, frame_time, repeated) in enumerate(keyframes):
+            if repeated is not None:
+                text = texts[repeated]
+            else:
+                image = Image.fromarray(clip.get_frame(frame_time))
+                with metrics.stage("ocr", source="video_frame"):
+                    text = ocr_backend().image_to_string(image, dpi=TESSERACT_DPI)
+            texts.append(text)
+            text = text.strip()
+            end = float(keyframes[number + 1][0] if number + 1 < len(keyframes) else clip.duration)
+            if not text:
+                continue
+            if frames and " ".join(frames[-1]["text"].split()) == " ".join(text.split()):
+                frames[-1]["end"] = round(end, 2)  # Mesmo texto (só a imagem mudou): estender o intervalo
+            else:
+                frames.append({"start": round(float(start), 2), "end": round(end, 2), "text": text})
+    finally:
+        clip.close()
+    logging.info(f"{Fore.GREEN}Vídeo {file_path}: {len(keyframes)} quadros-chave, "
+                 f"{sum(repeated is None for _, _, repeated in keyframes)} com OCR, {len(frames)} trechos de texto")
+    return frames
+
+    ##### (Subfunção do PyMuPDF para processar com OCR a imagem de uma página, recebida em memória)
+    ##### Uma página com OCR falho faz o PDF inteiro falhar (o manifesto registra o erro e tenta de
+    ##### novo), em vez de o PDF sair sem a página
+def process_image_pdf(image_bytes, page_number):
+    try:
+        import io
+        from PIL import Image
+
+        logging.info(f"{Fore.CYAN}Processando página {page_number} com OCR (Tesseract)...")
+        image = Image.open(io.BytesIO(image_bytes))
+        with metrics.stage("ocr", source="pdf_page"):
+            text = ocr_backend().image_to_string(image, dpi=PDF_RENDER_DPI)
         return text
     except Exception as e:
-        logging.error(f"{Fore.RED}Erro ao processar imagem {img_path}: {e}")
-        return None
+        logging.error(f"{Fore.RED}Erro ao processar imagem da página {page_number}: {e}")
+        raise
+
+# Configuração do Tesseract para as páginas rasterizadas (a DPI informada é a usada na renderização)
+def pdf_tesseract_config():
+    return f"--oem 3 --psm 3 --dpi {PDF_RENDER_DPI}"
 
 # Função para processar arquivos PDF usando PyMuPDF (fitz) e OCR se necessário
 def process_pdf(file_path):
+    import fitz  # PyMuPDF
+
+    try:
+        with fitz.open(file_path) as doc:
+            pages = len(doc)
+        if use_streaming(file_path, pages):
+            logging.info(f"{Fore.CYAN}PDF {file_path} com {pages} páginas, extraindo em modo streaming...")
+            return save_streaming_output(file_path, "pdf", iter_pdf_pages(file_path))
+
+        cache_config = {"extractor": "pdf", "lang": TESSERACT_LANG, "config": pdf_tesseract_config()}
+        json_data = extract_with_cache(file_path, cache_config, lambda: extract_pdf(file_path))
+
+        # Verificar se algum texto foi extraído (do PDF ou das imagens)
+        if json_data["content"]:
+            return save_json_output(file_path, json_data)
+        else:
+            logging.warning(f"{Fore.YELLOW}Nenhum texto extraído do PDF {file_path}.")
+            return None
+    except fitz.FitzError as e:
+        logging.error(f"{Fore.RED}Erro ao abrir o PDF {file_path}: {e}")
+        raise
+    except Exception as e:
+        logging.error(f"{Fore.RED}Erro inesperado ao processar PDF {file_path}: {e}")
+        raise
+
+def extract_pdf(file_path):
+    return {
+        "file_name": file_path.name,
+        "file_type": "pdf",
+        "content": "".join(iter_pdf_pages(file_path))
+    }
+
+# Função para percorrer o texto das páginas de um PDF, na ordem, com OCR nas páginas sem texto.
+# As páginas são entregues assim que ficam prontas; no máximo 2 * PDF_OCR_WORKERS páginas
+# (renderizadas aguardando OCR ou já lidas aguardando as anteriores) ficam na memória.
+def iter_pdf_pages(file_path):
+    import fitz  # PyMuPDF
+
+    logging.info(f"{Fore.CYAN}Processando PDF {file_path} com PyMuPDF(fitz)...")
+
+    doc = fitz.open(file_path)
+    pending = deque()  # Texto da página ou futuro do OCR, na ordem das páginas
+    window = max(2, 2 * PDF_OCR_WORKERS)
+    ocr_pool = None  # Criado apenas se o PDF tiver páginas sem texto
+
     try:
-        logging.info(f"{Fore.CYAN}Processando PDF {file_path} com PyMuPDF(fitz)...")
-        
-        doc = fitz.open(file_path)
-        text = ""  # Inicializar como string vazia para armazenar o texto extraído
-        images_processed = False  # Flag para verificar se as imagens foram processadas
-        
-        # Definir text_dir para armazenar as imagens temporárias
-        text_dir = input_dir / 'text'  # Supondo que input_dir já está definido
-        
         for page_num in range(len(doc)):
             page = doc.load_page(page_num)
             page_text = page.get_text("text")  # Extrair texto da página
-            
+
             if page_text:
-                text += page_text  # Adiciona o texto extraído da página
+                pending.append(page_text)
+                metrics.count("mychat_pages_total", kind="text")
             else:
+                metrics.count("mychat_pages_total", kind="ocr")
+
                 # Se não houver texto, usar OCR para tentar extrair texto das imagens
                 logging.info(f"{Fore.CYAN}Nenhum texto extraído da página {page_num + 1}, tentando OCR...")
-                
-                # Obter a imagem da página e salvar temporariamente em 'text' (input_dir/text)
-                pix = page.get_pixmap()  # Criar a imagem da página
-                img_path = text_dir / f"page_{page_num + 1}.png"
-                img_path.parent.mkdir(parents=True, exist_ok=True)  # Garantir que o diretório exista
-                pix.save(img_path)
-                
-                # Usar OCR (Tesseract) para extrair texto da imagem
-                text_from_image = process_image_pdf(img_path)  # Processando a imagem com OCR
-                
-                if text_from_image:  # Verificar se o OCR retornou texto
-                    text += text_from_image  # Adiciona o texto extraído via OCR à variável 'text'
-                
-                # Excluir a imagem após o processamento
-                if img_path.exists():
-                    os.remove(img_path)
-                    logging.info(f"{Fore.YELLOW}Imagem temporária {img_path} excluída após processamento.")
-                
-                images_processed = True  # Marcar que uma imagem foi processada
 
-        # Verificar se algum texto foi extraído (do PDF ou das imagens)
-        if text:
-            json_data = {
-                "file_name": file_path.name,
-                "file_type": "pdf",
-                "content": text
-            }
+                # Rasterizar a página direto na memória, em tons de cinza, sem arquivo temporário
+                with metrics.stage("pdf_render"):
+                    pix = page.get_pixmap(dpi=PDF_RENDER_DPI, colorspace=fitz.csGRAY)
+                    image_bytes = pix.tobytes("png")
 
-           # Gerar nome de arquivo JSON com sufixo aleatório
-            random_suffix = generate_random_suffix()
-            json_file_name = f"{file_path.stem}-{random_suffix}.json"
-            json_output_path = processed_dir / file_path.relative_to(input_dir).parent / json_file_name
-            json_output_path.parent.mkdir(parents=True, exist_ok=True)
+                if PDF_OCR_WORKERS <= 1:
+                    pending.append(process_image_pdf(image_bytes, page_num + 1) or "")
+                else:
+                    if ocr_pool is None:
+                        if ocr_backend().in_process:
+                            # Engines em processo liberam o GIL: threads bastam e reaproveitam as engines carregadas
+                            ocr_pool = ThreadPoolExecutor(max_workers=PDF_OCR_WORKERS)
+                        else:
+                            ocr_pool = ProcessPoolExecutor(max_workers=PDF_OCR_WORKERS, initializer=init_ocr_worker)
+                    pending.append(ocr_pool.submit(process_image_pdf, image_bytes, page_num + 1))
 
-            with open(json_output_path, 'w', encoding='utf-8') as json_file:
-                json.dump(json_data, json_file, ensure_ascii=False, indent=4)
+            # Entregar as páginas prontas; com a janela cheia, esperar a mais antiga
+            while pending and (not isinstance(pending[0], Future) or pending[0].done() or len(pending) > window):
+                yield page_result(pending.popleft())
 
-            logging.info(f"{Fore.GREEN}Texto extraído e salvo em {json_output_path}")
-        else:
-            logging.warning(f"{Fore.YELLOW}Nenhum texto extraído do PDF {file_path}.")
-            return None
-    except fitz.FitzError as e:
-        logging.error(f"{Fore.RED}Erro ao abrir o PDF {file_path}: {e}")
-        return None
-    except Exception as e:
-        logging.error(f"{Fore.RED}Erro inesperado ao processar PDF {file_path}: {e}")
-        return None
+        while pending:
+            yield page_result(pending.popleft())
+    finally:
+        if ocr_pool is not None:
+            ocr_pool.shutdown(cancel_futures=True)
+        doc.close()
 
-    #### Subfunção para converter arquivo .doc para .docx usando LibreOffice
+def page_result(item):
+    return (item.result() or "") if isinstance(item, Future) else item
+
+    #### Subfunção para converter .doc/.odt/.rtf para .docx usando LibreOffice (em lotes, ver OfficeConverter)
 def convert_doc_to_docx(doc_path):
-    try:
-        if doc_path.suffix.lower() == '.doc':
-            logging.info(f"{Fore.GREEN}Convertendo arquivo {doc_path} de .doc para .docx usando LibreOffice")
-            
-            # Log para garantir que a função está sendo chamada
-            logging.info(f"{Fore.GREEN}Iniciando conversão de {doc_path}")
-            
-            # Comando para usar o LibreOffice em modo headless
-            cmd = [
-                "soffice", "--headless", "--convert-to", "docx", 
-                "--outdir", str(doc_path.parent.resolve()), str(doc_path.resolve())
-            ]
-            
-            # Imprime o comando que será executado no log
-            logging.info(f"Comando de conversão: {' '.join(cmd)}")
-            
-            # Rodando o comando e capturando a saída para depuração
-            result = subprocess.run(cmd, capture_output=True, text=True)
-
-            # Logando a saída e erro
-            if result.stdout:
-                logging.info(f"{Fore.GREEN}Saída do LibreOffice: {result.stdout}")
-            if result.stderr:
-                logging.error(f"{Fore.RED}Erro no LibreOffice: {result.stderr}")
-            
-            if result.returncode != 0:
-                logging.error(f"{Fore.RED}Erro na conversão: {result.returncode}")
-                return None
-
-            # Verificando se o arquivo convertido realmente existe
-            docx_path = doc_path.with_suffix('.docx')
-            if docx_path.exists():
-                logging.info(f"{Fore.GREEN}Arquivo convertido para {docx_path}")
-                return docx_path
-            else:
-                logging.error(f"{Fore.RED}Arquivo convertido não foi encontrado: {docx_path}")
-                return None
-        else:
-            logging.info(f"{Fore.YELLOW}Arquivo {doc_path} não é .doc, mantendo como está.")
-            return doc_path  # Se não for .doc, apenas retorna o arquivo original
-    except Exception as e:
-        logging.error(f"{Fore.RED}Erro ao converter o arquivo {doc_path} para DOCX: {e}")
-        return None
+    # Erros do conversor (TimeoutError, RuntimeError) seguem para o manifesto com a causa original
+    if doc_path.suffix.lower() in OFFICE_CONVERT_EXTENSIONS:
+        logging.info(f"{Fore.GREEN}Convertendo arquivo {doc_path} para .docx usando LibreOffice")
+        docx_path = office_converter.convert(doc_path)
+        logging.info(f"{Fore.GREEN}Arquivo convertido para {docx_path}")
+        check_deadline()
+        return docx_path
+    else:
+        logging.info(f"{Fore.YELLOW}Arquivo {doc_path} não precisa de conversão, mantendo como está.")
+        return doc_path  # Se não for um formato convertido, apenas retorna o arquivo original
 
-# Função para processar arquivos DOCX
+# Função para processar arquivos DOCX (e formatos convertidos para DOCX)
 def process_docx(file_path):
+    docx_path = None
     try:
-        # Verificar e converter arquivos .doc para .docx
-        file_path = convert_doc_to_docx(file_path) if file_path.suffix.lower() == '.doc' else file_path
-        if not file_path:
-            return None  # Se a conversão falhou, não prosseguir
+        # Verificar e converter .doc/.odt/.rtf para .docx (o convertido fica fora de 'input_dir')
+        docx_path = convert_doc_to_docx(file_path)
 
-        logging.info(f"Processando arquivo DOCX: {file_path}")
+        logging.info(f"Processando arquivo DOCX: {docx_path}")
 
-        doc = docx.Document(file_path)
-        text = "\n".join([para.text for para in doc.paragraphs])
+        if DOCX_EXTRACTOR == "stream" and is_streamable_docx(docx_path):
+            if use_streaming(file_path, size=docx_stream.document_size(docx_path)):
+                logging.info(f"{Fore.CYAN}DOCX {file_path} grande, extraindo em modo streaming...")
+                return save_streaming_output(file_path, "docx", docx_stream.iter_docx_text(docx_path))
+            with metrics.stage("docx_parse", extractor="stream"):
+                text = docx_stream.extract_docx_text(docx_path)
+        else:
+            with metrics.stage("docx_parse", extractor="python-docx"):
+                text = extract_docx_python_docx(docx_path)
 
         if text:
             json_data = {
@@ -273,32 +713,47 @@ def process_docx(file_path):
                 "content": text
             }
 
-            # Gerar nome de arquivo JSON com sufixo aleatório
-            random_suffix = generate_random_suffix()
-            json_file_name = f"{file_path.stem}-{random_suffix}.json"
-            json_output_path = output_dir / file_path.relative_to(input_dir).parent / json_file_name
-            json_output_path.parent.mkdir(parents=True, exist_ok=True)
-
-            with open(json_output_path, 'w', encoding='utf-8') as json_file:
-                json.dump(json_data, json_file, ensure_ascii=False, indent=4)
-
-            logging.info(f"{Fore.GREEN}Texto extraído e salvo em {json_output_path}")
-            return json_output_path
+            return save_json_output(file_path, json_data)
         else:
             logging.warning(f"{Fore.YELLOW}Nenhum texto extraído do DOCX {file_path}.")
             return None
     except (FileNotFoundError, IsADirectoryError) as e:
         logging.error(f"Erro de arquivo ao processar {file_path}: {e}")
-        return None
+        raise
     except Exception as e:
         logging.error(f"{Fore.RED}Erro inesperado ao processar o DOCX {file_path}: {e}")
-        return None
+        raise
+    finally:
+        # Apagar o .docx temporário gerado pela conversão
+        if docx_path and docx_path != file_path:
+            docx_path.unlink(missing_ok=True)
+
+# Função para verificar se o DOCX pode ser lido pelo extrator em streaming (zip válido com a parte
+# principal); senão o python-docx é usado
+def is_streamable_docx(docx_path):
+    try:
+        docx_stream.document_size(docx_path)
+        return True
+    except (zipfile.BadZipFile, KeyError) as e:
+        logging.warning(f"{Fore.YELLOW}DOCX {docx_path} fora do padrão ({e}), usando o python-docx...")
+        return False
+
+# Extração pelo modelo de objetos do python-docx (só os parágrafos do corpo)
+def extract_docx_python_docx(docx_path):
+    import docx
+
+    doc = docx.Document(docx_path)
+    return "\n".join([para.text for para in doc.paragraphs])
 
 # Função para processar arquivos de código
 def process_code(file_path):
     try:
+        if use_streaming(file_path):
+            logging.info(f"{Fore.CYAN}Processando código {file_path} em modo streaming...")
+            return save_streaming_output(file_path, "code", iter_text_file(file_path))
+
         logging.info(f"{Fore.CYAN}Processando código {file_path}...")
-        with open(file_path, 'r', encoding='utf-utf-8') as f:
+        with open(file_path, 'r', encoding='utf-8') as f:
             code = f.read()
 
         if code:
@@ -308,77 +763,485 @@ def process_code(file_path):
                 "content": code
             }
 
-            # Gerar nome de arquivo JSON com sufixo aleatório
-            random_suffix = generate_random_suffix()
-            json_file_name = f"{file_path.stem}-{random_suffix}.json"
-            json_output_path = output_dir / file_path.relative_to(input_dir).parent / json_file_name
-            json_output_path.parent.mkdir(parents=True, exist_ok=True)
-
-            with open(json_output_path, 'w', encoding='utf-8') as json_file:
-                json.dump(json_data, json_file, ensure_ascii=False, indent=4)
-
-            logging.info(f"{Fore.GREEN}Código extraído e salvo em {json_output_path}")
-            return json_output_path
+            return save_json_output(file_path, json_data)
         else:
             logging.warning(f"{Fore.YELLOW}Nenhum código extraído de {file_path}.")
             return None
     except Exception as e:
         logging.error(f"{Fore.RED}Erro ao processar código {file_path}: {e}")
-        return None
+        raise
+
+# Função para ler um arquivo de texto em blocos de STREAM_CHUNK_KB
+def iter_text_file(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield from iter(lambda: f.read(STREAM_CHUNK_KB * 1024), '')
 
-# Função para processar um único arquivo
+# Função executada pelos pools para cada arquivo: mede o arquivo inteiro (e, se pedido, roda
+# sob o cProfile) e devolve as métricas coletadas no processo do pool para o processo principal
 def process_file(file):
+    media_class = get_media_class(file)
+    if metrics.enabled:
+        try:
+            metrics.count("mychat_bytes_total", file.stat().st_size, media=media_class)
+        except OSError:
+            pass
+    with metrics.stage("file", media=media_class):
+        if PROFILE_FILE_PATTERN and fnmatch.fnmatch(file.name, PROFILE_FILE_PATTERN):
+            metrics.profile_call(logs_dir / f"profile-{file.name}.prof", handle_file, file)
+        else:
+            handle_file(file)
+    return metrics.drain()
+
+# Chave do arquivo no manifesto: caminho relativo a 'input_dir'
+def job_key(file):
+    return str(file.relative_to(input_dir))
+
+# Função para processar um único arquivo. Um erro deixa o original em 'input_dir' e fica
+# registrado no manifesto, que libera uma nova tentativa depois da espera.
+def handle_file(file):
+    media_class = get_media_class(file)
+    key = job_key(file)
     try:
-        output_path = create_dir_structure(file, output_dir)
-        processed_path = create_dir_structure(file, processed_dir)
+        job_manifest.start(key, result_cache.file_hash(file))
 
         text_file = None
-        if file.suffix.lower() in [
-            '.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp', '.gif', 
-            '.pbm', '.pgm', '.ppm'
-        ]:
-            text_file = process_image(file)
+        suffix = file.suffix.lower()
+        if suffix in IMAGE_EXTENSIONS:
+            with metrics.stage("extract", handler="image"):
+                text_file = process_image(file)
+
+        elif suffix in AUDIO_EXTENSIONS or suffix in VIDEO_EXTENSIONS:
+            with metrics.stage("extract", handler="audio_video"):
+                text_file = process_audio_video(file)
+
+        elif suffix in PDF_EXTENSIONS:
+            with metrics.stage("extract", handler="pdf"):
+                text_file = process_pdf(file)
+
+        elif suffix in DOCX_EXTENSIONS or suffix in OFFICE_CONVERT_EXTENSIONS:
+            with metrics.stage("extract", handler="docx"):
+                text_file = process_docx(file)
 
-        elif file.suffix.lower() in [
-            '.mp3', '.wav', '.flac', '.au', '.dts', '.m4a', '.mp2', '.ogg',
-            '.opus', '.spx', '.wma', '.aiff', '.ac3', '.aac', '.aif', '.caf', 
-            '.eac3', '.pcm', '.mp4', '.flv', '.avi', '.mov', '.mkv'
-            ]:
-            text_file = process_audio_video(file)
+        elif suffix in CODE_EXTENSIONS:
+            with metrics.stage("extract", handler="code"):
+                text_file = process_code(file)
 
-        elif file.suffix.lower() == '.pdf':
-            text_file = process_pdf(file)
+        if OUTPUT_BACKEND == "jsonl":
+            # O registro só é durável depois do fsync do lote; gravar antes de marcar a saída como pronta
+            output_store.flush()
+        job_manifest.extracted(key, text_file)
 
-        elif file.suffix.lower() == '.docx':
-            text_file = process_docx(file)
+        with metrics.stage("move"):
+            finish_job(file, key, text_file)
 
-        elif file.suffix.lower() in ['.py', '.java', '.cpp', '.js', '.html']:
-            text_file = process_code(file)
+        metrics.count("mychat_files_total", media=media_class, result="extracted" if text_file else "no_output")
 
+    except Exception as e:
+        metrics.count("mychat_errors_total", media=media_class, stage="file")
+        logging.error(f"{Fore.RED}Erro ao processar o arquivo {file}: {e}")
+        job_manifest.fail(key, e)
+
+# Função para concluir um arquivo já extraído: move o original para 'output_dir' e o JSON para
+# 'processed_dir'. Pode ser repetida (retomada após queda): cada passo já feito é ignorado.
+def finish_job(file, key, text_file):
+    if file.exists():
+        output_path = create_dir_structure(file, output_dir)
         # Mover o arquivo original para a pasta de saída
         shutil.move(file, output_path)
         logging.info(f"{Fore.BLUE}Arquivo original movido para {output_path}")
 
-        # Se o arquivo de texto foi gerado, mover para processed_dir
-        if text_file:
-            processed_json_path = processed_dir / text_file.relative_to(output_dir)
+    # Se o arquivo de texto foi gerado, mover para processed_dir
+    processed_json_path = None
+    if text_file:
+        text_file = Path(text_file)
+        processed_json_path = processed_dir / text_file.relative_to(output_dir)
+        if text_file.exists():
             processed_json_path.parent.mkdir(parents=True, exist_ok=True)
             shutil.move(text_file, processed_json_path)
             logging.info(f"{Fore.GREEN}Arquivo JSON movido para {processed_json_path}")
+    job_manifest.done(key, processed_json_path)
+
+# Função para concluir os arquivos que uma execução anterior deixou no meio do caminho
+def recover_jobs():
+    for key, text_file in job_manifest.recover():
+        try:
+            finish_job(input_dir / key, key, text_file)
+            logging.info(f"{Fore.GREEN}Arquivo {key} concluído a partir do manifesto.")
+        except Exception as e:
+            logging.error(f"{Fore.RED}Erro ao concluir {key} a partir do manifesto: {e}")
+            job_manifest.fail(key, e)
+
+# Função para decidir pelo manifesto se um arquivo de 'input_dir' deve ir para os pools
+def claim_file(file):
+    try:
+        decision = job_manifest.claim(job_key(file), file, result_cache.file_hash)
+    except OSError as e:
+        logging.error(f"{Fore.RED}Erro ao consultar o arquivo {file}: {e}")
+        return False
+    if decision == DONE:
+        # Mesmo conteúdo já processado: só mover o original, sem extrair de novo
+        logging.info(f"{Fore.YELLOW}Arquivo {file} sem mudanças desde o último processamento, ignorado.")
+        output_path = create_dir_structure(file, output_dir)
+        shutil.move(file, output_path)
+        return False
+    return decision == PROCESS
+
+# Função para descobrir qual pool deve processar o arquivo (usa as mesmas listas de process_file)
+def get_media_class(file):
+    suffix = file.suffix.lower()
+    if suffix in IMAGE_EXTENSIONS or suffix in PDF_EXTENSIONS:
+        return 'ocr'
+    if suffix in AUDIO_EXTENSIONS or suffix in VIDEO_EXTENSIONS:
+        return 'whisper'
+    return 'light'  # Código, DOCX e arquivos não reconhecidos (apenas movidos)
+
+# Função para pré-carregar dependências e modelos de uma classe de mídia (uso prolongado)
+def warm_up(media_class):
+    warm_start = time.perf_counter()
+    if media_class == 'ocr':
+        import fitz  # noqa: F401
+        from PIL import Image  # noqa: F401
+        ocr_backend()
+    elif media_class == 'whisper':
+        if WHISPER_MODEL_NAME != "auto":
+            get_transcriber(WHISPER_MODEL_NAME, WHISPER_BACKEND)
+        else:
+            for model_name in dict.fromkeys(model for _, model in parse_model_policy(WHISPER_MODEL_POLICY)):
+                get_transcriber(model_name, WHISPER_BACKEND)
+    elif media_class == 'light' and DOCX_EXTRACTOR == "python-docx":
+        import docx  # noqa: F401
+    logging.info(f"{Fore.GREEN}Aquecimento de '{media_class}' concluído em {time.perf_counter() - warm_start:.1f}s")
+
+# Inicializador dos processos de OCR: o Tesseract não deve abrir threads extras em cada processo
+def init_ocr_worker(warm=False):
+    # Ctrl+C chega a todo o grupo de processos: quem decide parar (drenando) é o processo principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    if warm:
+        warm_up('ocr')
 
+# Inicializador dos processos do Whisper: limita as threads do torch em cada processo e, com
+# 'slots', fixa cada processo em um bloco de CPUs próprio
+def init_whisper_worker(warm=False, slots=None):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ver init_ocr_worker
+    set_cpu_threads(WHISPER_TORCH_THREADS, slots)
+    if warm:
+        warm_up('whisper')
+
+# Função para criar o pool de uma classe de mídia
+def create_pool(media_class, warm=False):
+    if media_class == 'ocr':
+        # 'forkserver': um fork do processo principal, que já tem threads rodando (pool leve, conversor
+        # do LibreOffice, métricas), poderia herdar uma trava presa e travar o processo filho
+        return ProcessPoolExecutor(max_workers=OCR_WORKERS, initializer=init_ocr_worker, initargs=(warm,),
+                                   mp_context=multiprocessing.get_context('forkserver'))
+    if media_class == 'whisper':
+        # 'spawn' evita herdar o estado de threads do torch já inicializado no processo principal
+        whisper_context = multiprocessing.get_context('spawn')
+        whisper_slots = whisper_context.Value('i', 0) if WHISPER_CPU_AFFINITY else None
+        return ProcessPoolExecutor(max_workers=WHISPER_WORKERS, initializer=init_whisper_worker,
+                                   initargs=(warm, whisper_slots), mp_context=whisper_context)
+    return ThreadPoolExecutor(max_workers=LIGHT_WORKERS)
+
+# Função para criar um pool separado para cada classe de mídia
+def create_pools(warm=False):
+    logging.info(f"{Fore.GREEN}Pools: OCR={OCR_WORKERS}, Whisper={WHISPER_WORKERS} "
+                 f"(torch threads={WHISPER_TORCH_THREADS}), leve={LIGHT_WORKERS}")
+    pools = {media_class: create_pool(media_class, warm) for media_class in ('ocr', 'whisper', 'light')}
+    if warm:
+        # Os processos só são criados no primeiro submit; força a criação para aquecer já na partida
+        for media_class in ('ocr', 'whisper'):
+            pools[media_class].submit(time.sleep, 0)
+        warm_up('light')
+    return pools
+
+# Função para registrar tempo de inicialização e pico de memória (para acompanhar regressões)
+def report_resource_usage(stage):
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss em KB no Linux
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    usage = {
+        "timestamp": time.time(),
+        "stage": stage,
+        "elapsed_seconds": round(time.perf_counter() - start_time, 3),
+        "peak_rss_mb": round(own, 1),
+        "peak_rss_children_mb": round(children, 1),
+    }
+    logging.info(f"{Fore.BLUE}[{stage}] {usage['elapsed_seconds']}s desde a importação, "
+                 f"pico de memória {usage['peak_rss_mb']} MB (processos filhos: {usage['peak_rss_children_mb']} MB)")
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    with open(logs_dir / "resource_usage.jsonl", 'a', encoding='utf-8') as log_file:
+        log_file.write(json.dumps(usage) + "\n")
+
+# Função para estimar o custo (segundos) de um arquivo antes de enviá-lo, lendo só os cabeçalhos
+def estimate_cost(file):
+    suffix = file.suffix.lower()
+    size_mb = file.stat().st_size / (1024 * 1024)
+    if suffix in PDF_EXTENSIONS:
+        return media_probe.pdf_page_count(file) * PDF_PAGE_SECONDS
+    if suffix in IMAGE_EXTENSIONS:
+        return IMAGE_SECONDS + size_mb
+    if suffix in AUDIO_EXTENSIONS or suffix in VIDEO_EXTENSIONS:
+        model_name = whisper_model_for(file)
+        return media_probe.media_duration(file) * whisper_realtime_factors.get(model_name, 1.0)
+    cost = 0.05 + size_mb * LIGHT_SECONDS_PER_MB
+    if suffix in OFFICE_CONVERT_EXTENSIONS:
+        cost += OFFICE_CONVERT_SECONDS
+    return cost
+
+# Função para preparar um arquivo para o agendador: reserva no manifesto e custo estimado
+# (None = não processar)
+def prepare_job(file):
+    if not claim_file(file):
+        return None
+    try:
+        return estimate_cost(file)
     except Exception as e:
-        logging.error(f"{Fore.RED}Erro ao processar o arquivo {file}: {e}")
+        logging.warning(f"{Fore.YELLOW}Custo de {file} não estimado: {e}")
+        return 0.0
+
+# Função para percorrer os arquivos de 'input_dir' uma única vez, sob demanda: (classe de mídia, arquivo)
+def scan_input():
+    for subfolder in subfolders:
+        subfolder_path = input_dir / subfolder
+        if subfolder_path.exists():
+            # Usando rglob para encontrar todos os arquivos em subpastas recursivamente
+            for file in subfolder_path.rglob('*'):
+                if file.is_file():
+                    yield get_media_class(file), file
+
+# Há quanto tempo um arquivo está sendo processado, pelo início registrado no manifesto pelo próprio
+# pool (job_manifest.start); None enquanto o arquivo espera na fila interna do pool
+def job_elapsed(file):
+    row = job_manifest.get(job_key(file))
+    if row is None or row["state"] != "running" or not row["started_at"]:
+        return None
+    return time.time() - row["started_at"]
+
+# Função para criar o agendador dos pools
+def create_scheduler(pools):
+    capacity = {
+        'ocr': OCR_WORKERS * SCHEDULER_IN_FLIGHT_PER_WORKER,
+        'whisper': WHISPER_WORKERS * SCHEDULER_IN_FLIGHT_PER_WORKER,
+        'light': LIGHT_WORKERS * SCHEDULER_IN_FLIGHT_PER_WORKER,
+    }
+    return Scheduler(lambda file, timeout: submit_file(pools, file, timeout), prepare_job, capacity,
+                     policy=SCHEDULER_POLICY, lookahead=SCHEDULER_LOOKAHEAD, timeout_factor=JOB_TIMEOUT_FACTOR,
+                     min_timeout=JOB_MIN_TIMEOUT_SECONDS, reserve=SCHEDULER_SCAN_RESERVE, elapsed=job_elapsed)
+
+def log_scheduler_stats(scheduler):
+    stats = scheduler.stats
+    logging.info(f"{Fore.GREEN}Agendador ({scheduler.policy}): {stats['completed']}/{stats['submitted']} "
+                 f"arquivos concluídos, custo estimado {stats['estimated_seconds']:.0f}s, "
+                 f"{stats['timed_out']} acima do tempo limite")
+
+# Erro levantado nos pools quando um arquivo passa do tempo limite
+class JobTimeout(Exception):
+    pass
+
+# Prazo do arquivo em andamento em cada thread do pool leve. Threads não podem ser interrompidas:
+# os laços longos (partes do modo streaming, conversão do LibreOffice) consultam o prazo com
+# check_deadline e desistem do arquivo com JobTimeout.
+job_deadline = threading.local()
+
+def check_deadline():
+    deadline = getattr(job_deadline, "value", None)
+    if deadline is not None and time.monotonic() > deadline[0]:
+        raise JobTimeout(f"tempo limite de {deadline[1]:.0f}s excedido")
+
+# Função executada pelo pool leve com tempo limite (contado a partir do início na thread)
+def process_file_with_deadline(file, timeout):
+    job_deadline.value = (time.monotonic() + timeout, timeout)
+    try:
+        return process_file(file)
+    finally:
+        job_deadline.value = None
+
+# Função executada pelos pools de processos com tempo limite: o SIGALRM interrompe o arquivo
+# (o erro é registrado no manifesto como uma falha comum, com nova tentativa depois da espera)
+def process_file_with_timeout(file, timeout):
+    def on_alarm(signum, frame):
+        raise JobTimeout(f"tempo limite de {timeout:.0f}s excedido")
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return process_file(file)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+# Função para enviar um arquivo ao pool da sua classe, acompanhando o trabalho em andamento.
+# O tempo limite é aplicado pelo SIGALRM nos pools de processos e pelo prazo consultado nos laços
+# longos no pool leve (o agendador registra no log os que ainda assim passam do limite).
+def submit_file(pools, file, timeout=0):
+    media_class = get_media_class(file)
+    try:
+        future = submit_to_pool(pools[media_class], file, timeout)
+    except BrokenProcessPool:
+        # Um processo do pool morreu (falta de memória, falha em uma biblioteca nativa): o pool não
+        # aceita mais trabalhos. Os arquivos que estavam nele já foram marcados como falha
+        # (on_pool_broken); um pool novo recebe este e os próximos. Os processos novos não são
+        # aquecidos: os modelos são carregados no primeiro arquivo.
+        logging.error(f"{Fore.RED}Pool '{media_class}' interrompido por um processo que terminou "
+                      f"inesperadamente, criando um novo.")
+        pools[media_class].shutdown(wait=False, cancel_futures=True)
+        pools[media_class] = create_pool(media_class)
+        future = submit_to_pool(pools[media_class], file, timeout)
+    future.add_done_callback(lambda done: on_pool_broken(file, done))
+    if metrics.enabled:
+        metrics.gauge_add("mychat_pool_in_flight", 1, pool=media_class)
+        future.add_done_callback(lambda done: on_file_done(media_class, done))
+    return future
+
+def submit_to_pool(pool, file, timeout):
+    if not timeout:
+        return pool.submit(process_file, file)
+    if isinstance(pool, ProcessPoolExecutor):
+        return pool.submit(process_file_with_timeout, file, timeout)
+    return pool.submit(process_file_with_deadline, file, timeout)
+
+# Um arquivo cujo processo morreu não chega a registrar o erro no manifesto: registrar aqui, para
+# que a espera entre as tentativas (e o limite de tentativas) também valha para ele
+def on_pool_broken(file, future):
+    if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+        return
+    logging.error(f"{Fore.RED}Erro ao processar o arquivo {file}: {future.exception()}")
+    job_manifest.fail(job_key(file), future.exception())
+
+def on_file_done(media_class, future):
+    metrics.gauge_add("mychat_pool_in_flight", -1, pool=media_class)
+    if not future.cancelled() and future.exception() is None:
+        metrics.merge(future.result())
+
+# Função para iniciar a exportação das métricas no processo principal
+def start_metrics():
+    metrics.start(events_path=METRICS_EVENTS_FILE, prometheus_file=METRICS_PROMETHEUS_FILE,
+                  http_port=METRICS_HTTP_PORT)
+
+# Função para atualizar o índice de texto com os resultados novos. Na primeira vez percorre
+# 'processed_dir' inteiro; depois usa o manifesto para achar só os JSON concluídos desde a última vez.
+def update_text_index():
+    if not TEXT_INDEX_ENABLED:
+        return
+    try:
+        with metrics.stage("text_index"):
+            if OUTPUT_BACKEND == "jsonl":
+                text_index.add_jsonl_store(output_store)
+                return
+            started = time.time()
+            last_update = float(text_index.get_meta("manifest_watermark", 0))
+            if not last_update:
+                text_index.sync_directory(processed_dir)
+            else:
+                text_index.add_json_files(job_manifest.outputs_since(last_update - TEXT_INDEX_OVERLAP_SECONDS))
+            text_index.set_meta("manifest_watermark", started)
+    except Exception as e:
+        logging.error(f"{Fore.RED}Erro ao atualizar o índice de texto: {e}")
+
+# Função para registrar o resumo do manifesto no final da execução
+def log_job_stats():
+    stats = job_manifest.stats()
+    logging.info(f"{Fore.GREEN}Manifesto: {stats.get('done', 0)} concluídos, {stats.get('failed', 0)} aguardando "
+                 f"nova tentativa, {stats.get('dead', 0)} sem novas tentativas")
+
+# Função para encerrar os pools esperando os arquivos em andamento
+def shutdown_pools(pools, wait=True, cancel_futures=False):
+    for pool in pools.values():
+        pool.shutdown(wait=wait, cancel_futures=cancel_futures)
 
 # Função principal para processar todos os tipos de arquivos
-def process_files():
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        for subfolder in subfolders:
-            subfolder_path = input_dir / subfolder
-            if subfolder_path.exists():
-                # Usando rglob para encontrar todos os arquivos em subpastas recursivamente
-                for file in subfolder_path.rglob('*'):
+def process_files(warm=False):
+    report_resource_usage("startup")
+    start_metrics()
+    pools = create_pools(warm)
+    scheduler = create_scheduler(pools)
+    try:
+        recover_jobs()
+        # Uma varredura só, lida aos poucos e distribuída às filas dos pools: um pool cheio não impede
+        # os outros de receber arquivos
+        scheduler.run(scan_input())
+    finally:
+        shutdown_pools(pools)
+        log_scheduler_stats(scheduler)
+        office_converter.close()
+        output_store.close()
+        update_text_index()
+        stats = result_cache.stats()
+        logging.info(f"{Fore.GREEN}Cache de resultados: {stats['hits']} acertos, {stats['misses']} falhas, "
+                     f"{stats['entries']} entradas ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+        log_job_stats()
+        metrics.flush()
+        report_resource_usage("finished")
+
+# Modo daemon: observa 'input_dir' e envia cada arquivo novo aos pools assim que termina de ser escrito.
+# Os pools (e os modelos carregados nos processos) permanecem ativos entre os arquivos.
+def watch_files(warm=False):
+    from file_watcher import FileWatcher
+
+    report_resource_usage("startup")
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        logging.info(f"{Fore.YELLOW}Sinal {signum} recebido, encerrando após os arquivos em andamento...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    start_metrics()
+    pools = create_pools(warm)
+    scheduler = create_scheduler(pools)
+
+    def schedule(file):
+        cost = prepare_job(file)
+        if cost is not None:
+            scheduler.add(file, get_media_class(file), cost)
+
+    watcher = FileWatcher([input_dir / subfolder for subfolder in subfolders],
+                          debounce_seconds=WATCH_DEBOUNCE_SECONDS, poll_interval=WATCH_POLL_INTERVAL)
+    watcher.start()
+    recover_jobs()
+    next_retry_check = time.monotonic() + JOB_RETRY_CHECK_INTERVAL
+    next_index_update = time.monotonic() + TEXT_INDEX_INTERVAL
+    logging.info(f"{Fore.GREEN}Modo daemon iniciado, aguardando arquivos em {input_dir}...")
+    try:
+        while not stop_event.is_set():
+            for file in watcher.ready_files(timeout=0.1):
+                schedule(file)
+            if time.monotonic() >= next_retry_check:
+                # Arquivos que falharam e cuja espera terminou
+                for key in job_manifest.due_retries():
+                    file = input_dir / key
                     if file.is_file():
-                        executor.submit(process_file, file)
+                        schedule(file)
+                scheduler.check_timeouts()
+                next_retry_check = time.monotonic() + JOB_RETRY_CHECK_INTERVAL
+            scheduler.dispatch()
+            if time.monotonic() >= next_index_update:
+                if OUTPUT_BACKEND == "jsonl":
+                    output_store.flush()
+                update_text_index()
+                next_index_update = time.monotonic() + TEXT_INDEX_INTERVAL
+    finally:
+        watcher.stop()
+        # Arquivos ainda na fila continuam em 'input_dir' e serão processados na próxima execução
+        shutdown_pools(pools, cancel_futures=True)
+        log_scheduler_stats(scheduler)
+        office_converter.close()
+        output_store.close()
+        update_text_index()
+        log_job_stats()
+        metrics.flush()
+        report_resource_usage("finished")
 
 if __name__ == "__main__":
-    process_files()
+    parser = argparse.ArgumentParser(description="Processa os arquivos de 'input_dir' e extrai o texto em JSON.")
+    parser.add_argument("--warm-up", action="store_true",
+                        help="Carrega dependências e modelos na partida em vez de no primeiro arquivo")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Fica em execução observando 'input_dir' em vez de processar uma vez e sair")
+    args = parser.parse_args()
+    if args.daemon:
+        watch_files(warm=args.warm_up)
+    else:
+        process_files(warm=args.warm_up)
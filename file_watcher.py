@@ -0,0 +1,165 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from colorama import Fore
+
+try:
+    # watchdog usa inotify no Linux; sem ele caímos para a varredura periódica
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# Arquivos que ainda estão sendo enviados ou são temporários de outros programas
+IGNORED_SUFFIXES = ('.part', '.tmp', '.crdownload', '.partial', '.swp')
+
+
+# Função para saber se um arquivo deve ser ignorado pelo observador
+def is_ignored(path):
+    return path.name.startswith('.') or path.name.endswith(IGNORED_SUFFIXES)
+
+
+# Recebe os eventos do inotify (via watchdog) e repassa para o FileWatcher
+class InotifyHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.touch(Path(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.touch(Path(event.src_path))
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.forget(Path(event.src_path))
+            self.watcher.touch(Path(event.dest_path))
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.watcher.forget(Path(event.src_path))
+
+    # IN_CLOSE_WRITE: o programa que escrevia o arquivo terminou, não é preciso esperar o debounce
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.watcher.touch(Path(event.src_path), closed=True)
+
+
+# Observa as pastas de entrada e entrega apenas arquivos que pararam de ser escritos.
+# Um arquivo é considerado estável quando tamanho e mtime não mudam por 'debounce_seconds'.
+class FileWatcher:
+    def __init__(self, folders, debounce_seconds=0.5, poll_interval=0.5):
+        self.folders = [Path(folder) for folder in folders]
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        self.pending = {}  # caminho -> (tamanho, mtime, momento da última mudança, fechado)
+        self.dispatched = {}  # caminho -> (tamanho, mtime) já entregue, para não entregar duas vezes
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.observer = None
+        self.poll_thread = None
+
+    # Função para iniciar a observação (inotify se disponível, senão varredura periódica)
+    def start(self):
+        if Observer is not None:
+            self.observer = Observer()
+            handler = InotifyHandler(self)
+            for folder in self.folders:
+                folder.mkdir(parents=True, exist_ok=True)
+                self.observer.schedule(handler, str(folder), recursive=True)
+            self.observer.start()
+            logging.info(f"{Fore.GREEN}Observando {len(self.folders)} pastas com inotify.")
+            self.scan()  # Arquivos que já estavam nas pastas antes do início
+        else:
+            logging.warning(f"{Fore.YELLOW}watchdog não instalado, usando varredura a cada {self.poll_interval}s.")
+            self.poll_thread = threading.Thread(target=self.poll_loop, name="file-watcher-poll", daemon=True)
+            self.poll_thread.start()
+
+    # Função para parar a observação
+    def stop(self):
+        self.stop_event.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        if self.poll_thread is not None:
+            self.poll_thread.join()
+
+    # Varredura completa das pastas (início e modo sem inotify)
+    def scan(self):
+        seen = set()
+        for folder in self.folders:
+            for root, _, files in os.walk(folder):
+                for name in files:
+                    path = Path(root) / name
+                    seen.add(path)
+                    self.touch(path)
+        with self.lock:
+            # Arquivos que saíram das pastas (já processados e movidos) deixam de ser rastreados
+            for path in [path for path in self.dispatched if path not in seen]:
+                del self.dispatched[path]
+
+    def poll_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                self.scan()
+            except OSError as e:
+                logging.error(f"{Fore.RED}Erro ao varrer as pastas de entrada: {e}")
+            self.stop_event.wait(self.poll_interval)
+
+    # Função chamada quando um arquivo aparece ou muda
+    def touch(self, path, closed=False):
+        if is_ignored(path):
+            return
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.forget(path)
+            return
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            if self.dispatched.get(path) == signature:
+                return
+            previous = self.pending.get(path)
+            if previous is None or previous[:2] != signature:
+                self.pending[path] = (*signature, time.monotonic(), closed)
+            elif closed:
+                self.pending[path] = (*previous[:3], True)
+
+    # Função chamada quando um arquivo é removido ou renomeado
+    def forget(self, path):
+        with self.lock:
+            self.pending.pop(path, None)
+            self.dispatched.pop(path, None)
+
+    # Função para obter os arquivos prontos (estáveis pelo tempo de debounce ou já fechados)
+    def ready_files(self, timeout=0.1):
+        self.stop_event.wait(timeout)
+        now = time.monotonic()
+        ready = []
+        with self.lock:
+            candidates = list(self.pending.items())
+        for path, (size, mtime_ns, changed_at, closed) in candidates:
+            if not closed and now - changed_at < self.debounce_seconds:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                self.forget(path)
+                continue
+            with self.lock:
+                current = self.pending.get(path)
+                if current is None or current[:2] != (size, mtime_ns):
+                    continue  # Foi removido ou alterado enquanto verificávamos
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                    # Ainda está sendo escrito: reinicia o debounce
+                    self.pending[path] = (stat.st_size, stat.st_mtime_ns, now, False)
+                    continue
+                del self.pending[path]
+                self.dispatched[path] = (size, mtime_ns)
+            ready.append(path)
+        return ready
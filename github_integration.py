@@ -1,17 +1,184 @@
-import requests
-from github import Github
+import json
 import logging
+import os
+import tarfile
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
 
 # Configuração da API do GitHub
-GITHUB_TOKEN = "your_github_token"  # Substitua pelo seu token do GitHub
-g = Github(GITHUB_TOKEN)
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN") or "your_github_token"  # Substitua pelo seu token do GitHub
+# URL base da API (um servidor local nos testes, ou um GitHub Enterprise)
+GITHUB_API_URL = os.environ.get("MYCHAT_GITHUB_API_URL") or "https://api.github.com"
+GITHUB_CACHE_DIR = Path(os.environ.get("MYCHAT_DATA_DIR") or Path(__file__).parent) / "cache" / "github"
+GITHUB_MAX_CONNECTIONS = int(os.environ.get("MYCHAT_GITHUB_MAX_CONNECTIONS") or 8)
+GITHUB_TIMEOUT_SECONDS = 30
+MAX_FILE_BYTES = 1024 * 1024  # Arquivos maiores que isso são ignorados
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 # Inicializando o logger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+
+# Busca o código de repositórios inteiros com uma requisição de tarball por repositório.
+# O commit atual de cada ref é consultado com If-None-Match: se nada mudou a API responde 304
+# (sem corpo e sem contar no limite de requisições) e o tarball já baixado é reutilizado.
+# Os tarballs ficam em disco, identificados pelo SHA do commit; vários repositórios são buscados
+# em paralelo, limitados pelo pool de conexões da sessão.
+class GithubFetcher:
+    def __init__(self, api_url=GITHUB_API_URL, token=GITHUB_TOKEN, cache_dir=GITHUB_CACHE_DIR,
+                 max_connections=GITHUB_MAX_CONNECTIONS, timeout=GITHUB_TIMEOUT_SECONDS):
+        self.api_url = api_url.rstrip("/")
+        self.cache_dir = Path(cache_dir)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections, max_retries=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = "mychat-github-integration"
+        if token and token != "your_github_token":
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self.stats = {"not_modified": 0, "tarballs": 0, "cached": 0}
+        self.stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def _repo_dir(self, repo_name):
+        owner, _, repo = repo_name.partition("/")
+        return self.cache_dir / owner / repo
+
+    def _load_refs(self, repo_dir):
+        try:
+            with open(repo_dir / "refs.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # Arquivo temporário com nome próprio na pasta do repositório: buscas simultâneas do mesmo
+    # repositório (outra thread ou outro processo) não escrevem no mesmo temporário
+    def _temporary_file(self, repo_dir, name, mode):
+        return tempfile.NamedTemporaryFile(mode, dir=repo_dir, prefix=f"{name}.", suffix=".part", delete=False,
+                                           **({"encoding": "utf-8"} if "b" not in mode else {}))
+
+    def _save_refs(self, repo_dir, refs):
+        with self._temporary_file(repo_dir, "refs.json", "w") as f:
+            temporary = Path(f.name)
+            try:
+                json.dump(refs, f)
+            except BaseException:
+                f.close()
+                temporary.unlink(missing_ok=True)
+                raise
+        temporary.replace(repo_dir / "refs.json")
+
+    # Função para obter o SHA do commit de uma ref com requisição condicional (ETag)
+    def resolve_commit(self, repo_name, ref="HEAD"):
+        repo_dir = self._repo_dir(repo_name)
+        cached = self._load_refs(repo_dir).get(ref)
+        headers = {"Accept": "application/vnd.github.sha"}
+        if cached and (repo_dir / f"{cached['sha']}.tar.gz").exists():
+            headers["If-None-Match"] = cached["etag"]
+        response = self.session.get(f"{self.api_url}/repos/{repo_name}/commits/{ref}", headers=headers,
+                                    timeout=self.timeout)
+        if response.status_code == 304:
+            self._count("not_modified")
+            return cached["sha"], False
+        response.raise_for_status()
+        return response.text.strip(), response.headers.get("ETag")
+
+    # Função para baixar o tarball de um commit (em blocos, direto para o disco)
+    def download_tarball(self, repo_name, sha):
+        repo_dir = self._repo_dir(repo_name)
+        tarball_path = repo_dir / f"{sha}.tar.gz"
+        if tarball_path.exists():
+            self._count("cached")
+            return tarball_path
+        repo_dir.mkdir(parents=True, exist_ok=True)
+        with self._temporary_file(repo_dir, f"{sha}.tar.gz", "wb") as f:
+            temporary = Path(f.name)
+            try:
+                with self.session.get(f"{self.api_url}/repos/{repo_name}/tarball/{sha}", stream=True,
+                                      timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+            except BaseException:
+                f.close()
+                temporary.unlink(missing_ok=True)
+                raise
+        temporary.replace(tarball_path)
+        self._count("tarballs")
+        return tarball_path
+
+    # Função para buscar os arquivos de um repositório (recursivamente), filtrados por extensão e pasta
+    def fetch_repo(self, repo_name, ref="HEAD", extensions=(".py",), path_prefix=""):
+        sha, etag = self.resolve_commit(repo_name, ref)
+        tarball_path = self.download_tarball(repo_name, sha)
+        if etag:
+            repo_dir = self._repo_dir(repo_name)
+            refs = self._load_refs(repo_dir)
+            old_sha = refs.get(ref, {}).get("sha")
+            refs[ref] = {"sha": sha, "etag": etag}
+            self._save_refs(repo_dir, refs)
+            if old_sha and old_sha != sha and old_sha not in {entry["sha"] for entry in refs.values()}:
+                (repo_dir / f"{old_sha}.tar.gz").unlink(missing_ok=True)  # Versão antiga sem uso
+        return read_tarball(tarball_path, extensions, path_prefix)
+
+    # Função para buscar vários repositórios em paralelo; um erro em um repositório não afeta os outros
+    def fetch_repos(self, repo_names, **kwargs):
+        def fetch(repo_name):
+            try:
+                return self.fetch_repo(repo_name, **kwargs)
+            except Exception as e:
+                logging.error(f"Erro ao buscar código do repositório {repo_name}: {e}")
+                return {}
+
+        repo_names = list(dict.fromkeys(repo_names))  # Sem repetições (cada repositório em uma thread)
+        with ThreadPoolExecutor(max_workers=self.max_connections) as pool:
+            return dict(zip(repo_names, pool.map(fetch, repo_names)))
+
+    def close(self):
+        self.session.close()
+
+
+# Função para ler os arquivos de um tarball do GitHub (a primeira pasta, "dono-repo-sha/", é removida)
+def read_tarball(tarball_path, extensions=(".py",), path_prefix=""):
+    code = {}
+    with tarfile.open(tarball_path, "r:gz") as archive:
+        for member in archive:
+            if not member.isfile() or member.size > MAX_FILE_BYTES:
+                continue
+            path = member.name.split("/", 1)[1] if "/" in member.name else member.name
+            if not path.startswith(path_prefix) or (extensions and not path.endswith(tuple(extensions))):
+                continue
+            code[path] = archive.extractfile(member).read().decode("utf-8", errors="replace")
+    return code
+
+
+default_fetcher = None
+default_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    global default_fetcher
+    with default_fetcher_lock:
+        if default_fetcher is None:
+            default_fetcher = GithubFetcher()
+        return default_fetcher
+
+
 def fetch_repositories(query):
     try:
+        from github import Github
+
         logging.info(f"Buscando repositórios com a query: {query}")
+        g = Github(GITHUB_TOKEN, base_url=GITHUB_API_URL)
         repositories = g.search_repositories(query=query)
         return repositories
     except Exception as e:
@@ -21,13 +188,7 @@ def fetch_repositories(query):
 def fetch_code_from_repo(repo_name):
     try:
         logging.info(f"Buscando código do repositório: {repo_name}")
-        repo = g.get_repo(repo_name)
-        files = repo.get_contents("")
-        code = {}
-        for file in files:
-            if file.name.endswith(".py"):
-                code[file.name] = file.decoded_content.decode()
-        return code
+        return get_fetcher().fetch_repo(repo_name)
     except Exception as e:
         logging.error(f"Erro ao buscar código do repositório {repo_name}: {e}")
         return {}
@@ -35,9 +196,9 @@ def fetch_code_from_repo(repo_name):
 if __name__ == "__main__":
     query = "machine learning"
     repos = fetch_repositories(query)
-    for repo in repos:
-        logging.info(f"Fetching code from: {repo.name}")
-        code = fetch_code_from_repo(repo.name)
+    repo_names = [repo.full_name for repo in repos[:10]]
+    for repo_name, code in get_fetcher().fetch_repos(repo_names).items():
+        logging.info(f"Fetching code from: {repo_name}")
         for filename, content in code.items():
             logging.info(f"File: {filename}")
             logging.info(content[:500])  # Imprimir os primeiros 500 caracteres do código
@@ -1,25 +1,273 @@
-import requests
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+import aiohttp
+
+STABLE_DIFFUSION_API_URL = os.environ.get("MYCHAT_IMAGE_API_URL") or "https://api.stablediffusionapi.com/v3/text-to-image"
+STABLE_DIFFUSION_API_KEY = os.environ.get("MYCHAT_IMAGE_API_KEY") or "your_api_key"
+
+data_dir = Path(os.environ.get("MYCHAT_DATA_DIR") or Path(__file__).parent)
+IMAGE_OUTPUT_DIR = data_dir / "output-image-chat"
+IMAGE_CACHE_PATH = data_dir / "cache" / "image_prompts.sqlite"
+IMAGE_CACHE_MAX_ENTRIES = int(os.environ.get("MYCHAT_IMAGE_CACHE_ENTRIES") or 10000)
+
+MAX_CONCURRENCY = int(os.environ.get("MYCHAT_IMAGE_CONCURRENCY") or 4)  # Prompts gerados ao mesmo tempo
+MAX_CONNECTIONS = 8  # Conexões abertas no pool da sessão
+RETRIES = 4
+BACKOFF_SECONDS = 0.5
+TIMEOUT_SECONDS = 120
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+RETRY_STATUS = {429, 500, 502, 503, 504}
+EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+
+
+# Resposta que vale a pena tentar de novo (limite de requisições ou erro temporário do servidor)
+class RetryableStatus(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+# Cache dos pedidos já gerados (chave do pedido -> caminho da imagem) em SQLite, compartilhado pelos
+# clientes das threads do chat e pela linha de comando (cada thread com a sua conexão). Limitado a
+# 'max_entries' entradas: as menos usadas saem do cache (as imagens continuam no disco).
+class PromptCache:
+    def __init__(self, db_path, max_entries):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS prompts (
+                    key TEXT PRIMARY KEY,
+                    image_path TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS prompts_last_access ON prompts (last_access)")
+            self._local.conn = conn
+            self._import_json(conn)
+        return conn
+
+    # Cache do formato anterior (um JSON reescrito a cada imagem): importado uma vez e apagado
+    def _import_json(self, conn):
+        legacy_path = self.db_path.with_suffix(".json")
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._put(conn, entries)
+        legacy_path.unlink(missing_ok=True)
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT image_path FROM prompts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE prompts SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    # Função para gravar várias entradas em uma transação e remover as menos usadas acima do limite
+    def put_many(self, entries):
+        self._put(self._connect(), entries)
+
+    def _put(self, conn, entries):
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT OR REPLACE INTO prompts VALUES (?, ?, ?)",
+                             [(key, image_path, now) for key, image_path in entries.items()])
+            excess = conn.execute("SELECT COUNT(*) FROM prompts").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute("DELETE FROM prompts WHERE key IN (SELECT key FROM prompts ORDER BY last_access LIMIT ?)",
+                             (excess,))
+
+
+# Cliente assíncrono da API de geração de imagens: uma sessão com pool de conexões para todos os
+# prompts, concorrência limitada por semáforo, novas tentativas com espera exponencial e download
+# em blocos direto para o disco. Cada imagem é gravada com o SHA-256 do conteúdo como nome, e o
+# resultado de cada (prompt, parâmetros) fica em cache: o mesmo pedido não chama a API de novo.
+class ImageClient:
+    def __init__(self, api_url=STABLE_DIFFUSION_API_URL, api_key=STABLE_DIFFUSION_API_KEY,
+                 output_dir=IMAGE_OUTPUT_DIR, cache_path=IMAGE_CACHE_PATH, max_concurrency=MAX_CONCURRENCY,
+                 max_connections=MAX_CONNECTIONS, retries=RETRIES, backoff_seconds=BACKOFF_SECONDS,
+                 timeout=TIMEOUT_SECONDS, cache_max_entries=IMAGE_CACHE_MAX_ENTRIES):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.output_dir = Path(output_dir)
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.session = None
+        self.semaphore = None
+        self.cache = PromptCache(cache_path, cache_max_entries)
+        self.unsaved = {}  # Entradas geradas ainda não gravadas no cache
+        self.save_task = None
+        self.in_flight = {}  # Pedidos iguais no mesmo lote esperam a mesma geração
+        self.stats = {"requests": 0, "retries": 0, "cache_hits": 0, "downloads": 0}
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.save_task is not None:
+            await self.save_task
+        await self.session.close()
+
+    # O cache é gravado fora do loop de eventos (asyncio.to_thread) e em lotes: as imagens que
+    # terminam durante uma gravação vão juntas na próxima
+    def _schedule_save(self):
+        if self.save_task is None or self.save_task.done():
+            self.save_task = asyncio.ensure_future(self._save_unsaved())
+
+    async def _save_unsaved(self):
+        while self.unsaved:
+            entries = dict(self.unsaved)
+            try:
+                await asyncio.to_thread(self.cache.put_many, entries)
+            except sqlite3.Error as e:
+                logging.warning(f"Cache de prompts não gravado: {e}")
+            for key, image_path in entries.items():
+                if self.unsaved.get(key) == image_path:
+                    del self.unsaved[key]
+
+    async def _cached_path(self, key):
+        cached = self.unsaved.get(key)
+        if cached is None:
+            try:
+                cached = await asyncio.to_thread(self.cache.get, key)
+            except sqlite3.Error as e:
+                logging.warning(f"Cache de prompts indisponível: {e}")
+        return cached
+
+    def cache_key(self, payload):
+        return hashlib.sha256(json.dumps([self.api_url, payload], sort_keys=True).encode("utf-8")).hexdigest()
+
+    # Executa 'request' com novas tentativas: erros de conexão, tempo esgotado e RETRY_STATUS
+    async def _with_retries(self, request):
+        for attempt in range(self.retries + 1):
+            try:
+                return await request()
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError,
+                    RetryableStatus) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff_seconds * 2 ** attempt * (1 + random.random() * 0.25)
+                if isinstance(e, RetryableStatus) and e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                self.stats["retries"] += 1
+                logging.warning(f"Falha na API de imagens ({e}), nova tentativa em {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def _check_status(self, response):
+        if response.status in RETRY_STATUS:
+            retry_after = response.headers.get("Retry-After")
+            raise RetryableStatus(response.status, float(retry_after) if retry_after and retry_after.isdigit() else None)
+        response.raise_for_status()
+
+    async def _request_image_url(self, payload):
+        async def request():
+            self.stats["requests"] += 1
+            async with self.session.post(self.api_url, json=payload) as response:
+                self._check_status(response)
+                return (await response.json())["image_url"]
+        return await self._with_retries(request)
+
+    # Download em blocos para um arquivo temporário, calculando o hash; o nome final é o hash
+    async def _download(self, image_url):
+        async def request():
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            digest = hashlib.sha256()
+            temporary = self.output_dir / f".download-{os.getpid()}-{id(digest)}.part"
+            try:
+                async with self.session.get(image_url) as response:
+                    self._check_status(response)
+                    extension = EXTENSIONS.get(response.content_type, ".png")
+                    with open(temporary, "wb") as f:
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            digest.update(chunk)
+                            f.write(chunk)
+                image_path = self.output_dir / f"{digest.hexdigest()}{extension}"
+                temporary.replace(image_path)  # Mesmo conteúdo = mesmo arquivo
+                return image_path
+            finally:
+                temporary.unlink(missing_ok=True)
+        image_path = await self._with_retries(request)
+        self.stats["downloads"] += 1
+        return image_path
+
+    # Função para gerar uma imagem; devolve o caminho do arquivo
+    async def generate(self, text, width=512, height=512):
+        payload = {"text": text, "width": width, "height": height}
+        key = self.cache_key(payload)
+        cached = await self._cached_path(key)
+        if cached and Path(cached).exists():
+            self.stats["cache_hits"] += 1
+            return Path(cached)
+        if key in self.in_flight:
+            self.stats["cache_hits"] += 1
+            return await asyncio.shield(self.in_flight[key])
+        task = self.in_flight[key] = asyncio.ensure_future(self._generate(key, payload))
+        try:
+            return await task
+        finally:
+            self.in_flight.pop(key, None)
+
+    async def _generate(self, key, payload):
+        async with self.semaphore:
+            image_url = await self._request_image_url(payload)
+            image_path = await self._download(image_url)
+        self.unsaved[key] = str(image_path)
+        self._schedule_save()
+        logging.info(f"Imagem de '{payload['text'][:40]}' salva em {image_path}")
+        return image_path
+
+    # Função para gerar um lote de prompts; erros de um prompt não interrompem os outros
+    async def generate_batch(self, prompts, width=512, height=512):
+        return await asyncio.gather(*(self.generate(prompt, width, height) for prompt in prompts),
+                                    return_exceptions=True)
+
+
+# Funções síncronas (chat e linha de comando): um loop de eventos por chamada
+def generate_images(prompts, width=512, height=512, **client_options):
+    async def run():
+        async with ImageClient(**client_options) as client:
+            return await client.generate_batch(prompts, width, height)
+    return asyncio.run(run())
 
-STABLE_DIFFUSION_API_URL = "https://api.stablediffusionapi.com/v3/text-to-image"
-STABLE_DIFFUSION_API_KEY = "your_api_key"
 
 def generate_image_from_text(text):
-    headers = {
-        "Authorization": f"Bearer {STABLE_DIFFUSION_API_KEY}"
-    }
-    payload = {
-        "text": text,
-        "width": 512,
-        "height": 512
-    }
-    response = requests.post(STABLE_DIFFUSION_API_URL, json=payload, headers=headers)
-    image_url = response.json().get('image_url')
-    image = requests.get(image_url).content
-    
-    with open('output/generated_image.png', 'wb') as f:
-        f.write(image)
-    print("Image generated and saved to 'output/generated_image.png'")
+    result = generate_images([text])[0]
+    if isinstance(result, Exception):
+        raise result
+    print(f"Image generated and saved to '{result}'")
+    return str(result)
 
 if __name__ == "__main__":
-    text = "A futuristic city at sunset"
-    generate_image_from_text(text)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    prompts = sys.argv[1:] or ["A futuristic city at sunset"]
+    for prompt, result in zip(prompts, generate_images(prompts)):
+        print(f"{prompt}: {result}")
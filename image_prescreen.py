@@ -0,0 +1,143 @@
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+# Triagem barata das imagens antes do OCR, com numpy sobre uma cópia reduzida em tons de cinza.
+#
+# Rejeita sem OCR imagens muito pequenas (ícones), sem contraste (fundo liso) ou sem estrutura de
+# linhas de texto. Linhas de texto aparecem como faixas horizontais com muitas bordas verticais
+# (traços das letras) separadas por faixas sem bordas (entrelinha); em fotos comuns as bordas
+# ficam espalhadas ou são suaves demais. A procura é feita em faixas verticais da imagem, para
+# pegar colunas e textos que não ocupam a largura toda.
+#
+# As imagens aprovadas são redimensionadas para que a altura das linhas fique perto de
+# TARGET_LINE_HEIGHT (o tamanho em que o Tesseract funciona melhor: fotos de 40 megapixels
+# encolhem, textos pequenos crescem), giradas pela orientação EXIF, convertidas para tons de
+# cinza e binarizadas com limiar local (iluminação irregular de fotos de documentos).
+
+ANALYSIS_MAX_SIDE = 2048  # Lado maior da cópia usada na triagem
+MIN_SIDE = 24  # Menor lado (pixels) abaixo do qual a imagem é tratada como ícone
+MIN_PIXELS = 64 * 64
+MIN_CONTRAST = 40  # Diferença mínima entre os percentis 2 e 98 dos tons de cinza
+EDGE_DELTA = 40  # Diferença entre pixels vizinhos que conta como borda
+MIN_EDGE_DENSITY = 0.002  # Fração mínima de pixels de borda
+STRIPS = 4  # Faixas verticais em que as linhas de texto são procuradas
+ROW_ACTIVE = 0.01  # Fração de bordas de uma linha de pixels com traços de texto
+MIN_LINE_HEIGHT = 3  # Altura (pixels da cópia reduzida) mínima de uma linha de texto
+MAX_LINE_FRACTION = 0.25  # Altura máxima de uma linha de texto, em fração da altura da imagem...
+MAX_LINE_PIXELS = 64  # ...ou em pixels (imagens baixas com uma linha só: faixas, botões)
+
+TARGET_LINE_HEIGHT = 32  # Altura das linhas de texto (pixels) entregue ao OCR
+MIN_SCALE = 0.25
+MAX_SCALE = 4.0
+SCALE_TOLERANCE = 0.15  # Diferença de escala que não justifica redimensionar
+MAX_OCR_PIXELS = 12_000_000
+BINARIZE_OFFSET = 12  # Quanto um pixel precisa ser mais escuro que a vizinhança para virar tinta
+EXIF_ORIENTATION = 0x0112
+
+
+# Função para abrir uma imagem em tons de cinza, já na orientação EXIF. Com 'max_side' a imagem
+# é reduzida; nos JPEG a redução começa na decodificação (draft), bem mais barata que decodificar
+# tudo e reduzir depois.
+def load_gray(path, max_side=None):
+    image = Image.open(path)
+    width, height = image.size
+    if image.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):  # Girada 90 graus
+        width, height = height, width
+    if max_side:
+        image.draft("L", (max_side, max_side))
+    image = ImageOps.exif_transpose(image).convert("L")
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.BOX)
+    return image, (width, height)
+
+
+# Linhas de texto de uma faixa: trechos de linhas de pixels com bordas, separados por trechos sem
+def text_line_heights(edges, max_line):
+    active = edges.mean(axis=1) > ROW_ACTIVE
+    changes = np.flatnonzero(np.diff(np.concatenate(([False], active, [False])).astype(np.int8)))
+    heights = changes[1::2] - changes[::2]
+    # Um trecho da altura toda não tem entrelinha: textura, não texto
+    return heights[(heights >= MIN_LINE_HEIGHT) & (heights <= max_line) & (heights < len(active))]
+
+
+# Estatísticas da triagem de uma imagem em tons de cinza (array 2D uint8)
+def analyze(gray):
+    low, high = np.percentile(gray, (2, 98))
+    pixels = gray.astype(np.int16)
+    vertical_edges = np.abs(np.diff(pixels, axis=1)) > EDGE_DELTA  # Traços verticais das letras
+    horizontal_edges = np.abs(np.diff(pixels, axis=0)) > EDGE_DELTA
+    edge_density = (np.count_nonzero(vertical_edges) + np.count_nonzero(horizontal_edges)) / (2 * gray.size)
+    max_line = max(MAX_LINE_PIXELS, int(gray.shape[0] * MAX_LINE_FRACTION))
+    heights = np.concatenate([text_line_heights(strip, max_line)
+                              for strip in np.array_split(vertical_edges, STRIPS, axis=1)])
+    return {
+        "contrast": int(high - low),
+        "edge_density": round(float(edge_density), 4),
+        "text_lines": int(heights.size),
+        "line_height": float(np.median(heights)) if heights.size else None,
+    }
+
+
+# Decisão da triagem: motivo para pular o OCR, ou None
+def skip_reason(size, stats):
+    if min(size) < MIN_SIDE or size[0] * size[1] < MIN_PIXELS:
+        return "too_small"
+    if stats["contrast"] < MIN_CONTRAST:
+        return "low_contrast"
+    if stats["edge_density"] < MIN_EDGE_DENSITY:
+        return "no_edges"
+    if not stats["text_lines"]:
+        return "no_text_lines"
+    return None
+
+
+# Escala para o OCR: linhas de texto perto de 'target_line_height', sem passar de 'max_pixels'
+def ocr_scale(size, line_height, target_line_height=TARGET_LINE_HEIGHT, max_pixels=MAX_OCR_PIXELS):
+    scale = 1.0
+    if line_height:
+        scale = min(MAX_SCALE, max(MIN_SCALE, target_line_height / line_height))
+        if abs(scale - 1) < SCALE_TOLERANCE:
+            scale = 1.0
+    pixels = size[0] * size[1] * scale * scale
+    if pixels > max_pixels:
+        scale *= (max_pixels / pixels) ** 0.5
+    return round(scale, 3)
+
+
+# Binarização com limiar local: tinta é o que fica mais escuro que a média da vizinhança (texto
+# claro em fundo escuro é invertido antes)
+def binarize(image, radius):
+    pixels = np.asarray(image, dtype=np.int16)
+    if np.median(pixels) < 100:
+        pixels = 255 - pixels
+        image = Image.fromarray(pixels.astype(np.uint8))
+    local_mean = np.asarray(image.filter(ImageFilter.BoxBlur(radius)), dtype=np.int16)
+    return Image.fromarray(np.where(pixels < local_mean - BINARIZE_OFFSET, 0, 255).astype(np.uint8))
+
+
+# Função para triar e preparar uma imagem para o OCR. Retorna (imagem para o OCR ou None se a
+# imagem deve ser pulada, decisões tomadas)
+def prepare_image(path, target_line_height=TARGET_LINE_HEIGHT, max_pixels=MAX_OCR_PIXELS, binarize_image=True):
+    analysis, original_size = load_gray(path, ANALYSIS_MAX_SIDE)
+    stats = analyze(np.asarray(analysis))
+    analysis_scale = analysis.size[0] / original_size[0]
+    if stats["line_height"] is not None:
+        stats["line_height"] = round(stats["line_height"] / analysis_scale, 1)  # Em pixels da imagem original
+    decisions = {"original_size": list(original_size), **stats}
+    reason = skip_reason(original_size, stats)
+    if reason:
+        decisions.update(decision="skip", reason=reason)
+        return None, decisions
+
+    scale = ocr_scale(original_size, stats["line_height"], target_line_height, max_pixels)
+    size = (max(1, int(original_size[0] * scale)), max(1, int(original_size[1] * scale)))
+    if analysis.size == size:
+        image = analysis
+    else:
+        image, _ = load_gray(path, max(size) if scale < 1 else None)
+        if image.size != size:
+            image = image.resize(size, Image.Resampling.LANCZOS if scale < 1 else Image.Resampling.BICUBIC)
+    if binarize_image:
+        image = binarize(image, max(8, round(target_line_height)))
+    decisions.update(decision="ocr", scale=scale, ocr_size=list(image.size), binarized=binarize_image)
+    return image, decisions
@@ -0,0 +1,198 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from colorama import Fore
+
+# Decisões de claim() para um arquivo encontrado em 'input_dir'
+PROCESS = "process"  # Novo, alterado ou com nova tentativa liberada: enviar aos pools
+DONE = "done"  # Já processado e sem mudanças: não extrair de novo
+RETRY_LATER = "retry_later"  # Falhou e ainda está no intervalo de espera
+GAVE_UP = "gave_up"  # Falhou em todas as tentativas: fica em 'input_dir' até ser alterado
+IN_PROGRESS = "in_progress"  # Já está na fila ou sendo processado
+
+
+# Manifesto dos arquivos de entrada em SQLite: caminho, tamanho/mtime, hash do conteúdo, estado,
+# tentativas, tempos e local da saída. As transições de estado são transações atômicas
+# (comparar-e-trocar sobre o estado anterior), então depois de uma queda o manifesto diz
+# exatamente o que terminou, o que falhou e o que ficou no meio do caminho.
+#
+# Estados: pending -> queued -> running -> extracted -> done, ou running -> failed/dead.
+# 'extracted' significa que a saída já foi gravada e faltam só as movimentações dos arquivos,
+# que recover() conclui na próxima execução.
+class JobManifest:
+    def __init__(self, db_path, max_attempts=5, backoff_seconds=30.0, backoff_max_seconds=3600.0):
+        self.db_path = Path(db_path)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._local = threading.local()
+
+    # Conexão por processo e por thread (o pool leve usa threads do processo principal)
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")  # Uma transição confirmada sobrevive a queda de energia
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    output_path TEXT,
+                    next_attempt_at REAL NOT NULL DEFAULT 0,
+                    queued_at REAL,
+                    started_at REAL,
+                    finished_at REAL,
+                    duration REAL,
+                    pid INTEGER
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, next_attempt_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # Transição atômica: só acontece se o estado atual for um dos esperados
+    def _transition(self, path, from_states, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        placeholders = ", ".join("?" for _ in from_states)
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE path = ? AND state IN ({placeholders})",
+                (*fields.values(), path, *from_states))
+        return cursor.rowcount == 1
+
+    def get(self, path):
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE path = ?", (path,)).fetchone()
+        finally:
+            conn.row_factory = None
+        return dict(row) if row else None
+
+    # Função para decidir o que fazer com um arquivo de entrada. Arquivos sem mudança de tamanho
+    # e mtime são resolvidos só com o stat; o hash (hash_func) só é calculado quando o stat mudou,
+    # para reconhecer um arquivo copiado de novo com o mesmo conteúdo.
+    def claim(self, path, file_path, hash_func):
+        stat = os.stat(file_path)
+        row = self.get(path)
+        now = time.time()
+        if row is None:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (path, size, mtime_ns, state, queued_at) VALUES (?, ?, ?, 'queued', ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, now))
+            return PROCESS if cursor.rowcount == 1 else IN_PROGRESS
+
+        state = row["state"]
+        if state in ("queued", "running", "extracted"):
+            return IN_PROGRESS
+
+        unchanged = row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns
+        if not unchanged and row["content_hash"] and state in ("done", "failed", "dead"):
+            if hash_func(file_path) == row["content_hash"]:
+                # Mesmo conteúdo com outro mtime: atualizar o stat para a próxima vez não precisar do hash
+                self._transition(path, (state,), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                unchanged = True
+
+        if unchanged and state == "done":
+            return DONE
+        if unchanged and state == "dead":
+            return GAVE_UP
+        if unchanged and state == "failed" and row["next_attempt_at"] > now:
+            return RETRY_LATER
+
+        fields = {"state": "queued", "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "queued_at": now}
+        if not unchanged:
+            # Conteúdo novo: recomeça a contagem de tentativas
+            fields.update(attempts=0, content_hash=None, last_error=None, next_attempt_at=0)
+        return PROCESS if self._transition(path, (state,), **fields) else IN_PROGRESS
+
+    # Funções de transição chamadas pelos processos dos pools
+    def start(self, path, content_hash=None):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, started_at = ?, pid = ?, "
+                "content_hash = COALESCE(?, content_hash) WHERE path = ? AND state IN ('queued', 'pending')",
+                (time.time(), os.getpid(), content_hash, path))
+
+    def extracted(self, path, output_path):
+        return self._transition(path, ("running",), state="extracted",
+                                output_path=str(output_path) if output_path else None)
+
+    def done(self, path, output_path=None):
+        now = time.time()
+        row = self.get(path)
+        started_at = row["started_at"] if row and row["started_at"] else now
+        fields = {"state": "done", "finished_at": now, "duration": round(now - started_at, 3), "last_error": None}
+        if output_path:
+            fields["output_path"] = str(output_path)
+        return self._transition(path, ("extracted", "running"), **fields)
+
+    # Função para registrar uma falha: nova tentativa com espera exponencial ou desistência
+    def fail(self, path, error):
+        row = self.get(path)
+        if row is None:
+            return None
+        attempts = max(row["attempts"], 1)
+        now = time.time()
+        if attempts >= self.max_attempts:
+            self._transition(path, ("running", "queued", "extracted"), state="dead", last_error=str(error),
+                             finished_at=now)
+            logging.error(f"{Fore.RED}{path} falhou {attempts} vezes, sem novas tentativas até o arquivo mudar.")
+            return None
+        delay = min(self.backoff_max_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+        self._transition(path, ("running", "queued", "extracted"), state="failed", last_error=str(error),
+                         finished_at=now, next_attempt_at=now + delay)
+        logging.warning(f"{Fore.YELLOW}{path} falhou (tentativa {attempts}/{self.max_attempts}), "
+                        f"nova tentativa em {delay:.0f}s.")
+        return now + delay
+
+    # Função para retomar após uma queda: 'queued' volta para 'pending', 'running' conta como falha
+    # (um arquivo que derruba o processo não entra em ciclo infinito) e os 'extracted' são devolvidos
+    # para que as movimentações pendentes sejam concluídas
+    def recover(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE jobs SET state = 'pending' WHERE state = 'queued'")
+        interrupted = [path for (path,) in conn.execute("SELECT path FROM jobs WHERE state = 'running'")]
+        for path in interrupted:
+            self.fail(path, "processamento interrompido")
+        extracted = conn.execute("SELECT path, output_path FROM jobs WHERE state = 'extracted'").fetchall()
+        if interrupted or extracted:
+            logging.info(f"{Fore.YELLOW}Manifesto: {len(interrupted)} arquivos interrompidos, "
+                         f"{len(extracted)} com movimentação pendente.")
+        return extracted
+
+    # Função para listar as falhas cuja espera já terminou (usada no modo daemon)
+    def due_retries(self):
+        conn = self._connect()
+        return [path for (path,) in conn.execute(
+            "SELECT path FROM jobs WHERE state = 'failed' AND next_attempt_at <= ?", (time.time(),))]
+
+    # Função para listar as saídas dos arquivos concluídos a partir de um instante (indexação incremental)
+    def outputs_since(self, timestamp):
+        conn = self._connect()
+        return [output_path for (output_path,) in conn.execute(
+            "SELECT output_path FROM jobs WHERE state = 'done' AND finished_at >= ? AND output_path IS NOT NULL",
+            (timestamp,))]
+
+    def stats(self):
+        conn = self._connect()
+        return dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
@@ -0,0 +1,255 @@
+import codecs
+import json
+import os
+from pathlib import Path
+
+# Gravação incremental de um registro JSON cujo 'content' chega em partes (modo streaming).
+# O arquivo gerado é um JSON comum, no mesmo formato de json.dump(..., indent=4): os campos de
+# 'header' vêm antes, o 'content' é escrito parte por parte (cada parte escapada isoladamente, o que
+# dá o mesmo resultado que escapar o texto inteiro) e os campos de 'trailer', conhecidos só no fim
+# (por exemplo o grupo de quase-duplicatas), vêm depois. A gravação vai para um arquivo temporário,
+# renomeado em close(): um registro incompleto nunca aparece com o nome final.
+
+
+class JsonRecordWriter:
+    def __init__(self, path, header):
+        self.path = Path(path)
+        self.temporary = self.path.with_name(self.path.name + ".part")
+        self.file = open(self.temporary, "w", encoding="utf-8")
+        self.characters = 0
+        self.file.write("{\n")
+        for name, value in header.items():
+            self.file.write(f"    {json.dumps(name)}: {self._dumps(value)},\n")
+        self.file.write('    "content": "')
+
+    def _dumps(self, value):
+        return json.dumps(value, ensure_ascii=False, indent=4).replace("\n", "\n    ")
+
+    def write(self, text):
+        if text:
+            self.file.write(json.dumps(text, ensure_ascii=False)[1:-1])
+            self.characters += len(text)
+
+    # Função para terminar o registro com os campos finais e publicá-lo com o nome definitivo
+    def close(self, trailer=None):
+        self.file.write('"')
+        for name, value in (trailer or {}).items():
+            self.file.write(f",\n    {json.dumps(name)}: {self._dumps(value)}")
+        self.file.write("\n}")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.temporary.replace(self.path)
+        return self.path
+
+    # Função para desistir do registro (erro no meio da extração): apaga o arquivo temporário
+    def abort(self):
+        self.file.close()
+        self.temporary.unlink(missing_ok=True)
+
+
+# Função para reagrupar partes de texto (páginas, blocos) em partes de pelo menos 'size' caracteres
+def rechunk(chunks, size):
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= size:
+            yield "".join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield "".join(pending)
+
+
+# Leitura de um registro JSON gravado em arquivo sem carregar o 'content' inteiro: os demais campos
+# (pequenos) são lidos normalmente e o 'content' é decodificado em blocos direto do arquivo, com a
+# posição em bytes de cada trecho (para reler só um trecho depois, com seek).
+
+READ_BLOCK = 1 << 20
+JSON_ESCAPES = {ord('"'): '"', ord("\\"): "\\", ord("/"): "/", ord("b"): "\b", ord("f"): "\f", ord("n"): "\n",
+                ord("r"): "\r", ord("t"): "\t"}
+WHITESPACE = b" \t\r\n"
+
+
+# Leitor em blocos de um arquivo JSON, com a posição absoluta em bytes
+class _JsonScanner:
+    def __init__(self, f):
+        self.f = f
+        self.buffer = b""
+        self.base = 0  # Posição no arquivo do início de 'buffer'
+        self.pos = 0
+
+    def _more(self):
+        data = self.f.read(READ_BLOCK)
+        if not data:
+            raise ValueError("JSON incompleto")
+        self.base += self.pos
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+
+    def tell(self):
+        return self.base + self.pos
+
+    # Próximo caractere que não é espaço (sem consumi-lo)
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            self._more()
+
+    def expect(self, char):
+        if self.peek() != ord(char):
+            raise ValueError(f"esperado {char!r} na posição {self.tell()}")
+        self.pos += 1
+
+    # Um valor JSON pequeno (chave, número, lista ou objeto dos outros campos)
+    def value(self):
+        decoder = json.JSONDecoder()
+        self.peek()
+        while True:
+            text = codecs.getincrementaldecoder("utf-8")().decode(self.buffer[self.pos:])
+            try:
+                value, end = decoder.raw_decode(text)
+                # Um número no fim do bloco ("3." de "3.5") pode continuar no próximo
+                if end < len(text) and text[end] in " \t\r\n,:}]":
+                    self.pos += len(text[:end].encode("utf-8"))
+                    return value
+            except json.JSONDecodeError:
+                pass
+            self._more()
+
+    # Pula uma string já aberta; retorna a posição das aspas finais (consumidas)
+    def skip_string(self):
+        while True:
+            quote = self.buffer.find(b'"', self.pos)
+            while quote != -1:
+                backslashes = 0
+                while quote - backslashes - 1 >= self.pos and self.buffer[quote - backslashes - 1] == ord("\\"):
+                    backslashes += 1
+                if backslashes % 2 == 0:
+                    end = self.base + quote
+                    self.pos = quote + 1
+                    return end
+                quote = self.buffer.find(b'"', quote + 1)
+            # Sem aspas finais no bloco: manter só as barras do fim (podem escapar a próxima aspa)
+            tail = len(self.buffer)
+            while tail > self.pos and self.buffer[tail - 1] == ord("\\"):
+                tail -= 1
+            self.pos = tail
+            self._more()
+
+
+# Função para ler os campos de um registro JSON, exceto 'field' (uma string possivelmente enorme),
+# do qual retorna só a posição: (campos, (início, fim) em bytes do texto escapado, ou None)
+def read_record_fields(path, field="content"):
+    with open(path, "rb") as f:
+        scanner = _JsonScanner(f)
+        scanner.expect("{")
+        fields = {}
+        span = None
+        if scanner.peek() == ord("}"):
+            return fields, span
+        while True:
+            key = scanner.value()
+            scanner.expect(":")
+            if key == field and scanner.peek() == ord('"'):
+                scanner.pos += 1
+                start = scanner.tell()
+                span = (start, scanner.skip_string())
+            else:
+                fields[key] = scanner.value()
+            char = scanner.peek()
+            scanner.pos += 1
+            if char == ord("}"):
+                return fields, span
+            if char != ord(","):
+                raise ValueError(f"esperado ',' ou '}}' na posição {scanner.tell() - 1}")
+
+
+# Bytes de 'data' sem uma sequência UTF-8 incompleta no fim
+def _complete_utf8(data):
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:  # Primeiro byte do último caractere
+            needed = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return len(data) if back >= needed else len(data) - back
+    return len(data)
+
+
+# Decodifica um trecho de string JSON escapada: (texto, âncoras, bytes consumidos). Cada âncora
+# (caractere, posição em bytes, trecho literal) marca o início de um trecho copiado literalmente
+# (UTF-8) ou de um caractere escapado. Sem 'final', um escape ou caractere UTF-8 cortado no fim do
+# bloco fica para o próximo.
+def _decode_escaped(data, base, final):
+    pieces = []
+    anchors = []
+    characters = 0
+    pos = 0
+    size = len(data)
+    while pos < size:
+        backslash = data.find(b"\\", pos)
+        literal_end = size if backslash == -1 else backslash
+        if literal_end > pos:
+            literal = data[pos:literal_end]
+            if backslash == -1 and not final:
+                literal = literal[:_complete_utf8(literal)]
+            if literal:
+                text = literal.decode("utf-8")
+                anchors.append((characters, base + pos, True))
+                pieces.append(text)
+                characters += len(text)
+                pos += len(literal)
+            if backslash == -1:
+                break
+        if pos + 2 > size:
+            if final:
+                raise ValueError("escape incompleto no fim da string")
+            break
+        kind = data[pos + 1]
+        if kind == ord("u"):
+            if pos + 6 > size and not final:
+                break
+            code = int(data[pos + 2:pos + 6], 16)
+            length = 6
+            if 0xD800 <= code < 0xDC00:  # Par substituto: 😀
+                if pos + 12 > size and not final:
+                    break
+                if data[pos + 6:pos + 8] == b"\\u":
+                    low = int(data[pos + 8:pos + 12], 16)
+                    if 0xDC00 <= low < 0xE000:
+                        code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                        length = 12
+            char = chr(code)
+        else:
+            char = JSON_ESCAPES[kind]
+            length = 2
+        anchors.append((characters, base + pos, False))
+        pieces.append(char)
+        characters += 1
+        pos += length
+    return "".join(pieces), anchors, pos
+
+
+# Função para percorrer o texto de uma string JSON do arquivo (posições de read_record_fields) em
+# blocos: (texto, âncoras, posição em bytes do fim do bloco)
+def iter_string_blocks(path, start, end, block_size=READ_BLOCK):
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        pending = b""
+        while position < end or pending:
+            data = f.read(min(block_size, end - position)) if position < end else b""
+            position += len(data)
+            final = position >= end
+            data = pending + data
+            block_start = position - len(data)
+            text, anchors, consumed = _decode_escaped(data, block_start, final)
+            pending = data[consumed:]
+            if text:
+                yield text, anchors, block_start + consumed
@@ -0,0 +1,201 @@
+import atexit
+import gzip
+import json
+import logging
+import multiprocessing.util
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from colorama import Fore
+
+
+# Armazenamento de resultados em shards JSONL (um registro por linha), com rotação por tamanho
+# e compressão gzip opcional. Cada processo escreve nos seus próprios shards; um índice SQLite
+# compartilhado aponta do caminho de origem / hash do conteúdo para (shard, offset).
+#
+# Os registros são acumulados em lotes e gravados com um único fsync por lote. Só depois do
+# fsync o lote entra no índice, então o índice nunca aponta para dados não gravados.
+# No modo gzip cada lote é um membro gzip independente: o offset aponta para o início do
+# membro e 'line' indica a linha dentro dele.
+class JsonlShardStore:
+    def __init__(self, root, max_shard_bytes=256 * 1024 * 1024, compress=False, batch_size=256,
+                 flush_interval=1.0, max_batch_bytes=64 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_shard_bytes = max_shard_bytes
+        self.compress = compress
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_batch_bytes = max_batch_bytes  # Registros grandes (partes do modo streaming) gravam o lote antes
+        self.lock = threading.Lock()
+        self._reset()
+
+    # Estado por processo (um processo filho não pode continuar o shard do processo pai)
+    def _reset(self):
+        self._pid = os.getpid()
+        self._buffer = []  # (linha JSON, caminho de origem, hash)
+        self._buffer_bytes = 0
+        self._buffer_started = None
+        self._shard_file = None
+        self._shard_path = None
+        self._shard_seq = 0
+        self._conn = None
+        self._registered = False
+
+    def _check_process(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if not self._registered:
+            # atexit cobre o processo principal; Finalize cobre os processos dos pools,
+            # que não executam os handlers do atexit ao terminar
+            atexit.register(self.close)
+            multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+            self._registered = True
+
+    def _connect(self):
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.root / "index.sqlite", timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY,
+                    source_path TEXT,
+                    content_hash TEXT,
+                    shard TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    line INTEGER NOT NULL,
+                    created REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS records_source_path ON records (source_path)")
+            conn.execute("CREATE INDEX IF NOT EXISTS records_content_hash ON records (content_hash)")
+            self._conn = conn
+        return self._conn
+
+    # Função para adicionar um registro (gravado no próximo lote)
+    def append(self, record, source_path=None, content_hash=None):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self._check_process()
+            if not self._buffer:
+                self._buffer_started = time.monotonic()
+            data = line.encode('utf-8')
+            self._buffer.append((data, source_path, content_hash))
+            self._buffer_bytes += len(data)
+            if (len(self._buffer) >= self.batch_size or self._buffer_bytes >= self.max_batch_bytes
+                    or time.monotonic() - self._buffer_started >= self.flush_interval):
+                self._flush_locked()
+
+    # Função para gravar o lote pendente
+    def flush(self):
+        with self.lock:
+            if self._pid == os.getpid():
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        self._buffer_bytes = 0
+        shard_file = self._current_shard()
+        offset = shard_file.tell()
+        entries = []
+        if self.compress:
+            data = gzip.compress(b"".join(line for line, _, _ in batch))
+            shard_file.write(data)
+            for line_num, (_, source_path, content_hash) in enumerate(batch):
+                entries.append((source_path, content_hash, offset, len(data), line_num))
+        else:
+            line_offset = offset
+            for line, source_path, content_hash in batch:
+                shard_file.write(line)
+                entries.append((source_path, content_hash, line_offset, len(line), 0))
+                line_offset += len(line)
+        shard_file.flush()
+        os.fsync(shard_file.fileno())
+
+        conn = self._connect()
+        created = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO records (source_path, content_hash, shard, offset, length, line, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(source_path, content_hash, self._shard_path.name, entry_offset, length, line_num, created)
+                 for source_path, content_hash, entry_offset, length, line_num in entries])
+        logging.info(f"{Fore.GREEN}{len(batch)} registros gravados em {self._shard_path.name}")
+
+    # Shard atual do processo; abre um novo quando o limite de tamanho é atingido
+    def _current_shard(self):
+        if self._shard_file is not None and self._shard_file.tell() >= self.max_shard_bytes:
+            self._shard_file.close()
+            self._shard_file = None
+        if self._shard_file is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._shard_seq += 1
+            suffix = ".jsonl.gz" if self.compress else ".jsonl"
+            name = f"shard-{time.strftime('%Y%m%d%H%M%S')}-{self._pid}-{self._shard_seq:04d}{suffix}"
+            self._shard_path = self.root / name
+            self._shard_file = open(self._shard_path, 'ab')
+        return self._shard_file
+
+    # Função para gravar o que estiver pendente e fechar os arquivos
+    def close(self):
+        with self.lock:
+            if self._pid != os.getpid():
+                return
+            self._flush_locked()
+            if self._shard_file is not None:
+                self._shard_file.close()
+                self._shard_file = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Função para buscar o registro mais recente de um arquivo de origem ou hash de conteúdo
+    def lookup(self, source_path=None, content_hash=None):
+        if source_path is not None:
+            query, value = "SELECT shard, offset, length, line FROM records WHERE source_path = ?", source_path
+        else:
+            query, value = "SELECT shard, offset, length, line FROM records WHERE content_hash = ?", content_hash
+        with self.lock:
+            self._check_process()
+            row = self._connect().execute(query + " ORDER BY id DESC LIMIT 1", (value,)).fetchone()
+        if row is None:
+            return None
+        return self.read_record(*row)
+
+    # Função para percorrer o índice em ordem de gravação, a partir de um id (indexação incremental)
+    def iter_index(self, after_id=0):
+        with self.lock:
+            self._check_process()
+            rows = self._connect().execute(
+                "SELECT id, source_path, shard, offset, length, line FROM records WHERE id > ? ORDER BY id",
+                (after_id,))
+        yield from rows
+
+    # Função para ler um registro a partir da sua posição no shard
+    def read_record(self, shard, offset, length, line):
+        with open(self.root / shard, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        if shard.endswith('.gz'):
+            data = zlib.decompressobj(wbits=31).decompress(data).splitlines()[line]
+        return json.loads(data)
+
+    # Função para percorrer todos os registros em sequência, shard por shard
+    def iter_records(self):
+        for shard_path in sorted(self.root.glob("shard-*.jsonl*")):
+            opener = gzip.open if shard_path.suffix == '.gz' else open
+            with opener(shard_path, 'rt', encoding='utf-8') as f:
+                try:
+                    for line in f:
+                        # Uma linha sem '\n' no fim é um lote interrompido por uma queda: ignorar
+                        if line.endswith("\n") and line.strip():
+                            yield json.loads(line)
+                except EOFError:
+                    logging.warning(f"{Fore.YELLOW}Shard {shard_path.name} termina com um lote incompleto.")
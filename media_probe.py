@@ -0,0 +1,75 @@
+import struct
+import wave
+
+# Leitura de informações de custo (páginas de PDF, duração de áudio/vídeo) só pelos cabeçalhos,
+# sem decodificar o conteúdo. Usada pelo agendador para estimar o custo de cada arquivo antes de
+# enviá-lo aos pools. Quando o formato não é reconhecido a duração é estimada pelo tamanho.
+
+# Bytes por segundo típicos, para estimar a duração de formatos sem leitura de cabeçalho
+TYPICAL_BYTES_PER_SECOND = {
+    ".mp3": 16_000, ".ogg": 16_000, ".opus": 8_000, ".spx": 4_000, ".wma": 16_000, ".mp2": 24_000,
+    ".aac": 16_000, ".ac3": 48_000, ".eac3": 48_000, ".dts": 96_000, ".flac": 100_000,
+    ".aiff": 176_400, ".aif": 176_400, ".au": 88_200, ".caf": 176_400, ".pcm": 32_000,
+    ".flv": 250_000, ".avi": 500_000, ".mkv": 500_000, ".mp4": 250_000, ".mov": 500_000, ".m4a": 16_000,
+}
+DEFAULT_BYTES_PER_SECOND = 32_000
+MP4_EXTENSIONS = (".mp4", ".mov", ".m4a")
+PDF_BYTES_PER_PAGE = 100_000  # Estimativa quando o PyMuPDF não está disponível
+
+
+# Função para obter o número de páginas de um PDF (o PyMuPDF lê só a tabela xref e a árvore de páginas)
+def pdf_page_count(path):
+    try:
+        import fitz  # PyMuPDF
+
+        with fitz.open(path) as doc:
+            return doc.page_count
+    except Exception:
+        return max(1, path.stat().st_size // PDF_BYTES_PER_PAGE)
+
+
+# Função para obter a duração em segundos de um arquivo de áudio ou vídeo
+def media_duration(path):
+    suffix = path.suffix.lower()
+    try:
+        if suffix == ".wav":
+            with wave.open(str(path), "rb") as audio:
+                return audio.getnframes() / audio.getframerate()
+        if suffix in MP4_EXTENSIONS:
+            duration = mp4_duration(path)
+            if duration is not None:
+                return duration
+    except (OSError, EOFError, wave.Error, struct.error):
+        pass
+    return path.stat().st_size / TYPICAL_BYTES_PER_SECOND.get(suffix, DEFAULT_BYTES_PER_SECOND)
+
+
+# Duração de um MP4/MOV/M4A pelo átomo 'mvhd' (dentro de 'moov', que pode estar no fim do arquivo):
+# só os cabeçalhos dos átomos são lidos, pulando os dados de mídia com seek
+def mp4_duration(path):
+    with open(path, "rb") as f:
+        end = f.seek(0, 2)
+        f.seek(0)
+        limit = end
+        while f.tell() + 8 <= limit:
+            start = f.tell()
+            size, kind = struct.unpack(">I4s", f.read(8))
+            if size == 1:
+                size = struct.unpack(">Q", f.read(8))[0]
+            elif size == 0:
+                size = end - start
+            if size < 8:
+                return None
+            if kind == b"moov":
+                limit = start + size  # Descer para dentro do 'moov'
+                continue
+            if kind == b"mvhd":
+                version = f.read(1)[0]
+                f.read(3)  # flags
+                if version == 1:
+                    _, _, timescale, duration = struct.unpack(">QQIQ", f.read(28))
+                else:
+                    _, _, timescale, duration = struct.unpack(">IIII", f.read(16))
+                return duration / timescale if timescale else None
+            f.seek(start + size)
+    return None
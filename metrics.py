@@ -0,0 +1,237 @@
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from colorama import Fore
+
+# Métricas de tempo por etapa, volume processado e trabalho em andamento por pool.
+#
+# Desligadas por padrão: stage() devolve um contexto vazio compartilhado e count()/gauge_add()
+# retornam logo após testar um booleano, então o custo com as métricas desligadas é desprezível.
+#
+# Os processos dos pools não enxergam o registro do processo principal: neles as observações
+# ficam em uma lista local, que process_file devolve com drain() e o processo principal junta
+# com merge(). Só o processo principal exporta (arquivo Prometheus, HTTP e eventos JSON-lines).
+
+# Limites dos buckets dos histogramas de latência (segundos)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, float('inf'))
+
+enabled = False
+owner_pid = None  # Processo que agrega e exporta
+lock = threading.Lock()
+pending = []  # Observações locais (processos dos pools)
+histograms = {}  # (nome, labels) -> [contagens por bucket, soma, total]
+counters = {}  # (nome, labels) -> valor
+gauges = {}  # (nome, labels) -> valor
+events_file = None
+prometheus_path = None
+exporter_thread = None
+exporter_stop = threading.Event()
+http_server = None
+
+NOOP = contextlib.nullcontext()
+
+
+# Função para ligar as métricas; chamada na importação do file_processor em todos os processos
+def configure(enable):
+    global enabled
+    enabled = enable
+
+
+# Função para tornar o processo atual o agregador e iniciar as exportações (processo principal)
+def start(events_path=None, prometheus_file=None, http_port=None, export_interval=5.0):
+    global owner_pid, events_file, prometheus_path, exporter_thread, http_server
+    if not enabled:
+        return
+    owner_pid = os.getpid()
+    if events_path and events_file is None:
+        Path(events_path).parent.mkdir(parents=True, exist_ok=True)
+        events_file = open(events_path, 'a', encoding='utf-8', buffering=1024 * 64)
+    prometheus_path = Path(prometheus_file) if prometheus_file else None
+    if prometheus_path and exporter_thread is None:
+        exporter_thread = threading.Thread(target=export_loop, args=(export_interval,), name="metrics-export",
+                                           daemon=True)
+        exporter_thread.start()
+    if http_port and http_server is None:
+        http_server = ThreadingHTTPServer(("127.0.0.1", http_port), MetricsHandler)
+        threading.Thread(target=http_server.serve_forever, name="metrics-http", daemon=True).start()
+        logging.info(f"{Fore.GREEN}Métricas disponíveis em http://127.0.0.1:{http_port}/metrics")
+
+
+# Etapas: com as métricas ligadas mede a duração e registra no histograma 'mychat_stage_seconds'
+class Stage:
+    __slots__ = ("labels", "start")
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = self.labels if exc_type is None else self.labels + (("error", exc_type.__name__),)
+        record(("h", "mychat_stage_seconds", labels, time.perf_counter() - self.start))
+        return False
+
+
+def stage(name, **labels):
+    if not enabled:
+        return NOOP
+    return Stage((("stage", name),) + tuple(sorted(labels.items())))
+
+
+def count(name, value=1, **labels):
+    if enabled:
+        record(("c", name, tuple(sorted(labels.items())), value))
+
+
+def gauge_add(name, delta, **labels):
+    if enabled:
+        record(("g", name, tuple(sorted(labels.items())), delta))
+
+
+def record(observation):
+    if os.getpid() != owner_pid:
+        # Processo de um pool: guardar para enviar ao processo principal
+        with lock:
+            pending.append(observation)
+        return
+    apply(observation)
+
+
+def apply(observation):
+    kind, name, labels, value = observation
+    key = (name, labels)
+    with lock:
+        if kind == "h":
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[0][index] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+        elif kind == "c":
+            counters[key] = counters.get(key, 0) + value
+        else:
+            gauges[key] = gauges.get(key, 0) + value
+        if events_file is not None:
+            events_file.write(json.dumps({"ts": round(time.time(), 6), "type": kind, "name": name,
+                                          "labels": dict(labels), "value": value}) + "\n")
+
+
+# Função para entregar as observações locais (chamada no fim de process_file nos pools)
+def drain():
+    if not enabled or os.getpid() == owner_pid:
+        return []
+    global pending
+    with lock:
+        observations, pending = pending, []
+    return observations
+
+
+# Função para juntar ao registro as observações vindas de um processo do pool
+def merge(observations):
+    for observation in observations or ():
+        apply(observation)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{str(value)}"' for key, value in labels) + "}"
+
+
+# Formato de texto do Prometheus
+def render_prometheus():
+    lines = []
+    with lock:
+        names = sorted({name for name, _ in histograms})
+        for name in names:
+            lines.append(f"# TYPE {name} histogram")
+            for (hist_name, labels), (buckets, total, observations) in sorted(histograms.items()):
+                if hist_name != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, buckets):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{name}_count{format_labels(labels)} {observations}")
+        for kind, registry in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({name for name, _ in registry}):
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric_name, labels), value in sorted(registry.items()):
+                    if metric_name == name:
+                        lines.append(f"{name}{format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# Grava o arquivo Prometheus de forma atômica (para o textfile collector do node_exporter)
+def write_prometheus():
+    if prometheus_path is None:
+        return
+    prometheus_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = prometheus_path.with_suffix(".tmp")
+    temporary.write_text(render_prometheus(), encoding='utf-8')
+    temporary.replace(prometheus_path)
+
+
+def export_loop(interval):
+    while not exporter_stop.wait(interval):
+        write_prometheus()
+        if events_file is not None:
+            with lock:
+                events_file.flush()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Sem uma linha de log por coleta
+
+
+# Função para gravar tudo no final da execução
+def flush():
+    if not enabled or os.getpid() != owner_pid:
+        return
+    write_prometheus()
+    if events_file is not None:
+        with lock:
+            events_file.flush()
+
+
+# Gancho de profiling: executa 'func' sob o cProfile, grava o .prof e registra as funções mais caras
+def profile_call(output_path, func, *args):
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(output_path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(20)
+        logging.info(f"{Fore.BLUE}Perfil salvo em {output_path}:\n{summary.getvalue()}")
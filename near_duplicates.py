@@ -0,0 +1,261 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+import numpy as np
+from colorama import Fore
+
+# Detecção de quase-duplicatas entre os textos extraídos (MinHash + LSH).
+#
+# O 'content' de cada registro vira um conjunto de shingles (sequências de SHINGLE_WORDS palavras),
+# e a assinatura MinHash guarda, para cada uma de NUM_PERM funções de hash, o menor hash do conjunto:
+# a fração de posições iguais entre duas assinaturas estima a similaridade de Jaccard dos conjuntos.
+# A assinatura é dividida em BANDS faixas; documentos com uma faixa idêntica caem no mesmo balde e
+# viram candidatos, conferidos depois pela assinatura inteira. A busca consulta só os baldes das faixas
+# do documento novo, sem comparar com todos os documentos já vistos.
+#
+# Cada documento pertence a um grupo ('cluster_id', o id do primeiro documento do grupo). Um documento
+# parecido o bastante com um anterior entra no grupo dele e recebe 'duplicate_of'; o índice de texto
+# e o chat podem ignorar esses registros.
+
+NUM_PERM = 128
+BANDS = 32  # 32 faixas de 4 linhas: pares com Jaccard acima de ~0.5 quase sempre viram candidatos
+SHINGLE_WORDS = 3
+THRESHOLD = 0.7  # Similaridade estimada mínima para considerar quase-duplicata
+HASH_BLOCK = 4096  # Shingles processados por vez (limita a matriz NUM_PERM x bloco)
+TEXT_SLICE = 1024 * 1024  # Caracteres processados por vez ao calcular a assinatura de um texto inteiro
+SEED = 20240607  # Fixo: as assinaturas gravadas precisam continuar comparáveis entre execuções
+
+WORD_RE = re.compile(r"[^\W_]+")
+TRAILING_WORD_RE = re.compile(r"[^\W_]*\Z")
+UINT64 = np.uint64
+
+
+# Mistura de 64 bits (finalizador do splitmix64), aplicada a um vetor inteiro de uma vez
+def mix64(values):
+    values = values ^ (values >> UINT64(30))
+    values = values * UINT64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> UINT64(27))
+    values = values * UINT64(0x94D049BB133111EB)
+    return values ^ (values >> UINT64(31))
+
+
+# Hashes (uint64) de uma lista de palavras; o crc32 de cada palavra é a única etapa por palavra
+def word_hashes(words):
+    return mix64(np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=UINT64, count=len(words)))
+
+
+# Hashes dos shingles de 'width' palavras seguidas, combinados em numpy
+def combine_shingles(hashes, width):
+    count = len(hashes) - width + 1
+    shingles = np.zeros(count, dtype=UINT64)
+    with np.errstate(over="ignore"):  # A multiplicação em uint64 é módulo 2**64 de propósito
+        for position in range(width):
+            shingles = mix64(shingles * UINT64(0x9E3779B97F4A7C15) + hashes[position:position + count])
+    return shingles
+
+
+# Função para calcular os hashes dos shingles distintos de um texto
+def shingle_hashes(text, shingle_words=SHINGLE_WORDS):
+    words = WORD_RE.findall((text or "").lower())
+    if not words:
+        return np.empty(0, dtype=UINT64)
+    return np.unique(combine_shingles(word_hashes(words), min(shingle_words, len(words))))
+
+
+# Assinatura calculada aos poucos, para textos extraídos em partes (modo streaming): guarda só a
+# assinatura parcial, as últimas palavras (shingles que atravessam o fim da parte) e a palavra
+# possivelmente cortada no fim da parte. O resultado é o mesmo de signature() com o texto inteiro.
+class SignatureBuilder:
+    def __init__(self, index):
+        self.index = index
+        self.signature = None
+        self.words = 0
+        self.tail = ""
+        self.previous = np.empty(0, dtype=UINT64)
+
+    def update(self, text):
+        text = self.tail + text
+        cut = TRAILING_WORD_RE.search(text).start()
+        self.tail = text[cut:]
+        self._add_words(WORD_RE.findall(text[:cut].lower()))
+
+    def _add_words(self, words):
+        if not words:
+            return
+        self.words += len(words)
+        hashes = np.concatenate([self.previous, word_hashes(words)])
+        width = self.index.shingle_words
+        if len(hashes) >= width:
+            self._add_shingles(combine_shingles(hashes, width))
+        self.previous = hashes[max(0, len(hashes) - (width - 1)):]
+
+    def _add_shingles(self, shingles):
+        partial = self.index.minhash(np.unique(shingles))
+        self.signature = partial if self.signature is None else np.minimum(self.signature, partial)
+
+    def digest(self):
+        self._add_words(WORD_RE.findall(self.tail.lower()))
+        self.tail = ""
+        if 0 < self.words < self.index.shingle_words:
+            self._add_shingles(combine_shingles(self.previous, self.words))  # Texto menor que um shingle
+        return self.signature
+
+
+class NearDuplicateIndex:
+    def __init__(self, db_path, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD, shingle_words=SHINGLE_WORDS):
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        self.db_path = Path(db_path)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_words = shingle_words
+        rng = np.random.default_rng(SEED)
+        # Funções de hash h(x) = (a * x + b) >> 32 (multiply-shift), uma por linha da assinatura
+        self.a = rng.integers(1, 2 ** 63, size=(num_perm, 1), dtype=np.int64).astype(UINT64) * UINT64(2) + UINT64(1)
+        self.b = rng.integers(0, 2 ** 63, size=(num_perm, 1), dtype=np.int64).astype(UINT64)
+        self.band_weights = mix64(np.arange(1, self.rows + 1, dtype=UINT64))
+        self._local = threading.local()
+
+    # Conexão por processo e por thread (o pool leve usa threads do processo principal)
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS docs (
+                    doc_id TEXT PRIMARY KEY,
+                    cluster_id TEXT NOT NULL,
+                    duplicate_of TEXT,
+                    similarity REAL,
+                    signature BLOB NOT NULL,
+                    updated REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS docs_cluster ON docs (cluster_id);
+                CREATE TABLE IF NOT EXISTS buckets (
+                    band INTEGER NOT NULL,
+                    key INTEGER NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    PRIMARY KEY (band, key, doc_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS buckets_doc ON buckets (doc_id);
+            """)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # Função para calcular a assinatura MinHash (uint32 x num_perm) de um texto; None se não há palavras
+    def signature(self, text):
+        builder = self.builder()
+        text = text or ""
+        for start in range(0, len(text), TEXT_SLICE):  # Em fatias: a lista de palavras não cresce com o texto
+            builder.update(text[start:start + TEXT_SLICE])
+        return builder.digest()
+
+    def builder(self):
+        return SignatureBuilder(self)
+
+    # Menor valor de cada função de hash sobre um vetor de hashes de shingles
+    def minhash(self, hashes):
+        signature = np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        with np.errstate(over="ignore"):
+            for start in range(0, len(hashes), HASH_BLOCK):
+                block = hashes[start:start + HASH_BLOCK]
+                values = ((self.a * block + self.b) >> UINT64(32)).astype(np.uint32)
+                np.minimum(signature, values.min(axis=1), out=signature)
+        return signature
+
+    # Chaves dos baldes: cada faixa de 'rows' valores vira um inteiro de 64 bits (com sinal, para o SQLite)
+    def band_keys(self, signature):
+        bands = signature.reshape(self.bands, self.rows).astype(UINT64)
+        with np.errstate(over="ignore"):
+            keys = mix64((bands * self.band_weights).sum(axis=1, dtype=UINT64))
+        return keys.view(np.int64)
+
+    # Função para registrar um documento e encontrar o seu grupo. Devolve {"cluster_id", "duplicate_of",
+    # "similarity"} ou None para textos sem palavras. Registrar de novo o mesmo doc_id substitui o anterior.
+    def assign(self, doc_id, text):
+        return self.assign_signature(doc_id, self.signature(text))
+
+    def assign_signature(self, doc_id, signature):
+        if signature is None:
+            self.remove(doc_id)
+            return None
+        keys = [int(key) for key in self.band_keys(signature)]
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")  # Busca e inserção juntas: dois processos não abrem o mesmo grupo
+            conn.execute("DELETE FROM buckets WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+            candidates = set()
+            for band, key in enumerate(keys):
+                candidates.update(candidate for (candidate,) in conn.execute(
+                    "SELECT doc_id FROM buckets WHERE band = ? AND key = ?", (band, key)))
+
+            cluster_id, duplicate_of, similarity = doc_id, None, None
+            if candidates:
+                rows = conn.execute(
+                    f"SELECT doc_id, cluster_id, signature FROM docs WHERE doc_id IN ({', '.join('?' * len(candidates))})",
+                    list(candidates)).fetchall()
+                signatures = np.frombuffer(b"".join(row[2] for row in rows), dtype=np.uint32).reshape(len(rows), -1)
+                similarities = (signatures == signature).mean(axis=1)
+                best = int(similarities.argmax())
+                if similarities[best] >= self.threshold:
+                    similarity = round(float(similarities[best]), 3)
+                    cluster_id = rows[best][1]
+                    # O primeiro documento do grupo reprocessado continua sendo o principal
+                    if cluster_id != doc_id:
+                        duplicate_of = rows[best][0]
+
+            conn.execute("INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?)",
+                         (doc_id, cluster_id, duplicate_of, similarity, signature.tobytes(), time.time()))
+            conn.executemany("INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)",
+                             [(band, key, doc_id) for band, key in enumerate(keys)])
+        return {"cluster_id": cluster_id, "duplicate_of": duplicate_of, "similarity": similarity}
+
+    def remove(self, doc_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM buckets WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+
+    # Função para listar os grupos com mais de um documento: {cluster_id: [doc_id, ...]}
+    def clusters(self):
+        groups = {}
+        for cluster_id, doc_id in self._connect().execute(
+                "SELECT cluster_id, doc_id FROM docs WHERE cluster_id IN "
+                "(SELECT cluster_id FROM docs GROUP BY cluster_id HAVING COUNT(*) > 1) ORDER BY cluster_id, updated"):
+            groups.setdefault(cluster_id, []).append(doc_id)
+        return groups
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            "documents": conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0],
+            "clusters": conn.execute("SELECT COUNT(DISTINCT cluster_id) FROM docs").fetchone()[0],
+            "duplicates": conn.execute("SELECT COUNT(*) FROM docs WHERE duplicate_of IS NOT NULL").fetchone()[0],
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Grupos de quase-duplicatas dos textos extraídos")
+    parser.add_argument("db_path", help="Banco de assinaturas (state/near_duplicates.sqlite)")
+    parser.add_argument("--clusters", action="store_true", help="Lista os grupos com mais de um documento")
+    args = parser.parse_args()
+    index = NearDuplicateIndex(args.db_path)
+    if args.clusters:
+        print(json.dumps(index.clusters(), ensure_ascii=False, indent=4))
+    logging.info(f"{Fore.GREEN}{index.stats()}")
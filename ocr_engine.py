@@ -0,0 +1,112 @@
+import logging
+import os
+import queue
+import threading
+from colorama import Fore
+
+
+# OCR com o pytesseract: cada chamada grava um arquivo temporário, inicia um processo
+# 'tesseract' e recarrega os dados do idioma. Usado quando o tesserocr não está instalado.
+class PytesseractBackend:
+    name = "pytesseract"
+    in_process = False  # Cada chamada roda em um processo separado
+
+    def __init__(self, lang, oem=3, psm=3):
+        import pytesseract
+
+        self.pytesseract = pytesseract
+        self.lang = lang
+        self.oem = oem
+        self.psm = psm
+
+    def image_to_string(self, image, dpi=None):
+        config = f"--oem {self.oem} --psm {self.psm}" + (f" --dpi {dpi}" if dpi else "")
+        return self.pytesseract.image_to_string(image, lang=self.lang, config=config)
+
+    def images_to_strings(self, images, dpi=None):
+        return [self.image_to_string(image, dpi) for image in images]
+
+
+# OCR em processo com o tesserocr (API C++ do Tesseract). Mantém um pool de engines que carregam
+# os dados do idioma uma única vez e recebem imagens PIL diretamente da memória. O tesserocr
+# libera o GIL durante o reconhecimento, então várias threads podem usar engines diferentes.
+class TesserocrBackend:
+    name = "tesserocr"
+    in_process = True
+
+    def __init__(self, lang, oem=3, psm=3, pool_size=1):
+        import tesserocr
+
+        self.tesserocr = tesserocr
+        self.lang = lang
+        self.oem = oem
+        self.psm = psm
+        self.pool_size = pool_size
+        self.engines = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    # Pega uma engine livre; cria uma nova enquanto o pool não estiver cheio
+    def _acquire(self):
+        try:
+            return self.engines.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.pool_size:
+                self.created += 1
+                return self.tesserocr.PyTessBaseAPI(lang=self.lang, oem=self.oem, psm=self.psm)
+        return self.engines.get()
+
+    def _recognize(self, engine, image, dpi):
+        engine.SetImage(image)
+        if dpi:
+            engine.SetSourceResolution(dpi)
+        return engine.GetUTF8Text()
+
+    def image_to_string(self, image, dpi=None):
+        engine = self._acquire()
+        try:
+            return self._recognize(engine, image, dpi)
+        finally:
+            self.engines.put(engine)
+
+    # Lote: várias imagens com a mesma engine, sem voltar ao pool entre elas
+    def images_to_strings(self, images, dpi=None):
+        engine = self._acquire()
+        try:
+            return [self._recognize(engine, image, dpi) for image in images]
+        finally:
+            self.engines.put(engine)
+
+    def close(self):
+        while True:
+            try:
+                self.engines.get_nowait().End()
+            except queue.Empty:
+                return
+
+
+# Função para criar o backend de OCR: "auto" usa o tesserocr se estiver instalado
+def create_ocr_backend(backend, lang, oem=3, psm=3, pool_size=1):
+    if backend in ("auto", "tesserocr"):
+        try:
+            return TesserocrBackend(lang, oem, psm, pool_size)
+        except ImportError:
+            if backend == "tesserocr":
+                raise
+            logging.info(f"{Fore.YELLOW}tesserocr não instalado, usando pytesseract para o OCR.")
+    return PytesseractBackend(lang, oem, psm)
+
+
+# Um backend por processo (as engines não podem ser compartilhadas entre processos)
+backends = {}
+backends_lock = threading.Lock()
+
+
+def get_ocr_backend(backend, lang, oem=3, psm=3, pool_size=1):
+    key = (os.getpid(), backend, lang, oem, psm)
+    with backends_lock:
+        if key not in backends:
+            backends[key] = create_ocr_backend(backend, lang, oem, psm, pool_size)
+        return backends[key]
@@ -0,0 +1,138 @@
+import logging
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+from colorama import Fore
+
+
+# Converte documentos (.doc, .odt, .rtf...) para .docx com o LibreOffice em lotes: os pedidos
+# que chegam dentro de 'batch_window' segundos são convertidos por um único processo soffice,
+# em vez de um processo (com vários segundos de inicialização) por arquivo.
+#
+# O perfil do LibreOffice é mantido entre os lotes (a criação do perfil é a parte mais lenta da
+# primeira inicialização). Os arquivos convertidos vão para 'scratch_dir', nunca para a pasta de
+# origem. Se um lote passar do tempo limite, o processo é morto, o perfil recriado e os
+# documentos do lote são tentados um a um para isolar o arquivo problemático.
+class OfficeConverter:
+    def __init__(self, scratch_dir, batch_size=32, batch_window=0.5, timeout_per_document=120,
+                 soffice="soffice"):
+        self.scratch_dir = Path(scratch_dir)
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.timeout_per_document = timeout_per_document
+        self.soffice = soffice
+        self.requests = queue.Queue()
+        self.thread = None
+        self.thread_lock = threading.Lock()
+        self.profile_dir = self.scratch_dir / "profile"
+
+    # Função para converter um documento; bloqueia até o lote do documento terminar.
+    # Retorna o caminho do .docx em 'scratch_dir' (quem chamou deve apagá-lo depois de usar).
+    def convert(self, doc_path, target_format="docx"):
+        self._ensure_thread()
+        future = Future()
+        self.requests.put((Path(doc_path), target_format, future))
+        return future.result()
+
+    def _ensure_thread(self):
+        with self.thread_lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="office-converter", daemon=True)
+                self.thread.start()
+
+    # Função para encerrar a thread de conversão
+    def close(self):
+        with self.thread_lock:
+            if self.thread is not None and self.thread.is_alive():
+                self.requests.put(None)
+                self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            batch = [item]
+            # Junta os pedidos que chegarem dentro da janela do lote
+            try:
+                while len(batch) < self.batch_size:
+                    item = self.requests.get(timeout=self.batch_window)
+                    if item is None:
+                        self.requests.put(None)  # Encerrar depois deste lote
+                        break
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            self._convert_batch(batch)
+
+    def _convert_batch(self, batch):
+        # O soffice grava '<nome>.docx' em um único diretório: nomes repetidos vão em lotes separados
+        by_format = {}
+        for doc_path, target_format, future in batch:
+            groups = by_format.setdefault(target_format, [[]])
+            group = next((group for group in groups if all(p.stem != doc_path.stem for p, _ in group)), None)
+            if group is None:
+                group = []
+                groups.append(group)
+            group.append((doc_path, future))
+        for target_format, groups in by_format.items():
+            for group in groups:
+                if group:
+                    self._run_soffice(group, target_format)
+
+    def _run_soffice(self, group, target_format, retry_individually=True):
+        self.scratch_dir.mkdir(parents=True, exist_ok=True)
+        out_dir = Path(tempfile.mkdtemp(prefix="batch-", dir=self.scratch_dir))
+        cmd = [
+            self.soffice, "--headless", "--norestore", "--nologo", "--nolockcheck",
+            f"-env:UserInstallation={self.profile_dir.resolve().as_uri()}",
+            "--convert-to", target_format, "--outdir", str(out_dir),
+        ] + [str(doc_path.resolve()) for doc_path, _ in group]
+        timeout = self.timeout_per_document * len(group)
+        logging.info(f"{Fore.GREEN}Convertendo {len(group)} documento(s) com uma instância do LibreOffice...")
+
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                       start_new_session=True)
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                # Instância travada: matar o grupo de processos e recomeçar com um perfil novo
+                os.killpg(process.pid, signal.SIGKILL)
+                process.communicate()
+                shutil.rmtree(self.profile_dir, ignore_errors=True)
+                logging.error(f"{Fore.RED}LibreOffice excedeu {timeout}s; instância reiniciada.")
+                if retry_individually and len(group) > 1:
+                    for item in group:
+                        self._run_soffice([item], target_format, retry_individually=False)
+                else:
+                    for doc_path, future in group:
+                        future.set_exception(TimeoutError(f"Conversão de {doc_path} excedeu {timeout}s"))
+                return
+            if stderr:
+                logging.warning(f"{Fore.YELLOW}Saída de erro do LibreOffice: {stderr.strip()}")
+
+            for doc_path, future in group:
+                converted = out_dir / f"{doc_path.stem}.{target_format}"
+                if converted.exists():
+                    # Nome único para que o diretório do lote possa ser removido já
+                    final_path = self.scratch_dir / f"{uuid.uuid4().hex}-{converted.name}"
+                    converted.replace(final_path)
+                    future.set_result(final_path)
+                else:
+                    future.set_exception(RuntimeError(
+                        f"Arquivo convertido não foi encontrado para {doc_path} (código {process.returncode})"))
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from colorama import Fore
+
+# Tamanho dos blocos lidos ao calcular o hash do conteúdo
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+# Função para calcular o hash SHA-256 do conteúdo de um arquivo sem carregá-lo inteiro na memória
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Cache persistente de resultados de extração, endereçado pelo conteúdo do arquivo
+# e pela configuração do extrator. Guardado em SQLite para ser compartilhado pelos
+# processos dos pools; cada processo abre a sua própria conexão.
+class ResultCache:
+    def __init__(self, db_path, max_bytes):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._conn_pid = None
+        self._hash_memo = {}
+
+    # Conexão por processo (conexões SQLite não podem atravessar um fork)
+    def _connect(self):
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0), ('bytes', 0)")
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    # Função para obter o hash do conteúdo; memoriza por (caminho, tamanho, mtime) para que
+    # outras etapas do mesmo arquivo não precisem lê-lo de novo
+    def file_hash(self, file_path):
+        stat = os.stat(file_path)
+        memo_key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+        content_hash = self._hash_memo.get(memo_key)
+        if content_hash is None:
+            content_hash = file_sha256(file_path)
+            if len(self._hash_memo) >= 1024:
+                self._hash_memo.clear()
+            self._hash_memo[memo_key] = content_hash
+        return content_hash
+
+    # Função para gerar a chave: hash do conteúdo + configuração do extrator
+    def make_key(self, file_path, config):
+        config_json = json.dumps(config, sort_keys=True)
+        return hashlib.sha256(f"{self.file_hash(file_path)}:{config_json}".encode('utf-8')).hexdigest()
+
+    # Função para buscar um resultado; atualiza o acesso (LRU) e os contadores
+    def get(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+                return None
+            conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'hits'")
+        return json.loads(row[0])
+
+    # Função para guardar um resultado e remover os menos usados se o limite for excedido
+    def put(self, key, json_data):
+        data = json.dumps(json_data, ensure_ascii=False)
+        size = len(data.encode('utf-8'))
+        if size > self.max_bytes:
+            logging.warning(f"{Fore.YELLOW}Resultado de {size} bytes maior que o limite do cache, não armazenado.")
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            old = conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, data, size, time.time()))
+            conn.execute("UPDATE counters SET value = value + ? WHERE name = 'bytes'",
+                         (size - (old[0] if old else 0),))
+            self._evict(conn)
+
+    # Remoção LRU até o cache voltar ao tamanho máximo
+    def _evict(self, conn):
+        total = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+        while total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM results ORDER BY last_access LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            conn.execute("UPDATE counters SET value = ? WHERE name = 'bytes'", (max(total, 0),))
+
+    # Função para obter os contadores de acertos/falhas e o tamanho atual do cache
+    def stats(self):
+        conn = self._connect()
+        stats = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        stats['entries'] = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return stats
@@ -0,0 +1,195 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from colorama import Fore
+
+# Agendador dos arquivos de 'input_dir' para os pools, com custo estimado de cada trabalho.
+#
+# Cada pool tem uma fila de espera limitada ('lookahead') e uma janela de trabalhos em andamento
+# ('capacity'). As filas são preenchidas aos poucos por uma única fonte de pares (pool, item) (uma
+# varredura de 'input_dir'): itens de um pool com a fila cheia ficam na reserva do pool ('reserve',
+# só os itens, ainda sem preparo), e a fonte só para de ser lida (contrapressão) quando a reserva do
+# pool do próximo item também está cheia. Assim um pool cheio não impede os outros de receber
+# arquivos, e a memória usada depende só dos limites, não do tamanho do acúmulo de arquivos.
+#
+# Políticas de ordem dentro de cada fila:
+# - SJF: o trabalho de menor custo estimado primeiro (arquivos pequenos não esperam os grandes)
+# - FAIR: faixas de custo (pequeno, médio, grande) com pesos; cada faixa recebe uma parte do pool
+#   proporcional ao peso, então trabalhos grandes também andam mesmo com pequenos chegando sempre.
+#
+# Cada trabalho recebe um tempo limite proporcional ao custo estimado; quem faz o envio (submit)
+# decide como aplicá-lo. Trabalhos que passam do limite sem terminar são registrados no log, com o
+# tempo contado do início do trabalho no pool ('elapsed'), não do envio (o pool pode ter fila própria).
+
+SJF = "sjf"
+FAIR = "fair"
+FAIR_BANDS = (10.0, 120.0)  # Limites de custo (segundos estimados) entre as faixas
+FAIR_WEIGHTS = (4, 2, 1)  # Peso das faixas pequena, média e grande
+
+
+# Fila por menor custo estimado (empate: ordem de chegada)
+class ShortestJobFirst:
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+
+    def push(self, cost, item):
+        heapq.heappush(self.heap, (cost, next(self.counter), item))
+
+    def pop(self):
+        cost, _, item = heapq.heappop(self.heap)
+        return cost, item
+
+    def __len__(self):
+        return len(self.heap)
+
+
+# Fila justa ponderada por faixa de custo: a próxima faixa é a de menor custo servido / peso,
+# e dentro da faixa vale a ordem de chegada
+class WeightedFair:
+    def __init__(self, bands=FAIR_BANDS, weights=FAIR_WEIGHTS):
+        self.bands = bands
+        self.weights = weights
+        self.queues = [deque() for _ in weights]
+        self.served = [0.0] * len(weights)
+
+    def push(self, cost, item):
+        band = sum(cost > limit for limit in self.bands)
+        if not self.queues[band]:
+            # Faixa que estava vazia não acumula crédito do tempo parada
+            active = [self.served[other] / self.weights[other] for other, queue in enumerate(self.queues) if queue]
+            if active:
+                self.served[band] = max(self.served[band], min(active) * self.weights[band])
+        self.queues[band].append((cost, item))
+
+    def pop(self):
+        band = min((index for index, queue in enumerate(self.queues) if queue),
+                   key=lambda index: self.served[index] / self.weights[index])
+        cost, item = self.queues[band].popleft()
+        self.served[band] += cost
+        return cost, item
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues)
+
+
+class Scheduler:
+    # submit(item, timeout) -> Future; prepare(item) -> custo estimado, ou None para não agendar;
+    # capacity: {pool: trabalhos em andamento ao mesmo tempo}; elapsed(item) -> segundos desde o
+    # início do trabalho no pool, ou None se ainda não começou (sem 'elapsed': desde o envio)
+    def __init__(self, submit, prepare, capacity, policy=SJF, lookahead=1024, timeout_factor=10.0,
+                 min_timeout=300.0, reserve=65536, elapsed=None):
+        if policy not in (SJF, FAIR):
+            raise ValueError(f"política de agendamento desconhecida: {policy}")
+        self.submit = submit
+        self.prepare = prepare
+        self.capacity = dict(capacity)
+        self.policy = policy
+        self.lookahead = lookahead
+        self.reserve = reserve
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.elapsed = elapsed
+        self.queues = {pool: ShortestJobFirst() if policy == SJF else WeightedFair() for pool in capacity}
+        self.in_flight = {pool: {} for pool in capacity}  # future -> (item, envio, tempo limite, avisado)
+        self.condition = threading.Condition()
+        self.completed = 0
+        self.stats = {"submitted": 0, "completed": 0, "timed_out": 0, "estimated_seconds": 0.0}
+
+    # Tempo limite de um trabalho (0 = sem limite)
+    def job_timeout(self, cost):
+        if not self.timeout_factor:
+            return 0
+        return max(self.min_timeout, cost * self.timeout_factor)
+
+    # Função para colocar um trabalho na fila do pool
+    def add(self, item, pool, cost):
+        self.queues[pool].push(cost, item)
+
+    # Função para enviar trabalhos aos pools enquanto houver vaga na janela de cada um
+    def dispatch(self):
+        for pool, queue in self.queues.items():
+            while queue and len(self.in_flight[pool]) < self.capacity[pool]:
+                cost, item = queue.pop()
+                timeout = self.job_timeout(cost)
+                future = self.submit(item, timeout)
+                with self.condition:
+                    self.in_flight[pool][future] = [item, time.monotonic(), timeout, False]
+                self.stats["submitted"] += 1
+                self.stats["estimated_seconds"] += cost
+                future.add_done_callback(lambda done, pool=pool: self._on_done(pool, done))
+
+    def _on_done(self, pool, future):
+        with self.condition:
+            self.in_flight[pool].pop(future, None)
+            self.completed += 1
+            self.stats["completed"] += 1
+            self.condition.notify_all()
+
+    def queued(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def running(self):
+        with self.condition:
+            return sum(len(futures) for futures in self.in_flight.values())
+
+    # Função para esperar algum trabalho terminar (ou o tempo acabar)
+    def wait(self, timeout=None, since=None):
+        with self.condition:
+            before = self.completed if since is None else since
+            self.condition.wait_for(lambda: self.completed != before, timeout)
+
+    # Função para registrar os trabalhos que passaram do tempo limite sem terminar (uma vez cada)
+    def check_timeouts(self):
+        now = time.monotonic()
+        with self.condition:
+            jobs = [job for futures in self.in_flight.values() for job in futures.values() if job[2] and not job[3]]
+        for job in jobs:  # 'elapsed' pode consultar o disco: fora da trava
+            item, submitted, timeout, _ = job
+            elapsed = self.elapsed(item) if self.elapsed else now - submitted
+            if elapsed is not None and elapsed > timeout:
+                job[3] = True
+                self.stats["timed_out"] += 1
+                logging.warning(f"{Fore.YELLOW}{item} em andamento há {elapsed:.0f}s, "
+                                f"acima do tempo limite de {timeout:.0f}s")
+
+    def _enqueue(self, pool, item):
+        cost = self.prepare(item)
+        if cost is not None:
+            self.add(item, pool, cost)
+
+    # Função para processar a fonte até o fim: iterável de (pool, item), lido uma vez e sob demanda
+    def run(self, source):
+        source = iter(source)
+        reserves = {pool: deque() for pool in self.queues}
+        held = None  # Próximo item, esperando vaga na reserva do seu pool
+        exhausted = False
+        while True:
+            for pool, reserve in reserves.items():
+                while reserve and len(self.queues[pool]) < self.lookahead:
+                    self._enqueue(pool, reserve.popleft())
+            while not exhausted:
+                if held is None:
+                    held = next(source, None)
+                    if held is None:
+                        exhausted = True
+                        break
+                pool, item = held
+                if len(self.queues[pool]) < self.lookahead:
+                    self._enqueue(pool, item)
+                elif len(reserves[pool]) < self.reserve:
+                    reserves[pool].append(item)
+                else:
+                    break  # Reserva cheia: continuar a leitura quando o pool andar
+                held = None
+            with self.condition:
+                completed = self.completed
+            self.dispatch()
+            if exhausted and not any(reserves.values()) and not self.queued() and not self.running():
+                return
+            # Janelas cheias (ou só resta esperar): aguardar a próxima conclusão
+            self.wait(timeout=1.0, since=completed)
+            self.check_timeouts()
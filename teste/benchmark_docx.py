@@ -0,0 +1,185 @@
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+# Permite importar os módulos da raiz do projeto ao rodar a partir de 'teste/'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from synthetic_corpus import sentence  # noqa: E402
+
+# Compara a extração de DOCX em streaming (docx_stream) com o python-docx em documentos grandes
+# gerados na hora (parágrafos, tabelas, cabeçalho, rodapé, notas de rodapé e caixa de texto).
+# Cada extração roda em um processo separado para medir o pico de memória (ru_maxrss) de cada
+# uma. Confere também que todos os parágrafos vistos pelo python-docx aparecem, na mesma ordem, na
+# saída do streaming, e que o streaming inclui o que o python-docx perde.
+# Uso: python teste/benchmark_docx.py [--paragraphs N]  (código de saída 1 em caso de falha)
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+NAMESPACES = (f'xmlns:w="{W}" xmlns:r="{R}" xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+              'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+              'xmlns:v="urn:schemas-microsoft-com:vml" mc:Ignorable="wps"')
+MARKERS = ("CABEÇALHO-ÚNICO", "RODAPÉ-ÚNICO", "NOTA-ÚNICA", "CÉLULA-ÚNICA", "CAIXA-ÚNICA")
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/header1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml"/>
+<Override PartName="/word/footer1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml"/>
+<Override PartName="/word/footnotes.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"/>
+</Types>"""
+PACKAGE_RELS = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="{REL_TYPE}officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+DOCUMENT_RELS = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="{REL_TYPE}header" Target="header1.xml"/>
+<Relationship Id="rId2" Type="{REL_TYPE}footer" Target="footer1.xml"/>
+<Relationship Id="rId3" Type="{REL_TYPE}footnotes" Target="footnotes.xml"/>
+</Relationships>"""
+
+
+def paragraph_xml(text):
+    return f'<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def part_xml(root, body):
+    return f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:{root} {NAMESPACES}>{body}</w:{root}>'
+
+
+def table_xml(rng, rows, marker=None):
+    cells = []
+    for row in range(rows):
+        texts = [sentence(rng, 4) for _ in range(3)]
+        if marker and row == 0:
+            texts[0] = marker
+        cells.append("<w:tr>" + "".join(f"<w:tc>{paragraph_xml(text)}</w:tc>" for text in texts) + "</w:tr>")
+    return "<w:tbl>" + "".join(cells) + "</w:tbl>"
+
+
+def text_box_xml(text):
+    content = f"<w:txbxContent>{paragraph_xml(text)}</w:txbxContent>"
+    return ("<w:p><w:r><mc:AlternateContent>"
+            f"<mc:Choice Requires=\"wps\"><w:drawing><wps:txbx>{content}</wps:txbx></w:drawing></mc:Choice>"
+            f"<mc:Fallback><w:pict><v:textbox>{content}</v:textbox></w:pict></mc:Fallback>"
+            "</mc:AlternateContent></w:r><w:r><w:t>Âncora da caixa.</w:t></w:r></w:p>")
+
+
+# Gera o DOCX escrevendo o XML direto no zip (aos poucos: o processo que mede fica pequeno)
+def write_docx(path, paragraphs, seed=7):
+    rng = random.Random(seed)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", PACKAGE_RELS)
+        archive.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS)
+        archive.writestr("word/header1.xml", part_xml("hdr", paragraph_xml(MARKERS[0])))
+        archive.writestr("word/footer1.xml", part_xml("ftr", paragraph_xml(MARKERS[1])))
+        archive.writestr("word/footnotes.xml", part_xml(
+            "footnotes", '<w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r></w:p></w:footnote>'
+                         f'<w:footnote w:id="1">{paragraph_xml(MARKERS[2])}</w:footnote>'))
+        with archive.open("word/document.xml", "w") as document:
+            document.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document {NAMESPACES}><w:body>'
+                           .encode("utf-8"))
+            document.write(text_box_xml(MARKERS[4]).encode("utf-8"))
+            for number in range(paragraphs):
+                document.write(paragraph_xml(sentence(rng, 12)).encode("utf-8"))
+                if number % 500 == 0:
+                    document.write(table_xml(rng, 20, MARKERS[3] if number == 0 else None).encode("utf-8"))
+            document.write(b'<w:sectPr><w:headerReference w:type="default" r:id="rId1"/>'
+                           b'<w:footerReference w:type="default" r:id="rId2"/></w:sectPr></w:body></w:document>')
+
+
+# Executado no processo filho: extrai, grava o texto e informa tempo e pico de memória. O streaming
+# grava as partes conforme são lidas (como no modo streaming do file_processor)
+def extract(extractor, path, output):
+    start = time.perf_counter()
+    characters = 0
+    with open(output, "w", encoding="utf-8") as f:
+        if extractor == "stream":
+            import docx_stream
+
+            for chunk in docx_stream.iter_docx_text(path):
+                f.write(chunk)
+                characters += len(chunk)
+        else:
+            import docx
+
+            text = "\n".join(para.text for para in docx.Document(path).paragraphs)
+            f.write(text)
+            characters = len(text)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"extractor": extractor, "seconds": round(elapsed, 3), "peak_rss_mb": round(peak_mb, 1),
+                      "characters": characters}))
+
+
+def run(extractor, path, output):
+    result = subprocess.run([sys.executable, __file__, "--extract", extractor, str(path), str(output)],
+                            check=True, capture_output=True, text=True)
+    return json.loads(result.stdout)
+
+
+# Os parágrafos do python-docx devem aparecer na saída do streaming, na mesma ordem
+def is_subsequence(lines, other_lines):
+    remaining = iter(other_lines)
+    return all(any(line == other for other in remaining) for line in lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da extração de DOCX")
+    parser.add_argument("--paragraphs", type=int, default=100_000)
+    parser.add_argument("--extract", nargs=3, metavar=("EXTRATOR", "DOCX", "SAIDA"), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+    if args.extract:
+        extract(*args.extract)
+        return
+
+    failures = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = Path(work_dir) / "grande.docx"
+        write_docx(path, args.paragraphs)
+        with zipfile.ZipFile(path) as archive:
+            xml_mb = archive.getinfo("word/document.xml").file_size / (1024 * 1024)
+        print(f"DOCX com {args.paragraphs} parágrafos: {path.stat().st_size / (1024 * 1024):.1f} MB "
+              f"({xml_mb:.1f} MB de XML)")
+
+        results = []
+        for extractor in ("python-docx", "stream"):
+            result = run(extractor, path, Path(work_dir) / f"{extractor}.txt")
+            results.append(result)
+            print(f"{extractor:<12} {result['seconds']:>8.2f}s  pico {result['peak_rss_mb']:>8.1f} MB  "
+                  f"{result['characters']} caracteres")
+
+        reference = (Path(work_dir) / "python-docx.txt").read_text(encoding="utf-8").split("\n")
+        streamed = (Path(work_dir) / "stream.txt").read_text(encoding="utf-8").split("\n")
+        if not is_subsequence(reference, streamed):
+            failures.append("parágrafos do python-docx ausentes ou fora de ordem na saída do streaming")
+        for marker in MARKERS:
+            count = sum(line.count(marker) for line in streamed)
+            if count != 1:
+                failures.append(f"{marker} aparece {count} vezes na saída do streaming (esperado 1)")
+        python_docx, stream = results
+        if stream["peak_rss_mb"] > python_docx["peak_rss_mb"] / 2:
+            failures.append("o streaming não usou menos da metade da memória do python-docx")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"paragraphs": args.paragraphs, "xml_mb": round(xml_mb, 1), "results": results}, f, indent=4)
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
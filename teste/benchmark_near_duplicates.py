@@ -0,0 +1,107 @@
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import near_duplicates  # noqa: E402
+
+# Benchmark da detecção de quase-duplicatas: gera documentos originais e variantes (páginas
+# escaneadas de novo com erros de OCR, o mesmo documento com outra capa, transcrição de um áudio
+# enviado de novo com trechos cortados) e registra todos no índice MinHash/LSH em ordem aleatória.
+# Mede o tempo por documento e confere, contra a similaridade de Jaccard exata, quantas variantes
+# foram agrupadas com o original (revocação) e quantos documentos sem relação foram agrupados.
+# Uso: python teste/benchmark_near_duplicates.py  (código de saída 1 se a revocação ficar abaixo de 0.9
+# ou houver agrupamentos errados)
+
+VOCABULARY = [f"palavra{index}" for index in range(30000)]
+
+
+def make_document(rng):
+    return [rng.choice(VOCABULARY) for _ in range(rng.randint(300, 3000))]
+
+
+def ocr_noise(rng, words, rate=0.03):
+    return [rng.choice(VOCABULARY) if rng.random() < rate else word for word in words]
+
+
+def new_cover(rng, words):
+    return [rng.choice(VOCABULARY) for _ in range(len(words) // 10)] + words
+
+
+def trimmed(rng, words):
+    cut = len(words) // 20
+    return words[rng.randint(0, cut):len(words) - rng.randint(0, cut)]
+
+
+def jaccard(first, second):
+    first, second = (set(near_duplicates.shingle_hashes(text).tolist()) for text in (first, second))
+    return len(first & second) / len(first | second)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da detecção de quase-duplicatas (MinHash/LSH)")
+    parser.add_argument("--originals", type=int, default=2000)
+    parser.add_argument("--variants", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    originals = {f"original-{index}": make_document(rng) for index in range(args.originals)}
+    documents = dict(originals)
+    expected = {}  # variante -> original
+    for index in range(args.variants):
+        source = rng.choice(list(originals))
+        transform = rng.choice([ocr_noise, new_cover, trimmed])
+        name = f"variante-{index}-{transform.__name__}"
+        documents[name] = transform(rng, originals[source])
+        expected[name] = source
+    order = list(documents)
+    rng.shuffle(order)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="mychat-neardup-bench-"))
+    index = near_duplicates.NearDuplicateIndex(work_dir / "near_duplicates.sqlite")
+    clusters = {}
+    start = time.perf_counter()
+    for name in order:
+        clusters[name] = index.assign(name, " ".join(documents[name]))["cluster_id"]
+    elapsed = time.perf_counter() - start
+
+    signature_start = time.perf_counter()
+    for name in order[:200]:
+        index.signature(" ".join(documents[name]))
+    signature_ms = (time.perf_counter() - signature_start) / min(200, len(order)) * 1000
+
+    # Revocação: variantes com Jaccard exato acima do limite que ficaram no grupo do original
+    similar = {name: source for name, source in expected.items()
+               if jaccard(" ".join(documents[name]), " ".join(documents[source])) >= index.threshold}
+    found = sum(1 for name, source in similar.items() if clusters[name] == clusters[source])
+    wrong = sum(1 for name, cluster in clusters.items()
+                if expected.get(name, name) != expected.get(cluster, cluster))
+
+    results = {
+        "documents": len(documents),
+        "seconds": round(elapsed, 2),
+        "documents_per_second": round(len(documents) / elapsed, 1),
+        "signature_ms": round(signature_ms, 2),
+        "variants_above_threshold": len(similar),
+        "recall": round(found / len(similar), 3) if similar else None,
+        "wrong_clusters": wrong,
+        "index": index.stats(),
+    }
+    output = json.dumps(results, indent=4)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(1 if wrong or (similar and found / len(similar) < 0.9) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from PIL import Image, ImageDraw, ImageFont
+
+# Permite importar os módulos da raiz do projeto ao rodar a partir de 'teste/'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ocr_engine import PytesseractBackend, TesserocrBackend  # noqa: E402
+
+# Mede o custo por imagem de cada backend de OCR com "recibos" pequenos gerados na hora.
+# A diferença entre o pytesseract e o tesserocr com a mesma imagem é o overhead de processo,
+# arquivo temporário e carregamento do idioma que o pytesseract paga a cada chamada.
+
+WORDS = ["total", "valor", "pagamento", "cartão", "débito", "recibo", "loja", "item",
+         "quantidade", "preço", "desconto", "troco", "caixa", "nota", "fiscal", "data"]
+
+
+def load_font(size):
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+# Gera uma imagem pequena com algumas linhas de texto (determinística pela semente)
+def make_receipt(seed, lines=4):
+    rng = random.Random(seed)
+    font = load_font(22)
+    image = Image.new("L", (420, 40 + 34 * lines), 255)
+    draw = ImageDraw.Draw(image)
+    for line in range(lines):
+        text = " ".join(rng.choice(WORDS) for _ in range(3)) + f" {rng.randint(1, 999)},{rng.randint(0, 99):02d}"
+        draw.text((16, 20 + 34 * line), text, fill=0, font=font)
+    return image
+
+
+def bench(label, func, images, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(images)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    result = {"backend": label, "images": len(images), "best_seconds": round(best, 4),
+              "ms_per_image": round(best / len(images) * 1000, 2)}
+    print(f"{label:<24} {result['ms_per_image']:>8.2f} ms/imagem")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de OCR")
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--lang", default="por")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    images = [make_receipt(seed) for seed in range(args.images)]
+    results = []
+
+    pytesseract_backend = PytesseractBackend(args.lang)
+    results.append(bench("pytesseract", lambda imgs: [pytesseract_backend.image_to_string(i) for i in imgs],
+                         images, args.repeat))
+
+    try:
+        tesserocr_backend = TesserocrBackend(args.lang)
+    except ImportError:
+        print("tesserocr não instalado, pulando o backend em processo.")
+    else:
+        tesserocr_backend.image_to_string(images[0])  # Carrega a engine fora da medição
+        results.append(bench("tesserocr", lambda imgs: [tesserocr_backend.image_to_string(i) for i in imgs],
+                             images, args.repeat))
+        results.append(bench("tesserocr (lote)", tesserocr_backend.images_to_strings, images, args.repeat))
+        overhead = results[0]["ms_per_image"] - results[1]["ms_per_image"]
+        print(f"Overhead por imagem do pytesseract: {overhead:.2f} ms")
+        tesserocr_backend.close()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from synthetic_corpus import generate_corpus  # noqa: E402
+
+# Benchmark reproduzível do pipeline de ingestão: gera um corpus sintético, mede cada handler
+# process_* arquivo a arquivo e depois a vazão de ponta a ponta de process_files(), com o pico
+# de memória. O resultado sai em JSON para comparar execuções (antes/depois de uma mudança).
+
+# Tipo do corpus -> (nome do handler, módulos necessários)
+HANDLERS = {
+    "images": ("process_image", ["PIL"]),
+    "pdf": ("process_pdf", ["fitz", "PIL"]),
+    "docx": ("process_docx", ["docx"]),
+    "code": ("process_code", []),
+    "audio": ("process_audio_video", ["whisper", "numpy"]),
+}
+
+
+def missing_modules(modules):
+    return [module for module in modules if importlib.util.find_spec(module) is None]
+
+
+def peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return round(own, 1), round(children, 1)
+
+
+def summarize(timings, total_bytes):
+    total = sum(timings)
+    return {
+        "files": len(timings),
+        "total_seconds": round(total, 4),
+        "mean_seconds": round(statistics.mean(timings), 4),
+        "median_seconds": round(statistics.median(timings), 4),
+        "max_seconds": round(max(timings), 4),
+        "mb_per_second": round(total_bytes / 1024 / 1024 / total, 3) if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de ingestão (file_processor)")
+    parser.add_argument("--seed", type=int, default=42)
+    for kind in HANDLERS:
+        parser.add_argument(f"--{kind}", type=int, default=5, help=f"Quantidade de arquivos '{kind}'")
+    parser.add_argument("--skip-end-to-end", action="store_true", help="Mede apenas os handlers")
+    parser.add_argument("--keep", action="store_true", help="Não apaga a pasta temporária no final")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados (padrão: stdout)")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="mychat-bench-"))
+    # O file_processor lê a pasta de dados e a configuração na importação (e os processos dos pools também)
+    os.environ["MYCHAT_DATA_DIR"] = str(work_dir)
+    os.environ["MYCHAT_RESULT_CACHE"] = "0"  # Medir a extração, não o cache
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import file_processor
+
+    counts = {}
+    skipped = {}
+    for kind, (_, modules) in HANDLERS.items():
+        missing = missing_modules(modules)
+        if missing:
+            skipped[kind] = f"módulos ausentes: {', '.join(missing)}"
+        elif getattr(args, kind) > 0:
+            counts[kind] = getattr(args, kind)
+
+    corpus_dir = work_dir / "corpus"
+    generation_start = time.perf_counter()
+    corpus = generate_corpus(corpus_dir, counts, args.seed)
+    results = {
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count()},
+        "corpus": {"seed": args.seed, "counts": counts,
+                   "bytes": sum(path.stat().st_size for paths in corpus.values() for path in paths),
+                   "generation_seconds": round(time.perf_counter() - generation_start, 3)},
+        "skipped": skipped,
+        "handlers": {},
+    }
+
+    # Handlers, um arquivo por vez no processo atual
+    for kind, paths in corpus.items():
+        handler = getattr(file_processor, HANDLERS[kind][0])
+        timings = []
+        failures = 0
+        for path in paths:
+            target = file_processor.input_dir / path.relative_to(corpus_dir)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(path, target)
+            start = time.perf_counter()
+            try:
+                handler(target)
+            except Exception:
+                failures += 1  # Os handlers registram o erro e o repassam
+            timings.append(time.perf_counter() - start)
+            target.unlink()
+        results["handlers"][HANDLERS[kind][0]] = dict(
+            summarize(timings, sum(path.stat().st_size for path in paths)), failures=failures)
+
+    # Ponta a ponta: todos os arquivos em 'input_dir' e uma chamada a process_files()
+    if not args.skip_end_to_end and corpus:
+        shutil.rmtree(file_processor.output_dir, ignore_errors=True)
+        shutil.rmtree(file_processor.processed_dir, ignore_errors=True)
+        shutil.copytree(corpus_dir, file_processor.input_dir, dirs_exist_ok=True)
+        total_files = sum(len(paths) for paths in corpus.values())
+        start = time.perf_counter()
+        file_processor.process_files()
+        elapsed = time.perf_counter() - start
+        remaining = sum(1 for path in file_processor.input_dir.rglob('*') if path.is_file())
+        results["end_to_end"] = {
+            "files": total_files,
+            "seconds": round(elapsed, 3),
+            "files_per_second": round(total_files / elapsed, 3),
+            "left_in_input_dir": remaining,
+        }
+
+    own, children = peak_rss_mb()
+    results["peak_rss_mb"] = own
+    results["peak_rss_children_mb"] = children
+
+    output = json.dumps(results, ensure_ascii=False, indent=4)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+    if args.keep:
+        print(f"Pasta de trabalho mantida em {work_dir}", file=sys.stderr)
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
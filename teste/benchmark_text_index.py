@@ -0,0 +1,85 @@
+import argparse
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from synthetic_corpus import WORDS, paragraph  # noqa: E402
+import text_index  # noqa: E402
+
+# Benchmark do índice de texto: indexa documentos sintéticos em lotes (como as atualizações
+# incrementais do file_processor) e mede a latência das consultas BM25 com o índice em disco.
+
+# Vocabulário extra para que os termos tenham frequências variadas (alguns raros, outros comuns)
+RARE_WORDS = [f"termo{index}" for index in range(20000)]
+
+
+def make_document(rng):
+    text = " ".join(paragraph(rng) for _ in range(rng.randint(2, 8)))
+    return text + " " + " ".join(rng.choice(RARE_WORDS) for _ in range(rng.randint(5, 30)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do índice de texto (BM25)")
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--batches", type=int, default=20, help="Atualizações incrementais")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    work_dir = Path(tempfile.mkdtemp(prefix="mychat-index-bench-"))
+    index = text_index.TextIndex(work_dir / "index")
+    per_batch = max(1, args.documents // args.batches)
+
+    # Registros JSON no formato do file_processor, indexados em lotes
+    records_dir = work_dir / "processed_dir"
+    records_dir.mkdir()
+    indexing_seconds = 0.0
+    for batch in range(args.batches):
+        paths = []
+        for number in range(per_batch):
+            path = records_dir / f"doc-{batch}-{number}.json"
+            path.write_text(json.dumps({"file_name": path.name, "file_type": "text",
+                                        "content": make_document(rng)}), encoding="utf-8")
+            paths.append(path)
+        start = time.perf_counter()
+        index.add_json_files(paths)
+        indexing_seconds += time.perf_counter() - start
+
+    timings = []
+    for _ in range(args.queries):
+        query = " ".join([rng.choice(WORDS), rng.choice(RARE_WORDS), rng.choice(WORDS)])
+        query_start = time.perf_counter()
+        index.search(query, k=10)
+        timings.append((time.perf_counter() - query_start) * 1000)
+    timings.sort()
+
+    results = {
+        "documents": per_batch * args.batches,
+        "numpy": text_index.load_numpy() is not None,
+        "indexing_seconds": round(indexing_seconds, 2),
+        "documents_per_second": round(per_batch * args.batches / indexing_seconds, 1),
+        "index": index.stats(),
+        "index_mb": round(sum(path.stat().st_size for path in (work_dir / "index").iterdir()) / 1024 / 1024, 1),
+        "query_ms": {"median": round(statistics.median(timings), 2),
+                     "p95": round(timings[int(len(timings) * 0.95) - 1], 2),
+                     "max": round(timings[-1], 2)},
+    }
+    output = json.dumps(results, indent=4)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import difflib
+import json
+import sys
+import time
+from pathlib import Path
+
+# Permite importar os módulos da raiz do projeto ao rodar a partir de 'teste/'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from transcription import (BACKENDS, SAMPLE_RATE, get_transcriber, load_audio_window,  # noqa: E402
+                           set_cpu_threads)
+
+# Compara os backends de transcrição na CPU pelo fator de tempo real (RTF = tempo de transcrição /
+# duração do áudio; abaixo de 1 é mais rápido que o tempo real) para cada tamanho de modelo, com o
+# mesmo trecho de áudio e o mesmo número de threads. A semelhança do texto com o do Whisper em
+# float32 do mesmo modelo mostra quanto a quantização muda o resultado. O carregamento do modelo
+# fica fora do RTF.
+# O JSON de --output pode ser usado em MYCHAT_WHISPER_REALTIME_FACTORS_FILE para a escolha de
+# modelo pelo orçamento de tempo real (MYCHAT_WHISPER_REALTIME_BUDGET).
+# Uso: python teste/benchmark_transcricao.py AUDIO [--models tiny,base,small] [--threads 4]
+
+BASELINE = "whisper"
+
+
+def similarity(text, reference):
+    return difflib.SequenceMatcher(None, text.lower().split(), reference.lower().split()).ratio()
+
+
+def bench(backend, model_name, audio):
+    load_start = time.perf_counter()
+    try:
+        transcriber = get_transcriber(model_name, backend)
+    except ImportError as e:
+        print(f"{backend:<16} {model_name:<8} indisponível ({e})")
+        return None
+    load_seconds = time.perf_counter() - load_start
+    start = time.perf_counter()
+    result = transcriber.transcribe(audio)
+    seconds = time.perf_counter() - start
+    return {"backend": backend, "model": model_name, "load_seconds": round(load_seconds, 2),
+            "seconds": round(seconds, 2), "rtf": round(seconds / (len(audio) / SAMPLE_RATE), 4),
+            "text": result["text"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de transcrição (fator de tempo real)")
+    parser.add_argument("audio", help="Arquivo de áudio ou vídeo (decodificado com o ffmpeg)")
+    parser.add_argument("--seconds", type=float, default=120.0, help="Duração do trecho transcrito")
+    parser.add_argument("--models", default="tiny,base,small")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados")
+    args = parser.parse_args()
+
+    set_cpu_threads(args.threads)
+    audio = load_audio_window(args.audio, 0, args.seconds)
+    duration = len(audio) / SAMPLE_RATE
+    print(f"Trecho de {duration:.0f}s, {args.threads} threads")
+
+    results = []
+    baseline_texts = {}
+    backends = [BASELINE] + [backend for backend in args.backends.split(",") if backend != BASELINE]
+    for model_name in args.models.split(","):
+        for backend in backends:
+            result = bench(backend, model_name, audio)
+            if result is None:
+                continue
+            if backend == BASELINE:
+                baseline_texts[model_name] = result["text"]
+            if model_name in baseline_texts:
+                result["similarity"] = round(similarity(result["text"], baseline_texts[model_name]), 3)
+            results.append(result)
+            print(f"{backend:<16} {model_name:<8} RTF {result['rtf']:>7.3f}  "
+                  f"({1 / result['rtf']:.1f}x tempo real, carga {result['load_seconds']:.1f}s)  "
+                  f"semelhança com float32 {result.get('similarity', '-')}")
+
+    if args.output:
+        realtime_factors = {}
+        for result in results:
+            realtime_factors.setdefault(result["backend"], {})[result["model"]] = result["rtf"]
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"audio": args.audio, "seconds": round(duration, 1), "threads": args.threads,
+                       "realtime_factors": realtime_factors,
+                       "results": [{key: value for key, value in result.items() if key != "text"}
+                                   for result in results]}, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
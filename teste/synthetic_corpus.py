@@ -0,0 +1,144 @@
+import argparse
+import io
+import math
+import random
+import struct
+import wave
+from pathlib import Path
+
+# Gerador de um corpus sintético e determinístico (mesma semente = mesmos arquivos) para os
+# benchmarks, sem depender de arquivos externos. Os arquivos seguem as subpastas de 'input_dir'.
+
+WORDS = ["contrato", "cláusula", "pagamento", "prazo", "empresa", "cliente", "valor", "serviço",
+         "entrega", "reunião", "projeto", "relatório", "documento", "assinatura", "parte", "acordo",
+         "total", "recibo", "nota", "fiscal", "data", "rescisão", "multa", "garantia", "objeto"]
+
+
+def sentence(rng, words=10):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def paragraph(rng, sentences=4):
+    return " ".join(sentence(rng, rng.randint(6, 14)) for _ in range(sentences))
+
+
+def load_font(size):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+# Imagem em tons de cinza com linhas de texto (usada para imagens e páginas escaneadas de PDF)
+def render_text_image(lines, width=1240, font_size=28, line_height=44):
+    from PIL import Image, ImageDraw
+
+    font = load_font(font_size)
+    image = Image.new("L", (width, 60 + line_height * len(lines)), 255)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        draw.text((40, 30 + line_height * index), line, fill=0, font=font)
+    return image
+
+
+def write_image(path, rng, lines=12):
+    render_text_image([sentence(rng, 7) for _ in range(lines)]).save(path)
+
+
+# PDF com páginas que têm camada de texto e páginas só com imagem (exigem OCR)
+def write_pdf(path, rng, text_pages=3, image_pages=2):
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for _ in range(text_pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), "\n\n".join(paragraph(rng) for _ in range(5)), fontsize=11)
+    for _ in range(image_pages):
+        page = doc.new_page()
+        buffer = io.BytesIO()
+        render_text_image([sentence(rng, 7) for _ in range(20)]).save(buffer, format="PNG")
+        page.insert_image(page.rect, stream=buffer.getvalue())
+    doc.save(path)
+    doc.close()
+
+
+def write_docx(path, rng, paragraphs=40, table_rows=10):
+    import docx
+
+    document = docx.Document()
+    document.add_heading(sentence(rng, 4), level=1)
+    for _ in range(paragraphs):
+        document.add_paragraph(paragraph(rng))
+    table = document.add_table(rows=table_rows, cols=3)
+    for row in table.rows:
+        for cell in row.cells:
+            cell.text = sentence(rng, 3)
+    document.save(path)
+
+
+def write_code(path, rng, functions=30):
+    lines = ["import math", ""]
+    for index in range(functions):
+        lines += [
+            f"def {rng.choice(WORDS)}_{index}(valor, prazo={rng.randint(1, 90)}):",
+            f'    """{sentence(rng, 8)}"""',
+            f"    total = valor * {rng.random():.4f} + math.sqrt(prazo)",
+            "    return round(total, 2)",
+            "",
+        ]
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+# Áudio WAV mono 16 kHz com tons e ruído (sem fala: mede o custo do pipeline, não a qualidade)
+def write_wav(path, rng, seconds=20, sample_rate=16000):
+    frames = bytearray()
+    frequency = rng.choice([220.0, 330.0, 440.0])
+    for sample in range(int(seconds * sample_rate)):
+        if sample % sample_rate == 0:
+            frequency = rng.choice([220.0, 330.0, 440.0, 550.0])
+        value = 0.3 * math.sin(2 * math.pi * frequency * sample / sample_rate) + 0.05 * (rng.random() - 0.5)
+        frames += struct.pack("<h", int(value * 32767))
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(bytes(frames))
+
+
+# Tipo -> (subpasta, extensão, função geradora)
+GENERATORS = {
+    "images": ("images", ".png", write_image),
+    "pdf": ("text", ".pdf", write_pdf),
+    "docx": ("text", ".docx", write_docx),
+    "code": ("code", ".py", write_code),
+    "audio": ("audio", ".wav", write_wav),
+}
+
+
+# Função para gerar o corpus em 'root'; 'counts' indica quantos arquivos de cada tipo
+def generate_corpus(root, counts, seed=42):
+    root = Path(root)
+    generated = {}
+    for kind, count in counts.items():
+        subfolder, suffix, generator = GENERATORS[kind]
+        folder = root / subfolder
+        folder.mkdir(parents=True, exist_ok=True)
+        generated[kind] = []
+        for index in range(count):
+            path = folder / f"{kind}_{index:04d}{suffix}"
+            generator(path, random.Random(f"{seed}-{kind}-{index}"))
+            generated[kind].append(path)
+    return generated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um corpus sintético para os benchmarks")
+    parser.add_argument("root", help="Pasta de destino (estrutura de 'input_dir')")
+    parser.add_argument("--seed", type=int, default=42)
+    for kind in GENERATORS:
+        parser.add_argument(f"--{kind}", type=int, default=5, help=f"Quantidade de arquivos '{kind}'")
+    args = parser.parse_args()
+    corpus = generate_corpus(args.root, {kind: getattr(args, kind) for kind in GENERATORS}, args.seed)
+    print({kind: len(paths) for kind, paths in corpus.items()})
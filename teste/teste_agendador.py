@@ -0,0 +1,238 @@
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import media_probe  # noqa: E402
+from scheduler import FAIR, SJF, Scheduler  # noqa: E402
+
+# Teste do agendador por custo estimado: trabalhos simulados (sleep proporcional ao custo) em um
+# pool de threads. Confere que a fila não passa de 'lookahead' (nem os itens lidos da fonte e não
+# enviados de 'lookahead' + 'reserve') com uma fonte muito grande, que no SJF os arquivos
+# pequenos terminam antes dos grandes, que no FAIR os grandes não esperam todos os pequenos,
+# que um pool cheio não atrasa outro, o tempo limite por SIGALRM em um pool de processos e pelo
+# prazo no pool de threads, que o aviso de tempo limite conta do início do trabalho (não do envio)
+# e a leitura da duração de WAV e MP4 pelos cabeçalhos.
+# Uso: python teste/teste_agendador.py  (código de saída 1 em caso de falha)
+
+SCALE = 0.002  # Segundos de sleep por unidade de custo
+
+
+def run_jobs(policy, costs, workers=2, lookahead=1024):
+    started, finished = [], []
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    def job(item):
+        started.append(item)
+        time.sleep(costs[item] * SCALE)
+        finished.append(item)
+
+    scheduler = Scheduler(lambda item, timeout: pool.submit(job, item), lambda item: costs[item],
+                          {"light": workers}, policy=policy, lookahead=lookahead, timeout_factor=0)
+    scheduler.run(("light", item) for item in range(len(costs)))
+    pool.shutdown()
+    return started, finished, scheduler
+
+
+def test_bounded_queue(failures):
+    queued = []
+    waiting = []  # Itens lidos da fonte e ainda não enviados (fila + reserva + o item retido)
+    read = [0]
+    pool = ThreadPoolExecutor(max_workers=4)
+    scheduler = Scheduler(lambda item, timeout: pool.submit(lambda: None), lambda item: 1.0,
+                          {"light": 4}, lookahead=100, timeout_factor=0, reserve=50)
+    original_add = scheduler.add
+
+    def add(item, media, cost):
+        original_add(item, media, cost)
+        queued.append(scheduler.queued())
+
+    def source():
+        for item in range(200_000):
+            read[0] += 1
+            waiting.append(read[0] - scheduler.stats["submitted"])
+            yield "light", item
+
+    scheduler.add = add
+    scheduler.run(source())
+    pool.shutdown()
+    print(f"200000 trabalhos: fila máxima {max(queued)}, lidos e não enviados no máximo {max(waiting)}, "
+          f"concluídos {scheduler.stats['completed']}")
+    if max(queued) > 100:
+        failures.append(f"fila passou do lookahead: {max(queued)}")
+    if max(waiting) > 100 + 50 + 1:
+        failures.append(f"a fonte foi lida além da fila e da reserva: {max(waiting)}")
+    if scheduler.stats["completed"] != 200_000:
+        failures.append(f"concluídos {scheduler.stats['completed']} de 200000")
+
+
+def test_policies(failures):
+    # Um arquivo grande a cada dez pequenos, todos já na fila
+    costs = [200 if index % 10 == 0 else 2 for index in range(100)]
+    large = [index for index, cost in enumerate(costs) if cost == 200]
+
+    _, finished, scheduler = run_jobs(SJF, costs)
+    first_large = min(finished.index(index) for index in large)
+    print(f"SJF: primeiro grande na posição {first_large}, custo estimado {scheduler.stats['estimated_seconds']:.0f}")
+    if first_large < 90 - 2:
+        failures.append(f"SJF: arquivo grande terminou na posição {first_large}, antes dos pequenos")
+
+    started, _, _ = run_jobs(FAIR, costs)
+    positions = sorted(started.index(index) for index in large)
+    print(f"FAIR: posições de início dos grandes {positions}")
+    # A divisão é pelo custo servido: um grande logo no começo, os outros conforme os pesos
+    if positions[0] > 10:
+        failures.append(f"FAIR: nenhum arquivo grande foi atendido antes dos pequenos ({positions})")
+
+
+def test_no_head_of_line_blocking(failures):
+    finished = {}
+    slow_pool = ThreadPoolExecutor(max_workers=1)
+    fast_pool = ThreadPoolExecutor(max_workers=1)
+    start = time.monotonic()
+
+    def submit(item, timeout):
+        media, number = item
+        pool = slow_pool if media == "ocr" else fast_pool
+        return pool.submit(lambda: (time.sleep(0.2 if media == "ocr" else 0.001),
+                                    finished.setdefault(item, time.monotonic() - start)))
+
+    # Uma varredura só, com os arquivos do pool lento primeiro (como uma subpasta inteira de imagens)
+    scheduler = Scheduler(submit, lambda item: 1.0, {"ocr": 1, "light": 1}, lookahead=4, timeout_factor=0)
+    scheduler.run([("ocr", ("ocr", number)) for number in range(5)] +
+                  [("light", ("light", number)) for number in range(50)])
+    slow_pool.shutdown()
+    fast_pool.shutdown()
+    last_light = max(elapsed for (media, _), elapsed in finished.items() if media == "light")
+    print(f"Pool leve terminou em {last_light:.2f}s com o pool lento ocupado")
+    if last_light > 0.5:
+        failures.append(f"pool lento atrasou o pool leve ({last_light:.2f}s)")
+
+
+def slow_process_file(seconds):
+    time.sleep(seconds)
+    return "concluído"
+
+
+def test_timeout(failures):
+    import file_processor
+
+    # Os processos do pool são criados por fork e herdam a troca do process_file
+    file_processor.process_file = slow_process_file
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as pool:
+        start = time.monotonic()
+        future = pool.submit(file_processor.process_file_with_timeout, 5, 0.3)
+        error = future.exception()
+        elapsed = time.monotonic() - start
+        quick = pool.submit(file_processor.process_file_with_timeout, 0.01, 0.3).result()
+        # O alarme desligado depois do trabalho curto não pode interromper o próximo
+        time.sleep(0.4)
+        after = pool.submit(file_processor.process_file_with_timeout, 0.01, 0.3).result()
+    print(f"Tempo limite: {type(error).__name__} em {elapsed:.2f}s, trabalhos curtos: {quick}, {after}")
+    if not isinstance(error, file_processor.JobTimeout) or elapsed > 2 or quick != after != "concluído":
+        failures.append("tempo limite por SIGALRM não interrompeu o trabalho no pool de processos")
+
+
+# Trabalho longo do pool leve: partes do modo streaming, com o prazo consultado a cada parte
+def slow_light_file(seconds):
+    import file_processor
+
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        file_processor.check_deadline()
+        time.sleep(0.01)
+    return "concluído"
+
+
+def test_light_timeout(failures):
+    import file_processor
+
+    file_processor.process_file = slow_light_file
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        start = time.monotonic()
+        error = pool.submit(file_processor.process_file_with_deadline, 5, 0.3).exception()
+        elapsed = time.monotonic() - start
+        quick = pool.submit(file_processor.process_file_with_deadline, 0.01, 0.3).result()
+        # O prazo do trabalho anterior não pode valer para um trabalho sem tempo limite na mesma thread
+        unlimited = pool.submit(file_processor.process_file, 0.5).result()
+    print(f"Tempo limite no pool leve: {type(error).__name__} em {elapsed:.2f}s, outros trabalhos: {quick}, {unlimited}")
+    if not isinstance(error, file_processor.JobTimeout) or elapsed > 2 or quick != unlimited != "concluído":
+        failures.append("tempo limite não interrompeu o trabalho no pool de threads")
+
+
+def test_timeout_from_start(failures):
+    pool = ThreadPoolExecutor(max_workers=1)
+    started = {}
+
+    def job(item):
+        started[item] = time.monotonic()
+        time.sleep(0.4)
+
+    def elapsed(item):
+        return time.monotonic() - started[item] if item in started else None
+
+    # Dois trabalhos enviados juntos a um pool de uma thread: o segundo espera 0.4s na fila do pool,
+    # o que não pode contar para o seu tempo limite de 0.6s
+    scheduler = Scheduler(lambda item, timeout: pool.submit(job, item), lambda item: 0.0, {"light": 2},
+                          timeout_factor=1.0, min_timeout=0.6, elapsed=elapsed)
+    for item in ("primeiro", "segundo"):
+        scheduler.add(item, "light", 0.0)
+    scheduler.dispatch()
+    time.sleep(0.7)
+    scheduler.check_timeouts()
+    pool.shutdown()
+    print(f"Avisos de tempo limite com o início no pool: {scheduler.stats['timed_out']}")
+    if scheduler.stats["timed_out"]:
+        failures.append("tempo limite contado a partir do envio, e não do início do trabalho")
+
+
+def write_mp4(path, seconds):
+    timescale = 1000
+    mvhd = struct.pack(">B3sIIII", 0, b"\0\0\0", 0, 0, timescale, seconds * timescale) + b"\0" * 80
+    atoms = [
+        struct.pack(">I4s", 16, b"ftyp") + b"isom\0\0\0\0",
+        struct.pack(">I4s", 8 + 4096, b"mdat") + b"\0" * 4096,
+        struct.pack(">I4s", 8 + 8 + len(mvhd), b"moov") + struct.pack(">I4s", 8 + len(mvhd), b"mvhd") + mvhd,
+    ]
+    path.write_bytes(b"".join(atoms))
+
+
+def test_probe(failures):
+    with tempfile.TemporaryDirectory() as work_dir:
+        wav_path = Path(work_dir) / "audio.wav"
+        with wave.open(str(wav_path), "wb") as audio:
+            audio.setnchannels(1)
+            audio.setsampwidth(2)
+            audio.setframerate(8000)
+            audio.writeframes(b"\0\0" * 8000 * 3)
+        mp4_path = Path(work_dir) / "video.mp4"
+        write_mp4(mp4_path, 42)
+        durations = media_probe.media_duration(wav_path), media_probe.media_duration(mp4_path)
+    print(f"Duração: wav {durations[0]:.1f}s, mp4 {durations[1]:.1f}s")
+    if abs(durations[0] - 3) > 0.01 or abs(durations[1] - 42) > 0.01:
+        failures.append(f"duração lida dos cabeçalhos incorreta: {durations}")
+
+
+def main():
+    failures = []
+    test_bounded_queue(failures)
+    test_policies(failures)
+    test_no_head_of_line_blocking(failures)
+    test_timeout(failures)
+    test_light_timeout(failures)
+    test_timeout_from_start(failures)
+    test_probe(failures)
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("MYCHAT_DATA_DIR", tempfile.mkdtemp(prefix="mychat-agendador-"))
+    main()
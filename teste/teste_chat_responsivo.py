@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import CancelledError
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # Sem janela: roda em servidor/CI
+os.environ.setdefault("MYCHAT_DATA_DIR", tempfile.mkdtemp())  # Histórico do chat vazio, fora do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt5.QtCore import QElapsedTimer, QTimer  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+from chat_interface import ChatInterface  # noqa: E402
+
+# Teste automático de responsividade da interface do chat: dispara vários comandos longos
+# (transcrição simulada, que bloqueia a thread onde roda) e mede os atrasos do event loop com
+# um timer de TICK_MS. Se algum comando rodasse na thread da interface, o maior atraso seria
+# da ordem da duração do comando. Também cancela uma das tarefas e confere o resultado.
+# Uso: python teste/teste_chat_responsivo.py  (código de saída 1 em caso de falha)
+
+TICK_MS = 10
+MAX_STALL_MS = 150  # Atraso máximo aceito entre dois ticks
+JOB_SECONDS = 2.0
+JOBS = 3
+
+
+# Simula uma transcrição longa: trabalho bloqueante em passos, com progresso e cancelamento
+def fake_transcription(audio_file, progress=None, cancel_event=None):
+    steps = 20
+    for step in range(steps):
+        if cancel_event is not None and cancel_event.is_set():
+            raise CancelledError()
+        deadline = time.perf_counter() + JOB_SECONDS / steps
+        while time.perf_counter() < deadline:
+            pass  # Ocupa a CPU (e disputa o GIL) como um trabalho real
+        if progress is not None:
+            progress(step + 1, steps)
+    return f"Áudio transcrito: {audio_file}"
+
+
+def main():
+    app = QApplication(sys.argv)
+    window = ChatInterface()
+    window.process_audio = fake_transcription
+    window.show()
+
+    clock = QElapsedTimer()
+    stalls = []
+    progress_values = []
+
+    def tick():
+        elapsed = clock.restart()
+        stalls.append(elapsed - TICK_MS)
+        progress_values.append(window.progress_bar.value())
+
+    timer = QTimer()
+    timer.timeout.connect(tick)
+
+    def send_jobs():
+        for index in range(JOBS):
+            window.user_input.setText(f"audio: gravacao_{index}.wav")
+            window.submit_button.click()
+        # Cancela a última tarefa no meio do caminho
+        QTimer.singleShot(int(JOB_SECONDS * 500), lambda: window.cancel_task(max(window.tasks)))
+
+    def check_done():
+        if not window.tasks:
+            app.quit()
+
+    clock.start()
+    timer.start(TICK_MS)
+    QTimer.singleShot(100, send_jobs)
+    watcher = QTimer()
+    watcher.timeout.connect(check_done)
+    QTimer.singleShot(300, lambda: watcher.start(50))
+    QTimer.singleShot(int(JOB_SECONDS * 1000 * JOBS + 10000), app.quit)  # Limite de segurança
+    started = time.perf_counter()
+    app.exec_()
+    total = time.perf_counter() - started
+
+    model = window.chat_display.history
+    history = "\n".join(model.data(model.index(row)) for row in range(model.rowCount()))
+    completed = history.count("AI: Áudio transcrito")
+    cancelled = history.count("cancelado.")
+    max_stall = max(stalls) if stalls else 0
+    print(f"Duração: {total:.2f}s, ticks: {len(stalls)}, maior atraso do event loop: {max_stall} ms, "
+          f"concluídas: {completed}, canceladas: {cancelled}, progresso máximo: {max(progress_values, default=0)}%")
+
+    failures = []
+    if max_stall > MAX_STALL_MS:
+        failures.append(f"event loop travou por {max_stall} ms (limite {MAX_STALL_MS} ms)")
+    if completed != JOBS - 1 or cancelled != 1:
+        failures.append(f"esperado {JOBS - 1} concluídas e 1 cancelada")
+    if total > JOB_SECONDS * (JOBS - 1):
+        failures.append(f"as tarefas não rodaram em paralelo ({total:.2f}s)")
+    if max(progress_values, default=0) == 0:
+        failures.append("a barra de progresso não se moveu")
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import hashlib
+import io
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from github_integration import GithubFetcher  # noqa: E402
+
+# Teste do GithubFetcher contra um servidor HTTP local que imita os endpoints usados da API
+# (commit de uma ref com ETag e tarball de um commit). Confere o conteúdo recursivo filtrado,
+# a busca paralela e que uma segunda execução sem mudanças custa só respostas 304.
+# Uso: python teste/teste_github_local.py  (código de saída 1 em caso de falha)
+
+REPOS = {
+    "dono/projeto-a": {"main.py": "print('a')\n", "pacote/modulo.py": "X = 1\n", "README.md": "# A\n"},
+    "dono/projeto-b": {"app.py": "import os\n", "docs/guia.txt": "texto\n"},
+    "outro/projeto-c": {"src/util/calc.py": "def soma(a, b):\n    return a + b\n"},
+}
+LATENCY_SECONDS = 0.2  # Atraso de cada tarball, para evidenciar o paralelismo
+requests_log = []
+log_lock = threading.Lock()
+
+
+def commit_sha(repo_name):
+    files = REPOS[repo_name]
+    return hashlib.sha1(repr(sorted(files.items())).encode()).hexdigest()
+
+
+def make_tarball(repo_name):
+    buffer = io.BytesIO()
+    root = f"{repo_name.replace('/', '-')}-{commit_sha(repo_name)[:7]}"
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path, content in REPOS[repo_name].items():
+            data = content.encode()
+            info = tarfile.TarInfo(f"{root}/{path}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class FakeGithub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")  # repos/dono/repo/(commits|tarball)/ref
+        repo_name = "/".join(parts[1:3])
+        if len(parts) != 5 or repo_name not in REPOS:
+            self.send_error(404)
+            return
+        sha = commit_sha(repo_name)
+        with log_lock:
+            requests_log.append((parts[3], self.headers.get("If-None-Match")))
+        if parts[3] == "commits":
+            etag = f'"{sha}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            body = sha.encode()
+            self.send_response(200)
+            self.send_header("ETag", etag)
+        else:
+            time.sleep(LATENCY_SECONDS)
+            body = make_tarball(repo_name)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGithub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}"
+    failures = []
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        fetcher = GithubFetcher(api_url=api_url, token=None, cache_dir=cache_dir, max_connections=4)
+
+        start = time.perf_counter()
+        first = fetcher.fetch_repos(list(REPOS))
+        elapsed = time.perf_counter() - start
+        expected = {name: {path: content for path, content in files.items() if path.endswith(".py")}
+                    for name, files in REPOS.items()}
+        if first != expected:
+            failures.append(f"conteúdo diferente do esperado: {first}")
+        if elapsed > LATENCY_SECONDS * len(REPOS):
+            failures.append(f"repositórios não foram buscados em paralelo ({elapsed:.2f}s)")
+        print(f"Primeira execução: {elapsed:.2f}s, {fetcher.stats}")
+
+        requests_log.clear()
+        second = fetcher.fetch_repos(list(REPOS))
+        if second != first:
+            failures.append("segunda execução devolveu outro conteúdo")
+        if any(kind == "tarball" for kind, _ in requests_log) or fetcher.stats["not_modified"] != len(REPOS):
+            failures.append(f"repositórios sem mudança não foram resolvidos com 304: {requests_log}")
+        print(f"Segunda execução: {len(requests_log)} requisições, {fetcher.stats}")
+
+        # Mudança em um repositório: só ele baixa um tarball novo
+        REPOS["dono/projeto-b"]["novo.py"] = "Y = 2\n"
+        requests_log.clear()
+        third = fetcher.fetch_repos(list(REPOS))
+        if third["dono/projeto-b"].get("novo.py") != "Y = 2\n":
+            failures.append("mudança no repositório não foi vista")
+        if sum(1 for kind, _ in requests_log if kind == "tarball") != 1:
+            failures.append(f"esperado 1 tarball novo: {requests_log}")
+        if len(list(Path(cache_dir, "dono", "projeto-b").glob("*.tar.gz"))) != 1:
+            failures.append("tarball antigo não foi removido do cache")
+
+        subfolder = fetcher.fetch_repo("dono/projeto-a", extensions=None, path_prefix="pacote/")
+        if subfolder != {"pacote/modulo.py": "X = 1\n"}:
+            failures.append(f"filtro por pasta falhou: {subfolder}")
+        fetcher.close()
+
+    server.shutdown()
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # Sem janela: roda em servidor/CI
+os.environ["MYCHAT_DATA_DIR"] = tempfile.mkdtemp()  # Histórico do teste fora do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+from chat_history import PREVIEW_CHARS, ChatHistoryModel, ChatHistoryStore, ChatHistoryView  # noqa: E402
+
+# Teste do histórico do chat com uma sessão curta e uma longa (100 mil mensagens, algumas com
+# megabytes de texto, como transcrições coladas): o tempo para abrir o histórico, para acrescentar
+# uma mensagem e para carregar a página anterior ao rolar não pode crescer com o tamanho da sessão.
+# Confere também que as mensagens grandes aparecem cortadas até serem expandidas e que o histórico
+# continua lá depois de fechar e abrir de novo a interface.
+# Uso: python teste/teste_historico_chat.py  (código de saída 1 em caso de falha)
+
+LONG_SESSION = 100_000
+SHORT_SESSION = 2000  # Com páginas anteriores suficientes para as SCROLLS rolagens
+BIG_MESSAGE_EVERY = 5000
+BIG_MESSAGE_CHARS = 2_000_000
+APPENDS = 50
+SCROLLS = 5
+MAX_SLOWDOWN = 3.0  # Quanto a sessão longa pode ser mais lenta que a curta...
+SLACK_MS = 20  # ...mais esta folga (tempos de poucos milissegundos variam muito)
+
+
+def fill(store, messages):
+    store.conn.execute("BEGIN")
+    for number in range(messages):
+        if number % BIG_MESSAGE_EVERY == BIG_MESSAGE_EVERY - 1:
+            text = f"Transcrição {number}: " + ("palavra " * (BIG_MESSAGE_CHARS // 8))
+        else:
+            text = f"Mensagem {number}: " + "texto de exemplo " * (number % 20)
+        store.append("user" if number % 2 else "ai", text)
+    store.conn.execute("COMMIT")
+
+
+def settle(app, view):
+    app.processEvents()
+    view.viewport().repaint()
+
+
+def measure(app, db_path):
+    timings = {}
+    start = time.perf_counter()
+    store = ChatHistoryStore(db_path)
+    view = ChatHistoryView(store)
+    view.resize(500, 400)
+    view.show()
+    settle(app, view)
+    timings["abrir"] = (time.perf_counter() - start) * 1000
+
+    appends = []
+    for number in range(APPENDS):
+        start = time.perf_counter()
+        view.add_message("ai", f"Resposta nova {number}: " + "texto " * 50)
+        settle(app, view)
+        appends.append((time.perf_counter() - start) * 1000)
+    timings["acrescentar"] = statistics.median(appends)
+
+    scrolls = []
+    for _ in range(SCROLLS):
+        if not view.history.has_older:
+            break
+        start = time.perf_counter()
+        view.verticalScrollBar().setValue(0)
+        settle(app, view)
+        scrolls.append((time.perf_counter() - start) * 1000)
+    timings["rolar"] = statistics.median(scrolls) if scrolls else 0.0
+    timings["linhas carregadas"] = view.history.rowCount()
+    return store, view, timings
+
+
+def check_truncation(app, view, failures):
+    model = view.history
+    rows = [row for row in range(model.rowCount()) if model.messages[row]["length"] >= BIG_MESSAGE_CHARS]
+    if not rows:
+        failures.append("nenhuma mensagem grande carregada após a rolagem")
+        return
+    index = model.index(rows[0])
+    if len(model.data(index)) > PREVIEW_CHARS + 200:
+        failures.append("mensagem grande não foi cortada")
+    start = time.perf_counter()
+    view.toggle_expanded(index)
+    settle(app, view)
+    expand_ms = (time.perf_counter() - start) * 1000
+    if not index.data(ChatHistoryModel.ExpandedRole) or len(model.data(index)) <= PREVIEW_CHARS + 200:
+        failures.append("mensagem grande não foi expandida")
+    if len(model.full_text(rows[0])) != model.messages[rows[0]]["length"]:
+        failures.append("texto completo da mensagem grande diferente do gravado")
+    view.toggle_expanded(index)
+    settle(app, view)
+    if index.data(ChatHistoryModel.ExpandedRole):
+        failures.append("mensagem grande não foi recolhida")
+    print(f"Expandir mensagem de {BIG_MESSAGE_CHARS} caracteres: {expand_ms:.0f} ms")
+
+
+def check_persistence(app, failures):
+    from chat_interface import ChatInterface
+
+    window = ChatInterface()
+    window.show()
+    window.chat_display.add_message("user", "mensagem que deve sobreviver")
+    window.close()
+    app.processEvents()
+    window = ChatInterface()
+    model = window.chat_display.history
+    last = model.data(model.index(model.rowCount() - 1)) if model.rowCount() else ""
+    if last != "User: mensagem que deve sobreviver":
+        failures.append(f"histórico perdido ao reabrir a interface (última mensagem: {last!r})")
+    window.close()
+
+
+def main():
+    app = QApplication(sys.argv)
+    failures = []
+    work_dir = Path(os.environ["MYCHAT_DATA_DIR"])
+    results = {}
+    for name, messages in (("curta", SHORT_SESSION), ("longa", LONG_SESSION)):
+        db_path = work_dir / f"{name}.sqlite"
+        start = time.perf_counter()
+        store = ChatHistoryStore(db_path)
+        fill(store, messages)
+        store.close()
+        print(f"Sessão {name}: {messages} mensagens gravadas em {time.perf_counter() - start:.1f}s "
+              f"({db_path.stat().st_size / (1024 * 1024):.0f} MB)")
+        store, view, timings = measure(app, db_path)
+        results[name] = timings
+        print(f"  abrir {timings['abrir']:.0f} ms, acrescentar {timings['acrescentar']:.1f} ms, "
+              f"rolar (página anterior) {timings['rolar']:.1f} ms, {timings['linhas carregadas']} linhas carregadas")
+        if name == "longa":
+            check_truncation(app, view, failures)
+        view.close()
+        store.close()
+
+    short, long = results["curta"], results["longa"]
+    for key in ("abrir", "acrescentar", "rolar"):
+        if long[key] > short[key] * MAX_SLOWDOWN + SLACK_MS:
+            failures.append(f"'{key}' ficou lento na sessão longa: {long[key]:.1f} ms contra {short[key]:.1f} ms")
+    check_persistence(app, failures)
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
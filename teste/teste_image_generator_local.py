@@ -0,0 +1,128 @@
+import hashlib
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from image_generator import generate_images  # noqa: E402
+
+# Teste do cliente de imagens contra uma API local simulada: a primeira chamada de alguns prompts
+# devolve 503 (nova tentativa), as imagens são servidas em blocos e a concorrência no servidor é
+# medida. Confere os arquivos endereçados por conteúdo, o limite de concorrência, as novas
+# tentativas, o cache por prompt (segunda execução sem chamar a API) e o limite de entradas do cache.
+# Uso: python teste/teste_image_generator_local.py  (código de saída 1 em caso de falha)
+
+PROMPTS = [f"paisagem número {index}" for index in range(12)] + ["paisagem número 0"]  # Um repetido
+CONCURRENCY = 3
+LATENCY_SECONDS = 0.1
+IMAGE_BYTES = 300 * 1024
+state = {"active": 0, "max_active": 0, "posts": 0, "failed_once": set()}
+state_lock = threading.Lock()
+
+
+def image_for(prompt):
+    seed = hashlib.sha256(prompt.encode()).digest()
+    return (seed * (IMAGE_BYTES // len(seed) + 1))[:IMAGE_BYTES]
+
+
+class FakeImageApi(BaseHTTPRequestHandler):
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with state_lock:
+            state["posts"] += 1
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+            fail = payload["text"].endswith("3") and payload["text"] not in state["failed_once"]
+            state["failed_once"].add(payload["text"])
+        try:
+            time.sleep(LATENCY_SECONDS)
+            if fail:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            prompt_id = hashlib.sha256(payload["text"].encode()).hexdigest()
+            body = json.dumps({"image_url": f"http://127.0.0.1:{self.server.server_address[1]}/images/{prompt_id}"
+                                            f"?text={payload['text']}"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with state_lock:
+                state["active"] -= 1
+
+    def do_GET(self):
+        from urllib.parse import parse_qs, urlparse
+
+        prompt = parse_qs(urlparse(self.path).query)["text"][0]
+        body = image_for(prompt)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        for start in range(0, len(body), 32 * 1024):  # Envio em partes
+            self.wfile.write(body[start:start + 32 * 1024])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeImageApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}/v3/text-to-image"
+    failures = []
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        options = {"api_url": api_url, "api_key": "teste", "output_dir": Path(work_dir) / "imagens",
+                   "cache_path": Path(work_dir) / "prompts.sqlite", "max_concurrency": CONCURRENCY,
+                   "backoff_seconds": 0.05}
+        start = time.perf_counter()
+        first = generate_images(PROMPTS, **options)
+        elapsed = time.perf_counter() - start
+        errors = [result for result in first if isinstance(result, Exception)]
+        if errors:
+            failures.append(f"erros na geração: {errors}")
+        for prompt, path in zip(PROMPTS, first):
+            if not isinstance(path, Exception):
+                data = path.read_bytes()
+                if data != image_for(prompt) or path.stem != hashlib.sha256(data).hexdigest():
+                    failures.append(f"arquivo errado para '{prompt}': {path}")
+        unique = len(set(PROMPTS))
+        retried = sum(1 for prompt in set(PROMPTS) if prompt.endswith("3"))
+        if state["posts"] != unique + retried:
+            failures.append(f"esperado {unique + retried} chamadas à API, houve {state['posts']}")
+        if state["max_active"] > CONCURRENCY:
+            failures.append(f"concorrência {state['max_active']} acima do limite {CONCURRENCY}")
+        print(f"Primeira execução: {elapsed:.2f}s, {state['posts']} chamadas, concorrência máxima "
+              f"{state['max_active']}")
+
+        posts_before = state["posts"]
+        second = generate_images(PROMPTS, **options)
+        if second != first or state["posts"] != posts_before:
+            failures.append("segunda execução não usou o cache de prompts")
+        print(f"Segunda execução: {state['posts'] - posts_before} chamadas")
+
+        limited_path = Path(work_dir) / "limitado.sqlite"
+        third = generate_images(PROMPTS, **{**options, "cache_path": limited_path, "cache_max_entries": 4})
+        with sqlite3.connect(limited_path) as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+        print(f"Cache limitado a 4 entradas: {entries} entradas")
+        if entries != 4 or third != first:
+            failures.append(f"cache limitado a 4 entradas ficou com {entries}")
+
+    server.shutdown()
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
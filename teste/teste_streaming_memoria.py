@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from jsonl_store import JsonlShardStore  # noqa: E402
+from text_index import TextIndex  # noqa: E402
+
+# Teste do modo streaming: processa um arquivo de código grande com o file_processor (em um
+# processo separado por execução) com e sem streaming e compara o pico de memória registrado em
+# logs/resource_usage.jsonl. Confere também que o JSON gravado aos poucos (modo "files") e as
+# partes do modo "jsonl" reproduzem o arquivo original. Com o índice de texto ligado, a indexação do
+# JSON gravado em streaming também não pode carregar o registro inteiro, e os trechos encontrados
+# precisam ser lidos do arquivo.
+# Uso: python teste/teste_streaming_memoria.py [MB]  (código de saída 1 em caso de falha)
+
+SIZE_MB = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+PROCESSOR = Path(__file__).resolve().parent.parent / "file_processor.py"
+
+
+def write_large_file(path):
+    rng = random.Random(7)
+    words = ["def", "return", "valor", "cliente", "prazo", "ação", "linha", "erro", "tempo", "\"texto\""]
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        while written < SIZE_MB * 1024 * 1024:
+            line = f"{written} " + " ".join(rng.choice(words) for _ in range(12)) + "\n"
+            f.write(line)
+            written += len(line.encode("utf-8"))
+
+
+def run(data_dir, original, **env):
+    (data_dir / "input_dir" / "code").mkdir(parents=True, exist_ok=True)
+    os.link(original, data_dir / "input_dir" / "code" / "grande.py")
+    environment = {**os.environ, "MYCHAT_DATA_DIR": str(data_dir), "MYCHAT_TEXT_INDEX": "0",
+                   "MYCHAT_RESULT_CACHE": "0", **env}
+    subprocess.run([sys.executable, str(PROCESSOR)], env=environment, check=True, capture_output=True)
+    with open(data_dir / "logs" / "resource_usage.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f][-1]["peak_rss_mb"]
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        original = work_dir / "grande.py"
+        write_large_file(original)
+        # O pico de memória (ru_maxrss) é herdado do processo pai: nada grande fica na memória aqui
+        # antes das execuções, e a comparação usa só o hash do conteúdo
+        with open(original, "rb") as f:
+            expected = hashlib.file_digest(f, "sha256").hexdigest()
+
+        whole_mb = run(work_dir / "inteiro", original, MYCHAT_STREAMING_THRESHOLD_MB=str(SIZE_MB * 2))
+        streaming_mb = run(work_dir / "streaming", original, MYCHAT_STREAMING_THRESHOLD_MB="1")
+        jsonl_mb = run(work_dir / "jsonl", original, MYCHAT_STREAMING_THRESHOLD_MB="1", MYCHAT_OUTPUT_BACKEND="jsonl")
+        indexed_mb = run(work_dir / "indice", original, MYCHAT_STREAMING_THRESHOLD_MB="1", MYCHAT_TEXT_INDEX="1")
+        print(f"Arquivo de {SIZE_MB} MB, pico de memória: inteiro {whole_mb} MB, streaming {streaming_mb} MB, "
+              f"streaming jsonl {jsonl_mb} MB, streaming com índice {indexed_mb} MB")
+
+        for mode in ("inteiro", "streaming"):
+            outputs = list((work_dir / mode / "processed_dir" / "code").glob("*.json"))
+            with open(outputs[0], encoding="utf-8") as f:
+                record = json.load(f)
+            if hashlib.sha256(record["content"].encode("utf-8")).hexdigest() != expected or record["file_type"] != "code":
+                failures.append(f"registro do modo {mode} difere do original")
+            del record
+
+        store = JsonlShardStore(work_dir / "jsonl" / "processed_dir" / "shards")
+        chunks = sorted(store.iter_records(), key=lambda record: record["chunk"])
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk["content"].encode("utf-8"))
+        if digest.hexdigest() != expected or chunks[-1].get("chunks") != len(chunks):
+            failures.append("partes do modo jsonl não reproduzem o original")
+
+        results = TextIndex(work_dir / "indice" / "index").search("cliente prazo", 5)
+        if len(results) < 5 or any("cliente" not in result["text"] or "prazo" not in result["text"]
+                                   or len(result["text"]) != result["end"] - result["start"] for result in results):
+            failures.append(f"busca no índice do modo streaming não retornou os trechos esperados: {results[:1]}")
+
+        for name, peak in (("streaming", streaming_mb), ("streaming jsonl", jsonl_mb),
+                           ("streaming com índice", indexed_mb)):
+            if peak > whole_mb / 2:
+                failures.append(f"pico de memória do modo {name} ({peak} MB) não ficou abaixo de metade "
+                                f"do modo inteiro ({whole_mb} MB)")
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
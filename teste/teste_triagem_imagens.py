@@ -0,0 +1,140 @@
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+# Permite importar os módulos da raiz do projeto ao rodar a partir de 'teste/'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import image_prescreen  # noqa: E402
+from synthetic_corpus import load_font, sentence  # noqa: E402
+
+# Teste da triagem de imagens antes do OCR com imagens geradas na hora: documentos (limpos,
+# fotografados com luz irregular e ruído em 24 megapixels, texto claro em fundo escuro, recibo
+# estreito, uma palavra só, captura de tela) e imagens sem texto (céu, objetos desfocados, folhagem
+# em 24 megapixels, fundo liso, ícones). Confere que nenhum documento é pulado, que as imagens sem
+# texto são, que a altura das linhas enviada ao OCR fica perto da altura alvo e que a quantidade de
+# pixels enviada ao OCR cai (textos pequenos crescem, mas fotos grandes e sem texto somem).
+# Uso: python teste/teste_triagem_imagens.py  (código de saída 1 em caso de falha)
+
+
+def text_image(size, font_size, rng, background=255, ink=0, margin=40):
+    image = Image.new("L", size, background)
+    draw = ImageDraw.Draw(image)
+    font = load_font(font_size)
+    y = margin
+    while y + font_size < size[1] - margin:
+        draw.text((margin, y), sentence(rng, 30), fill=ink, font=font)
+        y += int(font_size * 1.6)
+    return image
+
+
+def photographed(image, rng):
+    pixels = np.asarray(image, dtype=np.float32)
+    height, width = pixels.shape
+    light = np.linspace(0.55, 1.0, width)[None, :] * np.linspace(0.8, 1.0, height)[:, None]  # Luz irregular
+    noise = np.random.default_rng(rng.randint(0, 1000)).normal(0, 6, pixels.shape)
+    photo = Image.fromarray(np.clip(pixels * light + noise, 0, 255).astype(np.uint8))
+    return photo.filter(ImageFilter.GaussianBlur(1.2)).convert("RGB")
+
+
+def noise(size, seed, blur, scale=60, base=128):
+    rng = np.random.default_rng(seed)
+    pixels = Image.fromarray(np.clip(rng.normal(base, scale, (size[1], size[0])), 0, 255).astype(np.uint8))
+    return pixels.filter(ImageFilter.GaussianBlur(blur))
+
+
+def sky(size, seed):
+    gradient = np.linspace(90, 220, size[1])[:, None] * np.ones((1, size[0]))
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(np.clip(gradient + rng.normal(0, 4, gradient.shape), 0, 255).astype(np.uint8)).convert("RGB")
+
+
+def blobs(size, seed):
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, (120, 140, 90))
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        radius = rng.randint(size[0] // 20, size[0] // 5)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                     fill=tuple(rng.randint(20, 235) for _ in range(3)))
+    return image.filter(ImageFilter.GaussianBlur(size[0] / 150))
+
+
+def screenshot(rng):
+    image = text_image((1280, 800), 16, rng)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1280, 50), fill=60)
+    draw.text((20, 15), "Arquivo  Editar  Exibir  Ajuda", fill=255, font=load_font(18))
+    return image
+
+
+def documents(rng):
+    wide = Image.new("L", (360, 70), 255)
+    ImageDraw.Draw(wide).text((20, 15), "Pagamento", fill=0, font=load_font(36))
+    return {
+        "texto limpo 12px": text_image((1240, 1754), 12, rng),
+        "texto limpo 28px": text_image((1240, 1754), 28, rng),
+        "foto de documento 24MP": photographed(text_image((6000, 4000), 70, rng, margin=300), rng),
+        "slide claro em fundo escuro": text_image((1920, 1080), 48, rng, background=30, ink=230),
+        "recibo estreito": text_image((380, 1400), 18, rng),
+        "uma palavra": wide,
+        "captura de tela": screenshot(rng),
+    }
+
+
+def photos():
+    return {
+        "céu": sky((4000, 3000), 1),
+        "objetos desfocados": blobs((4000, 3000), 2),
+        "folhagem 24MP": noise((6000, 4000), 3, blur=1.0, scale=120).convert("RGB"),
+        "fundo liso": Image.new("RGB", (2000, 1500), (200, 200, 200)),
+        "ícone 32px": noise((32, 32), 4, blur=0).convert("RGB"),
+        "ícone 16px": Image.new("RGB", (16, 16), (255, 0, 0)),
+    }
+
+
+def main():
+    rng = random.Random(11)
+    failures = []
+    original_pixels = ocr_pixels = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        samples = [(name, image, True) for name, image in documents(rng).items()]
+        samples += [(name, image, False) for name, image in photos().items()]
+        for number, (name, image, has_text) in enumerate(samples):
+            path = Path(work_dir) / f"{number}.jpg"
+            image.save(path, quality=90)
+            start = time.perf_counter()
+            ocr_image, decisions = image_prescreen.prepare_image(path)
+            elapsed = time.perf_counter() - start
+            original_pixels += image.size[0] * image.size[1]
+            if ocr_image is not None:
+                ocr_pixels += ocr_image.size[0] * ocr_image.size[1]
+            print(f"{name:<28} {decisions['decision']:<5} {decisions.get('reason') or '':<14} "
+                  f"bordas {decisions['edge_density']:<7} linhas {decisions['text_lines']:<4} "
+                  f"altura {decisions['line_height']} escala {decisions.get('scale')} {elapsed * 1000:.0f} ms")
+            if has_text and ocr_image is None:
+                failures.append(f"documento pulado: {name} ({decisions['reason']})")
+            if not has_text and ocr_image is not None:
+                failures.append(f"imagem sem texto enviada ao OCR: {name}")
+            if has_text and ocr_image is not None and decisions["line_height"]:
+                line_height = decisions["line_height"] * decisions["scale"]
+                target = image_prescreen.TARGET_LINE_HEIGHT
+                if not target / 2 <= line_height <= target * 2:
+                    failures.append(f"{name}: linhas com {line_height:.0f}px no OCR")
+            if ocr_image is not None and ocr_image.size[0] * ocr_image.size[1] > image_prescreen.MAX_OCR_PIXELS:
+                failures.append(f"{name}: {ocr_image.size} passa do limite de pixels do OCR")
+    print(f"Pixels enviados ao OCR: {ocr_pixels / 1e6:.1f} MP de {original_pixels / 1e6:.1f} MP")
+    if ocr_pixels > original_pixels / 2:
+        failures.append("a triagem não reduziu os pixels enviados ao OCR a menos da metade")
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
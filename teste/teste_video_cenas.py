@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Teste do OCR de vídeo por mudança de cena: gera uma gravação de slides (cada slide com um texto
+# desenhado, transições em fade e um pouco de ruído, um slide que volta no fim) em duas versões, uma
+# com o dobro da duração. Confere que os quadros-chave encontrados correspondem aos slides, que o
+# slide repetido é reconhecido sem outro OCR e que o número de OCRs não cresce com a duração.
+# O OCR é simulado (o slide é identificado pelo tom de fundo), então não precisa do Tesseract.
+# Uso: python teste/teste_video_cenas.py  (código de saída 1 em caso de falha)
+
+FPS = 10
+WIDTH, HEIGHT = 640, 360
+SLIDES = [40, 90, 140, 190, 90]  # Tom de fundo de cada slide; o último repete o segundo
+FADE_SECONDS = 1.0
+
+
+def slide_image(level, rng):
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (WIDTH, HEIGHT), (level, level, level))
+    draw = ImageDraw.Draw(image)
+    for line in range(4):
+        draw.text((40, 40 + line * 60), f"Slide {level} linha {line}", fill=(255, 255, 255))
+    frame = np.asarray(image, dtype=np.int16)
+    noise = rng.integers(-6, 7, size=frame.shape)  # Ruído de compressão/captura
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+
+def write_video(path, seconds_per_slide):
+    from moviepy import ImageSequenceClip
+
+    rng = np.random.default_rng(1)
+    frames = []
+    previous = None
+    for level in SLIDES:
+        current = slide_image(level, rng)
+        if previous is not None:
+            for step in range(int(FADE_SECONDS * FPS)):
+                alpha = (step + 1) / (FADE_SECONDS * FPS + 1)
+                frames.append((previous * (1 - alpha) + current * alpha).astype(np.uint8))
+        frames.extend(slide_image(level, rng) for _ in range(int(seconds_per_slide * FPS)))
+        previous = current
+    ImageSequenceClip(frames, fps=FPS).write_videofile(str(path), codec="libx264", audio=False, logger=None)
+
+
+# OCR simulado: o tom de fundo (mediana) identifica o slide
+class FakeOcr:
+    calls = 0
+
+    def image_to_string(self, image, dpi=None):
+        FakeOcr.calls += 1
+        return f"Slide {int(np.median(np.asarray(image.convert('L'))))}\n"
+
+
+def main():
+    import file_processor
+
+    file_processor.ocr_backend = lambda: FakeOcr()
+    failures = []
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for seconds in (8, 16):
+            path = Path(work_dir) / f"slides-{seconds}.mp4"
+            write_video(path, seconds)
+            FakeOcr.calls = 0
+            start = time.perf_counter()
+            frames = file_processor.extract_video_text(path)
+            results[seconds] = (frames, FakeOcr.calls, time.perf_counter() - start)
+            print(f"{seconds}s por slide: {FakeOcr.calls} OCRs, {len(frames)} trechos, "
+                  f"{results[seconds][2]:.2f}s: {[(frame['start'], frame['end']) for frame in frames]}")
+
+    for seconds, (frames, calls, _) in results.items():
+        if calls != len(set(SLIDES)):
+            failures.append(f"{seconds}s por slide: esperado {len(set(SLIDES))} OCRs, houve {calls}")
+        if len(frames) != len(SLIDES):
+            failures.append(f"{seconds}s por slide: esperado {len(SLIDES)} trechos, houve {len(frames)}")
+        slide_seconds = seconds + FADE_SECONDS
+        for index, frame in enumerate(frames):
+            if abs(frame["start"] - index * slide_seconds) > 2.5:
+                failures.append(f"{seconds}s por slide: trecho {index} começa em {frame['start']}s, "
+                                f"esperado perto de {index * slide_seconds}s")
+    if results[8][1] != results[16][1]:
+        failures.append("o número de OCRs cresceu com a duração do vídeo")
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("MYCHAT_DATA_DIR", tempfile.mkdtemp(prefix="mychat-video-"))
+    main()
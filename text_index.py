@@ -0,0 +1,730 @@
+import argparse
+import array
+import fcntl
+import heapq
+import itertools
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from bisect import bisect_right
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from colorama import Fore
+from json_stream import iter_string_blocks, read_record_fields
+from jsonl_store import JsonlShardStore
+
+# Índice invertido dos textos extraídos com ranqueamento BM25 por trecho.
+#
+# Cada registro é dividido em trechos de PASSAGE_WORDS palavras (com sobreposição) e cada trecho
+# é um "documento" do BM25, com deslocamentos de caracteres no 'content' do registro e, para arquivos
+# JSON, a posição em bytes do trecho no arquivo (lido com seek, sem carregar o registro inteiro).
+# As listas de postings ficam em segmentos imutáveis (seg-*.post, lidos com mmap): para cada termo,
+# os ids dos trechos (uint32) seguidos das frequências (uint32). O dicionário de termos, os trechos,
+# os documentos e as estatísticas ficam em SQLite; o comprimento de cada trecho fica em lengths.bin
+# (uint32 por id, também com mmap). Atualizações criam novos segmentos, e os segmentos menores são
+# unidos quando passam de MAX_SEGMENTS. Documentos substituídos ou removidos são marcados como
+# apagados e descartados dos postings na união.
+
+PASSAGE_WORDS = 120
+PASSAGE_STRIDE = 100
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEGMENT_MAX_POSTINGS = 2_000_000  # Limita a memória usada para montar um segmento...
+SEGMENT_MAX_TERMS = 100_000  # ...também em textos com muitos termos distintos (números, códigos)
+MAX_SEGMENTS = 10
+MERGE_FACTOR = 4
+UINT32 = 4
+
+WORD_RE = re.compile(r"[^\W_]+")  # Letras e dígitos; "_" separa palavras (identificadores de código)
+WORD_CHAR_RE = re.compile(r"[^\W_]")
+
+
+def fold(word):
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+STOPWORDS = {fold(word) for word in """
+    a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele deles depois
+    do dos e ela elas ele eles em entre era eram essa essas esse esses esta estas este estes eu foi foram
+    ha isso isto ja la lhe lhes mais mas me mesmo meu meus minha minhas muito na nas nem no nos o os ou
+    para pela pelas pelo pelos por qual quando que quem se sem ser seu seus so sua suas tambem te tem um
+    uma umas uns voce voces e the of and to in is
+""".split()}
+
+# Redução de plurais do português (etapa de plural do RSLP, aplicada ao texto sem acentos)
+PLURAL_RULES = [("oes", "ao", 3), ("aes", "ao", 3), ("ais", "al", 3), ("eis", "el", 3), ("ois", "ol", 3),
+                ("ns", "m", 2), ("res", "r", 3), ("zes", "z", 3), ("les", "l", 3), ("s", "", 3)]
+
+
+def stem(word):
+    for suffix, replacement, min_stem in PLURAL_RULES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= min_stem:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+# numpy carregado só na primeira consulta: quem só atualiza o índice (file_processor) não o importa.
+# Sem numpy a pontuação é feita em Python puro (mais lenta em termos muito frequentes).
+@lru_cache(maxsize=1)
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@lru_cache(maxsize=200_000)
+def analyze(word):
+    word = fold(word)
+    if len(word) < 2 or word in STOPWORDS:
+        return None
+    return stem(word)
+
+
+# Função para transformar um texto (mensagem ou consulta) nos termos do índice
+def tokenize(text):
+    return [term for term in map(analyze, WORD_RE.findall(text)) if term]
+
+
+class _ByteCursor:
+    # Posição em bytes, no arquivo, dos caracteres de um bloco de json_stream.iter_string_blocks
+    # (consultados sempre em ordem crescente)
+    def __init__(self, text, anchors, end_byte):
+        self.text = text
+        self.anchors = anchors
+        self.end_byte = end_byte
+        self.index = 0
+        self.char, self.byte = anchors[0][0], anchors[0][1]
+
+    def at(self, char):
+        anchors = self.anchors
+        while self.index + 1 < len(anchors) and anchors[self.index + 1][0] <= char:
+            self.index += 1
+            self.char, self.byte = anchors[self.index][0], anchors[self.index][1]
+        if char == len(self.text):
+            return self.end_byte
+        if char > self.char:  # Dentro de um trecho literal (um escape é um único caractere)
+            self.byte += len(self.text[self.char:char].encode("utf-8"))
+            self.char = char
+        return self.byte
+
+
+# Função para percorrer as palavras de um texto: (início, fim, início em bytes, fim em bytes, palavra).
+# O texto é uma str (sem posições em bytes) ou os blocos de json_stream.iter_string_blocks, lidos um
+# por vez; a palavra cortada no fim de um bloco é completada com o começo do próximo.
+def iter_words(text):
+    if isinstance(text, str):
+        for match in WORD_RE.finditer(text):
+            yield match.start(), match.end(), None, None, match.group()
+        return
+    offset = 0  # Caracteres dos blocos anteriores
+    carry = None  # Palavra cortada no fim do bloco anterior, no mesmo formato dos blocos
+    for block in itertools.chain(text, [None]):
+        if block is None:  # Fim do texto: a palavra guardada está completa
+            if carry is None:
+                break
+            block_text, anchors, end_byte = carry
+            cut = len(block_text)
+        else:
+            block_text, anchors, end_byte = block
+            if carry is not None:
+                anchors = carry[1] + [(char + len(carry[0]), position, literal) for char, position, literal in anchors]
+                block_text = carry[0] + block_text
+            cut = len(block_text)
+            while cut > 0 and WORD_CHAR_RE.match(block_text, cut - 1):
+                cut -= 1
+        cursor = _ByteCursor(block_text, anchors, end_byte)
+        for match in WORD_RE.finditer(block_text, 0, cut):
+            start, end = match.span()
+            yield offset + start, offset + end, cursor.at(start), cursor.at(end), match.group()
+        carry = None
+        if cut < len(block_text):
+            byte = cursor.at(cut)
+            carry = (block_text[cut:], [(0, byte, anchors[cursor.index][2])] +
+                     [(char - cut, position, literal) for char, position, literal in anchors[cursor.index + 1:]],
+                     end_byte)
+        offset += cut
+
+
+def _passage(window):
+    terms = [term for term in (analyze(word[4]) for word in window) if term]
+    return window[0][0], window[-1][1], window[0][2], window[-1][3], terms
+
+
+# Função para dividir um texto em trechos: (início, fim, início em bytes, fim em bytes, termos), com
+# deslocamentos de caracteres no texto e, para blocos lidos de um arquivo, em bytes no arquivo. Só a
+# janela do trecho atual fica em memória.
+def split_passages(text):
+    window = deque()
+    words = 0
+    covered = 0  # Palavras já incluídas em algum trecho
+    for word in iter_words(text):
+        window.append(word)
+        words += 1
+        if len(window) == PASSAGE_WORDS:
+            yield _passage(window)
+            covered = words
+            for _ in range(PASSAGE_STRIDE):
+                window.popleft()
+    if window and words > covered:
+        yield _passage(window)
+
+
+class TextIndex:
+    def __init__(self, root, skip_near_duplicates=True):
+        self.root = Path(root)
+        self.skip_near_duplicates = skip_near_duplicates
+        self._conn = None
+        self._conn_pid = None
+        self._segments = {}  # seg_id -> mmap do arquivo de postings
+        self._lengths = None  # (mmap, memoryview uint32, quantidade de ids mapeados)
+
+    # Conexão por processo (conexões SQLite não podem atravessar um fork)
+    def _connect(self):
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.root / "index.sqlite", timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS docs (
+                    doc_id INTEGER PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    locator TEXT NOT NULL,
+                    file_name TEXT,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    first_pid INTEGER NOT NULL,
+                    passages INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS docs_source ON docs (source, deleted);
+                CREATE TABLE IF NOT EXISTS passages (
+                    pid INTEGER PRIMARY KEY,
+                    doc_id INTEGER NOT NULL,
+                    start INTEGER NOT NULL,
+                    end INTEGER NOT NULL,
+                    byte_start INTEGER,
+                    byte_end INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS segments (
+                    seg_id INTEGER PRIMARY KEY,
+                    file TEXT NOT NULL,
+                    postings INTEGER NOT NULL,
+                    created REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS terms (
+                    term TEXT NOT NULL,
+                    seg_id INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (term, seg_id)
+                ) WITHOUT ROWID;
+            """)
+            self._migrate(conn)
+            self._conn = conn
+            self._conn_pid = os.getpid()
+            self._segments = {}
+            self._lengths = None
+        return self._conn
+
+    # Índices criados antes das posições em bytes dos trechos
+    def _migrate(self, conn):
+        if "byte_start" in {row[1] for row in conn.execute("PRAGMA table_info(passages)")}:
+            return
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if "byte_start" not in {row[1] for row in conn.execute("PRAGMA table_info(passages)")}:
+                conn.execute("ALTER TABLE passages ADD COLUMN byte_start INTEGER")
+                conn.execute("ALTER TABLE passages ADD COLUMN byte_end INTEGER")
+
+    def get_meta(self, name, default=None):
+        row = self._connect().execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, name, value):
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, str(value)))
+
+    def _meta_int(self, conn, name):
+        row = conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else 0
+
+    # Um único escritor por vez (processo principal do file_processor ou a linha de comando);
+    # as consultas não precisam da trava
+    @contextmanager
+    def _write_lock(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / "write.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._recover_files()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Depois de uma queda: descartar comprimentos e segmentos gravados sem a transação correspondente
+    def _recover_files(self):
+        conn = self._connect()
+        expected = self._meta_int(conn, "next_pid") * UINT32
+        lengths_path = self.root / "lengths.bin"
+        if lengths_path.exists() and lengths_path.stat().st_size > expected:
+            with open(lengths_path, "r+b") as f:
+                f.truncate(expected)
+        known = {file for (file,) in conn.execute("SELECT file FROM segments")}
+        for path in self.root.glob("seg-*.post"):
+            if path.name not in known:
+                path.unlink()
+
+    # Função para indexar documentos: (source, locator, file_name, size, mtime_ns, texto), com o texto
+    # em uma str ou nos blocos de json_stream.iter_string_blocks. Um documento com o mesmo 'source' de
+    # um já indexado substitui o anterior. Um documento grande é gravado em vários segmentos (e fica
+    # marcado como em indexação, deleted = 2, até o último), para a memória não crescer com o tamanho.
+    def add_documents(self, documents):
+        added = 0
+        with self._write_lock():
+            conn = self._connect()
+            batch = self._new_batch(self._meta_int(conn, "next_pid"))
+            for source, locator, file_name, size, mtime_ns, text in documents:
+                doc = {"row": (source, json.dumps(locator), file_name, size, mtime_ns, batch["next_pid"]),
+                       "doc_id": None, "passages": 0, "length": 0, "pending": 0}
+                for start, end, byte_start, byte_end, terms in split_passages(text or ""):
+                    pid = batch["next_pid"]
+                    for term, tf in Counter(terms).items():
+                        postings = batch["postings"].get(term)
+                        if postings is None:
+                            postings = batch["postings"][term] = array.array("I")
+                        postings.append(pid)
+                        postings.append(tf)
+                        batch["size"] += 1
+                    batch["passages"].append((pid, start, end, byte_start, byte_end))
+                    batch["lengths"].append(len(terms))
+                    doc["passages"] += 1
+                    doc["pending"] += 1
+                    doc["length"] += len(terms)
+                    batch["next_pid"] += 1
+                    if batch["size"] >= SEGMENT_MAX_POSTINGS or len(batch["postings"]) >= SEGMENT_MAX_TERMS:
+                        self._commit_batch(batch, doc)
+                        batch = self._new_batch(batch["next_pid"])
+                batch["docs"].append(doc)
+                added += 1
+            self._commit_batch(batch)
+            self._maybe_merge()
+        if added:
+            logging.info(f"{Fore.GREEN}{added} documentos adicionados ao índice de texto.")
+        return added
+
+    def _new_batch(self, next_pid):
+        return {"next_pid": next_pid, "postings": {}, "size": 0, "passages": [], "lengths": array.array("I"),
+                "docs": []}
+
+    # Grava o segmento e os comprimentos (com fsync) e só então registra tudo em uma transação.
+    # 'open_doc' é o documento ainda em indexação, cujos trechos seguem no próximo lote.
+    def _commit_batch(self, batch, open_doc=None):
+        docs = batch["docs"] + ([open_doc] if open_doc else [])
+        if not docs:
+            return
+        conn = self._connect()
+        seg_id = self._meta_int(conn, "next_segment") + 1
+        segment_file = None
+        term_rows = []
+        if batch["postings"]:
+            segment_file = f"seg-{seg_id:06d}.post"
+            with open(self.root / segment_file, "wb") as f:
+                for term in sorted(batch["postings"]):
+                    postings = batch["postings"][term]
+                    term_rows.append((term, seg_id, f.tell(), len(postings) // 2))
+                    f.write(postings[0::2].tobytes())
+                    f.write(postings[1::2].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        with open(self.root / "lengths.bin", "ab") as f:
+            f.write(batch["lengths"].tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        passages = iter(batch["passages"])
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            live_passages = self._meta_int(conn, "live_passages")
+            total_length = self._meta_int(conn, "total_length")
+            for doc in docs:
+                if doc["doc_id"] is None:
+                    doc["doc_id"] = conn.execute(
+                        "INSERT INTO docs (source, locator, file_name, size, mtime_ns, first_pid, passages, length, "
+                        "deleted) VALUES (?, ?, ?, ?, ?, ?, 0, 0, 2)", doc["row"]).lastrowid
+                conn.executemany("INSERT INTO passages VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(pid, doc["doc_id"], start, end, byte_start, byte_end) for pid, start, end, byte_start,
+                                  byte_end in itertools.islice(passages, doc["pending"])])
+                doc["pending"] = 0
+                conn.execute("UPDATE docs SET passages = ?, length = ? WHERE doc_id = ?",
+                             (doc["passages"], doc["length"], doc["doc_id"]))
+                if doc is open_doc:
+                    continue
+                source = doc["row"][0]
+                for old_passages, old_length in conn.execute(
+                        "SELECT passages, length FROM docs WHERE source = ? AND deleted = 0", (source,)).fetchall():
+                    live_passages -= old_passages
+                    total_length -= old_length
+                conn.execute("UPDATE docs SET deleted = 1 WHERE source = ? AND deleted = 0", (source,))
+                conn.execute("UPDATE docs SET deleted = 0 WHERE doc_id = ?", (doc["doc_id"],))
+                live_passages += doc["passages"]
+                total_length += doc["length"]
+            if segment_file:
+                conn.execute("INSERT INTO segments VALUES (?, ?, ?, ?)",
+                             (seg_id, segment_file, batch["size"], time.time()))
+                conn.executemany("INSERT INTO terms VALUES (?, ?, ?, ?)", term_rows)
+            conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("next_pid", str(batch["next_pid"])), ("next_segment", str(seg_id)),
+                ("live_passages", str(live_passages)), ("total_length", str(total_length))])
+
+    # Função para remover documentos do índice (marcados como apagados; saem dos postings na união)
+    def remove_sources(self, sources):
+        with self._write_lock():
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                live_passages = self._meta_int(conn, "live_passages")
+                total_length = self._meta_int(conn, "total_length")
+                for source in sources:
+                    for old_passages, old_length in conn.execute(
+                            "SELECT passages, length FROM docs WHERE source = ? AND deleted = 0", (source,)).fetchall():
+                        live_passages -= old_passages
+                        total_length -= old_length
+                    conn.execute("UPDATE docs SET deleted = 1 WHERE source = ? AND deleted = 0", (source,))
+                conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                    ("live_passages", str(live_passages)), ("total_length", str(total_length))])
+
+    def _maybe_merge(self):
+        conn = self._connect()
+        segments = conn.execute("SELECT seg_id FROM segments ORDER BY postings").fetchall()
+        while len(segments) > MAX_SEGMENTS:
+            self._merge([seg_id for (seg_id,) in segments[:MERGE_FACTOR]])
+            segments = conn.execute("SELECT seg_id FROM segments ORDER BY postings").fetchall()
+
+    # Une segmentos termo a termo (sem carregar os segmentos inteiros) e descarta trechos apagados
+    # (e os de documentos cuja indexação foi interrompida por uma queda)
+    def _merge(self, seg_ids):
+        conn = self._connect()
+        deleted = conn.execute(
+            "SELECT first_pid, first_pid + passages FROM docs WHERE deleted != 0 AND passages > 0 ORDER BY first_pid"
+        ).fetchall()
+        deleted_starts = [start for start, _ in deleted]
+
+        def is_deleted(pid):
+            index = bisect_right(deleted_starts, pid) - 1
+            return index >= 0 and pid < deleted[index][1]
+
+        seg_id = self._meta_int(conn, "next_segment") + 1
+        segment_file = f"seg-{seg_id:06d}.post"
+        placeholders = ", ".join("?" for _ in seg_ids)
+        term_rows = []
+        size = 0
+        with open(self.root / segment_file, "wb") as f:
+            rows = conn.execute(f"SELECT term, seg_id, offset, count FROM terms WHERE seg_id IN ({placeholders}) "
+                                f"ORDER BY term", seg_ids)
+            for term, group in itertools.groupby(rows, key=lambda row: row[0]):
+                ids = array.array("I")
+                tfs = array.array("I")
+                for _, old_seg_id, offset, count in group:
+                    segment = self._segment(old_seg_id)
+                    ids.frombytes(segment[offset:offset + count * UINT32])
+                    tfs.frombytes(segment[offset + count * UINT32:offset + 2 * count * UINT32])
+                if deleted:
+                    kept = [index for index, pid in enumerate(ids) if not is_deleted(pid)]
+                    if len(kept) != len(ids):
+                        ids = array.array("I", (ids[index] for index in kept))
+                        tfs = array.array("I", (tfs[index] for index in kept))
+                if not ids:
+                    continue
+                term_rows.append((term, seg_id, f.tell(), len(ids)))
+                f.write(ids.tobytes())
+                f.write(tfs.tobytes())
+                size += len(ids)
+            f.flush()
+            os.fsync(f.fileno())
+
+        old_files = [file for (file,) in conn.execute(
+            f"SELECT file FROM segments WHERE seg_id IN ({placeholders})", seg_ids)]
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f"DELETE FROM terms WHERE seg_id IN ({placeholders})", seg_ids)
+            conn.execute(f"DELETE FROM segments WHERE seg_id IN ({placeholders})", seg_ids)
+            conn.execute("INSERT INTO segments VALUES (?, ?, ?, ?)", (seg_id, segment_file, size, time.time()))
+            conn.executemany("INSERT INTO terms VALUES (?, ?, ?, ?)", term_rows)
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('next_segment', ?)", (str(seg_id),))
+        for old_seg_id, file in zip(seg_ids, old_files):
+            self._segments.pop(old_seg_id, None)
+            (self.root / file).unlink(missing_ok=True)  # Leitores com o mmap aberto continuam funcionando
+        logging.info(f"{Fore.BLUE}{len(seg_ids)} segmentos do índice unidos em {segment_file} ({size} postings).")
+
+    def _segment(self, seg_id):
+        segment = self._segments.get(seg_id)
+        if segment is None:
+            row = self._connect().execute("SELECT file FROM segments WHERE seg_id = ?", (seg_id,)).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"segmento {seg_id} não existe mais")
+            with open(self.root / row[0], "rb") as f:
+                segment = self._segments[seg_id] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return segment
+
+    # Comprimentos dos trechos com mmap; remapeado quando o índice cresce
+    def _lengths_view(self, next_pid):
+        if self._lengths is None or self._lengths[2] < next_pid:
+            with open(self.root / "lengths.bin", "rb") as f:
+                mapped = mmap.mmap(f.fileno(), next_pid * UINT32, access=mmap.ACCESS_READ)
+            self._lengths = (mapped, memoryview(mapped).cast("I"), next_pid)
+        return self._lengths
+
+    # Função de consulta: os k trechos mais relevantes pelo BM25, com arquivo de origem e deslocamentos
+    def search(self, query, k=10):
+        terms = Counter(tokenize(query))
+        if not terms or not (self.root / "index.sqlite").exists():
+            return []
+        for attempt in range(3):
+            try:
+                return self._search(terms, k)
+            except FileNotFoundError:
+                # Um segmento foi unido por um escritor durante a consulta: consultar de novo
+                self._segments.clear()
+        return []
+
+    def _search(self, terms, k):
+        conn = self._connect()
+        conn.execute("BEGIN")  # Uma única visão consistente do índice durante a consulta
+        try:
+            passages = self._meta_int(conn, "live_passages")
+            next_pid = self._meta_int(conn, "next_pid")
+            if passages <= 0:
+                return []
+            avgdl = self._meta_int(conn, "total_length") / passages
+            lengths = self._lengths_view(next_pid)
+            term_postings = []
+            for term, query_tf in terms.items():
+                rows = conn.execute("SELECT seg_id, offset, count FROM terms WHERE term = ?", (term,)).fetchall()
+                df = sum(count for _, _, count in rows)
+                if not df:
+                    continue
+                idf = math.log(1 + max(passages - df + 0.5, 0.5) / (df + 0.5))
+                term_postings.append((idf * query_tf, [(self._segment(seg_id), offset, count)
+                                                       for seg_id, offset, count in rows]))
+            np = load_numpy()
+            if np is not None:
+                candidates = self._score_numpy(np, term_postings, lengths, avgdl)
+            else:
+                candidates = self._score_python(term_postings, lengths, avgdl)
+            return self._resolve(conn, candidates, k)
+        finally:
+            conn.execute("COMMIT")
+
+    def _score_numpy(self, np, term_postings, lengths, avgdl):
+        length_array = np.frombuffer(lengths[0], dtype=np.uint32, count=lengths[2])
+        all_ids = []
+        all_scores = []
+        for weight, postings in term_postings:
+            for segment, offset, count in postings:
+                ids = np.frombuffer(segment, dtype=np.uint32, count=count, offset=offset)
+                tfs = np.frombuffer(segment, dtype=np.uint32, count=count, offset=offset + count * UINT32)
+                tfs = tfs.astype(np.float32)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length_array[ids] / avgdl)
+                all_ids.append(ids)
+                all_scores.append(weight * tfs * (BM25_K1 + 1) / (tfs + norm))
+        if not all_ids:
+            return {}
+        ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+        return dict(zip(ids.tolist(), scores.tolist()))
+
+    def _score_python(self, term_postings, lengths, avgdl):
+        length_view = lengths[1]
+        scores = {}
+        for weight, postings in term_postings:
+            for segment, offset, count in postings:
+                ids = array.array("I", segment[offset:offset + count * UINT32])
+                tfs = array.array("I", segment[offset + count * UINT32:offset + 2 * count * UINT32])
+                for pid, tf in zip(ids, tfs):
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length_view[pid] / avgdl)
+                    scores[pid] = scores.get(pid, 0.0) + weight * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    # Ordena os candidatos, descarta trechos de documentos apagados e busca o texto dos k primeiros
+    def _resolve(self, conn, scores, k):
+        results = []
+        wanted = k * 2 + 8
+        seen = 0
+        while len(results) < k and seen < len(scores):
+            top = heapq.nlargest(wanted, scores.items(), key=lambda item: item[1])[seen:]
+            seen += len(top)
+            wanted *= 4
+            placeholders = ", ".join("?" for _ in top)
+            rows = {row[0]: row[1:] for row in conn.execute(
+                f"SELECT p.pid, p.start, p.end, p.byte_start, p.byte_end, d.source, d.locator, d.file_name "
+                f"FROM passages p "
+                f"JOIN docs d ON d.doc_id = p.doc_id WHERE p.pid IN ({placeholders}) AND d.deleted = 0",
+                [pid for pid, _ in top])}
+            for pid, score in top:
+                if pid in rows and len(results) < k:
+                    start, end, byte_start, byte_end, source, locator, file_name = rows[pid]
+                    results.append({"score": round(score, 4), "source": source, "file_name": file_name,
+                                    "start": start, "end": end, "locator": locator,
+                                    "bytes": (byte_start, byte_end)})
+        records = {}
+        for result in results:
+            result["text"] = self._passage_text(result.pop("locator"), result["start"], result["end"],
+                                                result.pop("bytes"), records)
+        return results
+
+    # Texto de um trecho: lido direto da posição em bytes no arquivo, quando conhecida (sem carregar o
+    # registro inteiro); senão, do registro carregado
+    def _passage_text(self, locator, start, end, byte_span, records):
+        location = json.loads(locator)
+        if "path" in location and byte_span[0] is not None:
+            try:
+                with open(location["path"], "rb") as f:
+                    f.seek(byte_span[0])
+                    return json.loads(b'"' + f.read(byte_span[1] - byte_span[0]) + b'"')
+            except (OSError, ValueError) as e:
+                logging.warning(f"{Fore.YELLOW}Não foi possível ler o trecho de {location['path']}: {e}")
+                return ""
+        if locator not in records:
+            try:
+                if "path" in location:
+                    with open(location["path"], "r", encoding="utf-8") as f:
+                        records[locator] = json.load(f)
+                else:
+                    store = JsonlShardStore(location["shards"])
+                    records[locator] = store.read_record(location["shard"], location["offset"],
+                                                         location["length"], location["line"])
+            except (OSError, ValueError) as e:
+                logging.warning(f"{Fore.YELLOW}Não foi possível ler o registro {location}: {e}")
+                records[locator] = {}
+        return (records[locator].get("content") or "")[start:end]
+
+    # Quase-duplicatas de outro registro entram sem texto (o documento fica registrado, sem trechos,
+    # e não aparece nas buscas nem é relido na próxima sincronização)
+    def _is_skipped_duplicate(self, record):
+        return self.skip_near_duplicates and bool((record.get("near_duplicate") or {}).get("duplicate_of"))
+
+    # Texto indexado de um registro
+    def _record_text(self, record):
+        if self._is_skipped_duplicate(record):
+            return ""
+        return record.get("content") or ""
+
+    # Blocos do 'content' de um arquivo JSON; um erro de leitura no meio indexa só o que foi lido
+    def _content_blocks(self, path, span):
+        try:
+            yield from iter_string_blocks(path, *span)
+        except (OSError, ValueError) as e:
+            logging.warning(f"{Fore.YELLOW}Registro {path} indexado só em parte: {e}")
+
+    # Função para indexar arquivos JSON de resultado; arquivos já indexados sem mudança são ignorados
+    # pelo stat, sem serem lidos. O 'content' é lido do arquivo em blocos durante a indexação.
+    def add_json_files(self, paths):
+        conn = self._connect()
+
+        def documents():
+            for path in paths:
+                path = Path(path)
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                row = conn.execute("SELECT size, mtime_ns FROM docs WHERE source = ? AND deleted = 0",
+                                   (str(path),)).fetchone()
+                if row == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                try:
+                    fields, span = read_record_fields(path)
+                except (OSError, ValueError) as e:
+                    logging.warning(f"{Fore.YELLOW}Registro {path} ignorado pelo índice: {e}")
+                    continue
+                text = "" if span is None or self._is_skipped_duplicate(fields) else self._content_blocks(path, span)
+                yield (str(path), {"path": str(path)}, fields.get("file_name"), stat.st_size, stat.st_mtime_ns, text)
+
+        return self.add_documents(documents())
+
+    # Função para sincronizar com uma pasta inteira: indexa os JSON novos ou alterados e remove os
+    # documentos cujos arquivos não existem mais
+    def sync_directory(self, folder):
+        folder = Path(folder)
+        added = self.add_json_files(folder.rglob("*.json"))
+        prefix = str(folder) + os.sep
+        conn = self._connect()
+        missing = [source for (source,) in conn.execute(
+            "SELECT source FROM docs WHERE deleted = 0 AND source LIKE ? ESCAPE '\\'",
+            (prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%",))
+            if not Path(source).exists()]
+        if missing:
+            self.remove_sources(missing)
+        return added
+
+    # Função para indexar os registros novos do armazenamento JSONL (a partir do último id indexado)
+    def add_jsonl_store(self, store):
+        watermark = int(self.get_meta("jsonl_watermark", 0))
+        last_id = watermark
+
+        def documents():
+            nonlocal last_id
+            for record_id, source_path, shard, offset, length, line in store.iter_index(after_id=watermark):
+                record = store.read_record(shard, offset, length, line)
+                last_id = record_id
+                locator = {"shards": str(store.root), "shard": shard, "offset": offset, "length": length,
+                           "line": line}
+                source = f"jsonl:{source_path or record_id}"
+                if "chunk" in record:
+                    source += f"#{record['chunk']}"  # Partes de um resultado gravado em modo streaming
+                yield (source, locator, record.get("file_name"), None, None,
+                       self._record_text(record))
+                if record.get("chunks") and self._is_skipped_duplicate(record):
+                    # A anotação de quase-duplicata só existe no fim da extração e vem na última parte:
+                    # as partes anteriores do mesmo resultado, já indexadas, são substituídas sem texto
+                    for chunk in range(record["chunks"] - 1):
+                        yield (f"jsonl:{source_path or record_id}#{chunk}", locator, record.get("file_name"),
+                               None, None, "")
+
+        added = self.add_documents(documents())
+        if last_id != watermark:
+            self.set_meta("jsonl_watermark", last_id)
+        return added
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            "documents": conn.execute("SELECT COUNT(*) FROM docs WHERE deleted = 0").fetchone()[0],
+            "passages": self._meta_int(conn, "live_passages"),
+            "segments": conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0],
+            "terms": conn.execute("SELECT COUNT(DISTINCT term) FROM terms").fetchone()[0],
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Índice de texto (BM25) dos resultados extraídos")
+    parser.add_argument("index_dir", help="Pasta do índice")
+    parser.add_argument("--sync", metavar="PASTA", help="Indexa os JSON novos ou alterados da pasta")
+    parser.add_argument("--query", help="Consulta a executar")
+    parser.add_argument("-k", type=int, default=5, help="Quantidade de trechos retornados")
+    args = parser.parse_args()
+    index = TextIndex(args.index_dir)
+    if args.sync:
+        index.sync_directory(args.sync)
+        print(index.stats())
+    if args.query:
+        start = time.perf_counter()
+        results = index.search(args.query, args.k)
+        print(json.dumps(results, ensure_ascii=False, indent=4))
+        print(f"{len(results)} trechos em {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,333 @@
+import fcntl
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, CancelledError, wait, FIRST_COMPLETED
+from colorama import Fore
+
+# Taxa de amostragem esperada pelo Whisper
+SAMPLE_RATE = 16000
+
+# Tamanhos de modelo do Whisper, do menor para o maior
+MODEL_SIZES = ("tiny", "base", "small", "medium", "large")
+# Modelo por duração da mídia (segundos): recados curtos com o tiny, reuniões com o small
+DEFAULT_MODEL_POLICY = "120:tiny,900:base,small"
+# Fator de tempo real (tempo de transcrição / duração) aproximado de cada modelo em int8 na CPU,
+# com 4 threads; substituível pelos valores medidos com teste/benchmark_transcricao.py
+DEFAULT_REALTIME_FACTORS = {"tiny": 0.04, "base": 0.08, "small": 0.25, "medium": 0.8, "large": 1.6}
+
+# Registro de modelos carregados sob demanda e reutilizados entre arquivos (um por processo)
+models = {}
+models_lock = threading.Lock()
+cpu_threads = 0  # Threads de CPU definidas para o processo (0 = padrão da biblioteca)
+
+
+def segment_dict(start, end, text):
+    return {"start": round(start, 3), "end": round(end, 3), "text": text.strip()}
+
+
+# Whisper original (openai-whisper) em float32 na CPU
+class WhisperBackend:
+    name = "whisper"
+
+    def __init__(self, model_name):
+        import whisper
+
+        self.model = whisper.load_model(model_name, device="cpu")
+
+    # 'audio': caminho do arquivo ou amostras mono de 16 kHz (float32)
+    def transcribe(self, audio, language=None):
+        result = self.model.transcribe(audio, language=language, fp16=False)
+        return {"text": result["text"].strip(), "language": result.get("language"),
+                "segments": [segment_dict(segment["start"], segment["end"], segment["text"])
+                             for segment in result["segments"]]}
+
+
+# Whisper com as camadas lineares quantizadas dinamicamente para int8 (pesos em int8, ativações
+# quantizadas a cada chamada): menos memória e multiplicações de matriz bem mais rápidas na CPU
+class QuantizedWhisperBackend(WhisperBackend):
+    name = "whisper-int8"
+
+    def __init__(self, model_name):
+        import torch
+
+        super().__init__(model_name)
+        # whisper.model.Linear só converte o peso para o tipo da entrada antes do nn.Linear; o
+        # quantize_dynamic só troca camadas do tipo exato nn.Linear (em float32 o cálculo é o mesmo)
+        for module in self.model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8,
+                                                            inplace=True)
+
+
+# faster-whisper (CTranslate2) com pesos em int8; não depende do torch
+class FasterWhisperBackend:
+    name = "faster-whisper"
+
+    def __init__(self, model_name):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model_name, device="cpu", compute_type="int8", cpu_threads=cpu_threads)
+
+    def transcribe(self, audio, language=None):
+        segments, info = self.model.transcribe(audio, language=language)
+        segments = [segment_dict(segment.start, segment.end, segment.text) for segment in segments]
+        return {"text": " ".join(segment["text"] for segment in segments).strip(), "language": info.language,
+                "segments": segments}
+
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend, QuantizedWhisperBackend, FasterWhisperBackend)}
+
+
+# Função para criar o backend de transcrição: "auto" usa o faster-whisper se estiver instalado,
+# senão o Whisper quantizado em int8
+def create_transcriber(backend, model_name):
+    if backend in ("auto", "faster-whisper"):
+        try:
+            return FasterWhisperBackend(model_name)
+        except ImportError:
+            if backend == "faster-whisper":
+                raise
+            logging.info(f"{Fore.YELLOW}faster-whisper não instalado, usando o Whisper quantizado em int8.")
+        backend = "whisper-int8"
+    if backend not in BACKENDS:
+        raise ValueError(f"backend de transcrição desconhecido: {backend}")
+    return BACKENDS[backend](model_name)
+
+
+# Função para obter um modelo de transcrição, carregando-o apenas no primeiro uso
+def get_transcriber(model_name, backend="whisper"):
+    with models_lock:
+        key = (backend, model_name)
+        if key not in models:
+            logging.info(f"{Fore.CYAN}Carregando modelo '{model_name}' ({backend})...")
+            load_start = time.perf_counter()
+            models[key] = create_transcriber(backend, model_name)
+            logging.info(f"{Fore.GREEN}Modelo '{model_name}' ({models[key].name}) carregado em "
+                         f"{time.perf_counter() - load_start:.1f}s")
+        return models[key]
+
+
+# Política de modelo: "limite:modelo,...,modelo" (o último, sem limite, vale para o resto)
+def parse_model_policy(policy):
+    rules = []
+    for rule in policy.split(","):
+        limit, _, model = rule.strip().rpartition(":")
+        rules.append((float(limit) if limit else float("inf"), model))
+    return rules
+
+
+# Função para escolher o modelo pela duração da mídia. Com 'realtime_budget' (tempo de
+# transcrição máximo por segundo de mídia para acompanhar a chegada de arquivos), o modelo da
+# política desce para o maior modelo menor que caiba no orçamento.
+def select_model(duration, policy=DEFAULT_MODEL_POLICY, realtime_budget=0, realtime_factors=None):
+    model = next((model for limit, model in parse_model_policy(policy) if duration <= limit), MODEL_SIZES[-1])
+    if realtime_budget and model in MODEL_SIZES:
+        realtime_factors = realtime_factors or DEFAULT_REALTIME_FACTORS
+        for smaller in reversed(MODEL_SIZES[:MODEL_SIZES.index(model) + 1]):
+            model = smaller
+            if realtime_factors.get(smaller, 0) <= realtime_budget:
+                break
+    return model
+
+
+# Blocos de CPUs disjuntos (do conjunto permitido ao processo) com 'size' CPUs cada
+def cpu_blocks(size):
+    cpus = sorted(os.sched_getaffinity(0))
+    size = max(1, min(size, len(cpus)))
+    return [cpus[start:start + size] for start in range(0, len(cpus) - size + 1, size)]
+
+
+# Função para configurar as threads do processo atual: número de threads do torch/OpenMP e, com
+# 'slots' (contador compartilhado entre os processos do pool), fixação em um bloco de CPUs próprio,
+# para que os processos não disputem os mesmos núcleos nem troquem de núcleo o tempo todo
+def set_cpu_threads(num_threads, slots=None):
+    global cpu_threads
+    if slots is not None and hasattr(os, "sched_setaffinity"):
+        with slots.get_lock():
+            slot = slots.value
+            slots.value += 1
+        blocks = cpu_blocks(num_threads)
+        os.sched_setaffinity(0, blocks[slot % len(blocks)])
+    cpu_threads = num_threads
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+    try:
+        import torch
+    except ImportError:
+        return  # Backend sem torch (faster-whisper)
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Só pode ser definido antes do primeiro uso do torch
+
+
+# Função para obter a duração da mídia lendo apenas o cabeçalho (ffprobe)
+def probe_duration(file_path):
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+           "-of", "default=noprint_wrappers=1:nokey=1", str(file_path)]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe falhou: {result.stderr.strip()}")
+    return float(result.stdout.strip())
+
+
+# Função para decodificar apenas uma janela do áudio (mono, 16 kHz, float32) com o ffmpeg
+def load_audio_window(file_path, start, duration):
+    import numpy as np
+
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-ss", f"{start:.3f}", "-t", f"{duration:.3f}",
+           "-i", str(file_path), "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"]
+    result = subprocess.run(cmd, capture_output=True, check=True)
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+# Função para dividir a mídia em janelas fixas com sobreposição: (índice, início, duração)
+def plan_chunks(total_duration, chunk_seconds, overlap_seconds):
+    chunks = []
+    start = 0.0
+    index = 0
+    while True:
+        chunks.append((index, start, min(chunk_seconds + overlap_seconds, total_duration - start)))
+        if start + chunk_seconds + overlap_seconds >= total_duration:
+            return chunks  # A janela atual já cobre o final da mídia
+        start += chunk_seconds
+        index += 1
+
+
+# Transcreve uma janela; os tempos dos segmentos voltam em relação ao início da mídia
+def transcribe_chunk(file_path, index, start, duration, model_name, language=None, backend="whisper"):
+    audio = load_audio_window(file_path, start, duration)
+    result = get_transcriber(model_name, backend).transcribe(audio, language=language)
+    segments = [segment_dict(start + segment["start"], start + segment["end"], segment["text"])
+                for segment in result["segments"]]
+    return {"chunk": index, "language": result["language"], "segments": segments}
+
+
+# Inicializador dos processos que transcrevem janelas
+def init_chunk_worker(torch_threads, slots=None):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C é tratado pelo processo principal
+    set_cpu_threads(torch_threads, slots)
+
+
+# Junta as janelas: na sobreposição, cada segmento fica com a janela que contém o seu ponto médio
+def stitch_chunks(chunk_results, chunk_seconds, overlap_seconds):
+    segments = []
+    last = max(chunk_results) if chunk_results else 0
+    for index in sorted(chunk_results):
+        window_start = index * chunk_seconds + (overlap_seconds / 2 if index > 0 else 0)
+        window_end = (index + 1) * chunk_seconds + overlap_seconds / 2 if index < last else float('inf')
+        for segment in chunk_results[index]["segments"]:
+            middle = (segment["start"] + segment["end"]) / 2
+            if window_start <= middle < window_end and segment["text"]:
+                segments.append(segment)
+    return segments
+
+
+# Arquivo parcial de uma transcrição: conteúdo, modelo, backend e tamanho das janelas (janelas de
+# outro tamanho ou com outra sobreposição não podem ser costuradas juntas)
+def partial_path_for(partial_dir, content_hash, model_name, backend, chunk_seconds, overlap_seconds):
+    return partial_dir / f"{content_hash}-{model_name}-{backend}-{chunk_seconds:g}s-{overlap_seconds:g}s.jsonl"
+
+
+# Lê as janelas já concluídas em uma execução anterior (retomada após falha)
+def load_partial(partial_path):
+    chunk_results = {}
+    if partial_path.exists():
+        with open(partial_path, 'r', encoding='utf-8') as partial_file:
+            for line in partial_file:
+                if line.endswith("\n"):
+                    chunk = json.loads(line)
+                    chunk_results[chunk["chunk"]] = chunk
+    return chunk_results
+
+
+# Transcreve mídias longas em janelas paralelas. Cada janela concluída é gravada imediatamente
+# em 'partial_path' (JSONL), então uma falha perto do fim não perde o que já foi transcrito e a
+# próxima tentativa transcreve apenas as janelas que faltam. Dois trabalhos com o mesmo arquivo
+# parcial (gravações iguais, ou o chat e o file_processor com o mesmo arquivo) gravam cada linha com
+# trava e toleram que o outro apague o arquivo ao terminar.
+# 'progress(concluídas, total)' é chamado a cada janela; com 'cancel_event' ligado a transcrição para
+# entre janelas com CancelledError (as janelas já gravadas continuam valendo para a retomada).
+# Com 'cpu_affinity' cada processo de janela fica fixo em um bloco de 'torch_threads' CPUs.
+def transcribe_chunked(file_path, model_name, partial_path, chunk_seconds=600, overlap_seconds=5,
+                       workers=2, torch_threads=1, language=None, progress=None, cancel_event=None,
+                       backend="whisper", cpu_affinity=False):
+    try:
+        total_duration = probe_duration(file_path)
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        # Sem ffprobe (ou cabeçalho ilegível): transcrever o arquivo inteiro como antes
+        logging.warning(f"{Fore.YELLOW}Duração de {file_path} desconhecida ({e}), transcrevendo sem dividir.")
+        return get_transcriber(model_name, backend).transcribe(str(file_path), language=language)
+
+    chunks = plan_chunks(total_duration, chunk_seconds, overlap_seconds)
+    partial_path.parent.mkdir(parents=True, exist_ok=True)
+    chunk_results = load_partial(partial_path)
+    missing = [chunk for chunk in chunks if chunk[0] not in chunk_results]
+    if chunk_results:
+        logging.info(f"{Fore.CYAN}Retomando {file_path}: {len(chunk_results)} de {len(chunks)} janelas já transcritas.")
+
+    with open(partial_path, 'a', encoding='utf-8') as partial_file:
+        def save_chunk(chunk):
+            chunk_results[chunk["chunk"]] = chunk
+            fcntl.flock(partial_file, fcntl.LOCK_EX)
+            try:
+                partial_file.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                partial_file.flush()
+                os.fsync(partial_file.fileno())
+            finally:
+                fcntl.flock(partial_file, fcntl.LOCK_UN)
+            logging.info(f"{Fore.GREEN}Janela {chunk['chunk'] + 1}/{len(chunks)} de {file_path} transcrita.")
+            if progress is not None:
+                progress(len(chunk_results), len(chunks))
+
+        def check_cancelled():
+            if cancel_event is not None and cancel_event.is_set():
+                raise CancelledError(f"transcrição de {file_path} cancelada")
+
+        if progress is not None:
+            progress(len(chunk_results), len(chunks))
+        if len(missing) <= 1 or workers <= 1:
+            for index, start, duration in missing:
+                check_cancelled()
+                save_chunk(transcribe_chunk(file_path, index, start, duration, model_name, language, backend))
+        else:
+            # 'spawn': o torch não se dá bem com fork depois de inicializado
+            context = multiprocessing.get_context('spawn')
+            slots = context.Value('i', 0) if cpu_affinity else None
+            with ProcessPoolExecutor(max_workers=min(workers, len(missing)), initializer=init_chunk_worker,
+                                     initargs=(torch_threads, slots), mp_context=context) as pool:
+                futures = [pool.submit(transcribe_chunk, file_path, index, start, duration, model_name, language,
+                                       backend)
+                           for index, start, duration in missing]
+                failure = None
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            save_chunk(future.result())
+                        except Exception as e:
+                            failure = failure or e  # Continua salvando as janelas que terminarem
+                    if cancel_event is not None and cancel_event.is_set() and failure is None:
+                        # Janelas na fila são descartadas; as que já começaram terminam e são gravadas
+                        for future in pending:
+                            future.cancel()
+                        failure = CancelledError(f"transcrição de {file_path} cancelada")
+                if failure is not None:
+                    raise failure
+
+    segments = stitch_chunks(chunk_results, chunk_seconds, overlap_seconds)
+    languages = [chunk_results[index]["language"] for index in sorted(chunk_results) if chunk_results[index]["language"]]
+    partial_path.unlink(missing_ok=True)  # Outro trabalho com o mesmo arquivo pode ter terminado antes
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "language": languages[0] if languages else None,
+        "segments": segments,
+    }
@@ -0,0 +1,95 @@
+import numpy as np
+
+# Detecção de mudanças de cena em vídeos (gravações de tela, aulas, apresentações), para que o OCR
+# rode só nos quadros em que o conteúdo da tela mudou e não em todos os quadros.
+#
+# O vídeo é decodificado em baixa resolução e a SAMPLE_FPS quadros por segundo. Cada amostra vira
+# uma imagem em tons de cinza e é comparada (em numpy, a imagem inteira de uma vez) com o último
+# quadro-chave: se a fração de pixels que mudaram passa de CHANGE_FRACTION, a tela mudou. O novo
+# quadro-chave é a primeira amostra depois disso em que a imagem parou de mudar (fim da transição
+# ou da animação). Um quadro-chave igual a um anterior (slide que volta) é marcado como repetido,
+# para reaproveitar o texto sem outro OCR.
+
+SAMPLE_FPS = 1.0
+ANALYSIS_HEIGHT = 180  # Altura dos quadros analisados (a largura segue a proporção do vídeo)
+PIXEL_DELTA = 24  # Diferença mínima (0-255) para um pixel contar como alterado
+CHANGE_FRACTION = 0.01  # Fração de pixels alterados que caracteriza uma mudança de cena
+MAX_PENDING_SAMPLES = 5  # Tela que não para de mudar (vídeo comum): aceitar o quadro assim mesmo
+MAX_KEYFRAME_HISTORY = 256  # Quadros-chave guardados para reconhecer slides repetidos
+
+GRAY_WEIGHTS = np.array([77, 150, 29], dtype=np.uint16)  # Luminância (BT.601) em inteiros, soma 256
+
+
+def open_video(path, height=None):
+    try:
+        from moviepy import VideoFileClip
+    except ImportError:  # moviepy 1.x
+        from moviepy.editor import VideoFileClip
+
+    return VideoFileClip(str(path), audio=False, target_resolution=(height, None) if height else None)
+
+
+# Função para percorrer as amostras (tempo em segundos, quadro RGB) em baixa resolução
+def sample_frames(path, fps=SAMPLE_FPS, height=ANALYSIS_HEIGHT):
+    clip = open_video(path, height)
+    try:
+        yield from clip.iter_frames(fps=fps, dtype="uint8", with_times=True)
+    finally:
+        clip.close()
+
+
+def to_gray(frame):
+    return ((frame.astype(np.uint16) @ GRAY_WEIGHTS) >> 8).astype(np.uint8)
+
+
+# Fração dos pixels que mudaram entre duas imagens em tons de cinza
+def changed_fraction(first, second, pixel_delta=PIXEL_DELTA):
+    return np.count_nonzero(np.abs(first.astype(np.int16) - second) > pixel_delta) / first.size
+
+
+# Função para encontrar os quadros-chave de uma sequência de amostras (tempo, quadro RGB).
+# Gera (início, tempo do quadro, repetido): 'início' é quando a mudança foi vista, 'tempo do quadro' é
+# a amostra estável a usar no OCR e 'repetido' é o número de um quadro-chave anterior com a mesma
+# imagem, ou None para uma tela nova.
+def detect_keyframes(samples, pixel_delta=PIXEL_DELTA, change_fraction=CHANGE_FRACTION,
+                     max_pending=MAX_PENDING_SAMPLES):
+    keyframes = []  # Imagens dos quadros-chave já gerados (os mais recentes)
+    first_keyframe = 0  # Número do primeiro quadro-chave ainda guardado em 'keyframes'
+    reference = previous = None
+    pending = 0  # Amostras desde a mudança ainda não estabilizada
+    change_time = None
+
+    def accept(time, gray):
+        nonlocal reference, first_keyframe
+        repeated = None
+        for number in range(len(keyframes) - 1, -1, -1):
+            if changed_fraction(gray, keyframes[number], pixel_delta) <= change_fraction:
+                repeated = first_keyframe + number
+                break
+        keyframes.append(gray)
+        if len(keyframes) > MAX_KEYFRAME_HISTORY:
+            keyframes.pop(0)
+            first_keyframe += 1
+        reference = gray
+        return (time if change_time is None else change_time), time, repeated
+
+    for time, frame in samples:
+        gray = to_gray(frame)
+        if reference is None:
+            yield accept(time, gray)
+        elif pending:
+            stable = changed_fraction(gray, previous, pixel_delta) <= change_fraction
+            if changed_fraction(gray, reference, pixel_delta) <= change_fraction:
+                pending = 0  # Voltou ao quadro-chave atual (cursor, aviso passageiro): não é uma tela nova
+            elif stable or pending >= max_pending:
+                pending = 0
+                yield accept(time, gray)
+            else:
+                pending += 1
+        elif changed_fraction(gray, reference, pixel_delta) > change_fraction:
+            pending = 1
+            change_time = time
+        previous = gray
+        previous_time = time
+    if pending:
+        yield accept(previous_time, previous)  # Vídeo terminou durante uma transição